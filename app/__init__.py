@@ -0,0 +1,5 @@
+# app/__init__.py
+from dotenv import load_dotenv
+
+# Carrega o .env uma única vez, antes de qualquer módulo do app ler as variáveis de ambiente
+load_dotenv()
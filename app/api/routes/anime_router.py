@@ -1,14 +1,28 @@
 # app/api/routes/anime_router.py
-from fastapi import APIRouter
-from app.services.anilist_service import get_top_animes, search_anime
+from fastapi import APIRouter, Query, Request, Response
+from app.services.anilist_service import get_top_animes, search_anime, CACHE_LIST_TTL
 from app.schemas.requests import SearchRequest
+from app.core.http_cache import cached_json_response
+from app.core.pagination import encode_cursor, decode_offset_cursor
 
 anime_router = APIRouter()
 
-@anime_router.get("/", summary="Top 50 animes populares")
-def list_top_animes():
-    return get_top_animes(50)
+@anime_router.get("/", summary="Animes populares (paginado: próxima página no header X-Next-Cursor)")
+def list_top_animes(
+    response: Response,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: str | None = Query(None, description="Valor do header X-Next-Cursor da página anterior"),
+):
+    offset = decode_offset_cursor(cursor)
+    animes = get_top_animes(limit, offset)
+    if len(animes) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(offset + limit)
+    return animes
+
+@anime_router.get("/search", summary="Buscar animes por nome (GET, cacheável)")
+def search_animes_get(request: Request, name: str = Query(..., min_length=1)):
+    return cached_json_response(request, search_anime(name, limit=30), CACHE_LIST_TTL)
 
 @anime_router.post("/search", summary="Buscar animes por nome")
 def search_animes(req: SearchRequest):
-    return search_anime(req.name, limit=30)
\ No newline at end of file
+    return search_anime(req.name, limit=30)
@@ -1,25 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 from app.config import get_db
 from app.models.user import UserModel
-from app.models.movie import MovieModel
-from app.models.anime import AnimeModel
-from app.models.serie import SeriesModel
-from app.models.lista import ListaModel
-from app.models.lista_item import ListaItemModel
 from app.schemas.user_schema import (
-    UserOut, UserRegister, UserLogin, TokenResponse, UserUpdateAvatar, UserUpdateUsername
+    UserOut, UserRegister, UserLogin, TokenResponse, UserUpdateAvatar, UserUpdateUsername,
+    RefreshTokenRequest, LogoutRequest
 )
+from app.core.query_budget import query_budget
+from app.services.account_service import soft_delete_user, run_account_deletion_job
+from app.core.jobs import create_job, get_job
 from app.core.security import (
-    get_password_hash, verify_password,
-    create_access_token, get_current_user, oauth2_scheme
+    get_password_hash, verify_password, issue_tokens, decode_token,
+    get_current_claims, get_current_user, oauth2_scheme
 )
+from app.core.revocation import revoke_token
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 # --- Registro ---
-@router.post("/register", response_model=TokenResponse) # <- Retorna TokenResponse
+@router.post("/register", response_model=TokenResponse, dependencies=[query_budget(4)]) # <- Retorna TokenResponse
 def register_user(user_data: UserRegister, db: Session = Depends(get_db)): # <- Aceita UserRegister
     existing_user_email = db.query(UserModel).filter(UserModel.email == user_data.email).first()
     if existing_user_email:
@@ -45,19 +45,15 @@ def register_user(user_data: UserRegister, db: Session = Depends(get_db)): # <-
     db.refresh(new_user)
 
     # --- Login automático após registro ---
-    token = create_access_token({"sub": str(new_user.id)})
+    tokens = issue_tokens(new_user.id)
     
     # Converte o modelo SQLAlchemy para o schema Pydantic
     user_out = UserOut.model_validate(new_user) # (ou UserOut.from_orm(new_user) em Pydantic v1)
 
-    return {
-        "access_token": token, 
-        "token_type": "bearer", 
-        "user": user_out 
-    }
+    return {**tokens, "user": user_out}
 
 # --- Login ---
-@router.post("/login", response_model=TokenResponse) # <- Retorna TokenResponse
+@router.post("/login", response_model=TokenResponse, dependencies=[query_budget(1)]) # <- Retorna TokenResponse
 def login(credentials: UserLogin, db: Session = Depends(get_db)): # <- Aceita UserLogin (JSON)
     
     # Busca o usuário pelo email
@@ -67,19 +63,41 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)): # <- Aceita Us
     if not user or not verify_password(credentials.password, user.password):
         raise HTTPException(status_code=401, detail="Email ou senha inválidos")
 
-    # Cria o token
-    token = create_access_token({"sub": str(user.id)})
+    # Cria os tokens (access curto + refresh)
+    tokens = issue_tokens(user.id)
     
     # Converte o modelo SQLAlchemy para o schema Pydantic
     user_out = UserOut.model_validate(user) # (ou UserOut.from_orm(user) em Pydantic v1)
     
-    return {
-        "access_token": token, 
-        "token_type": "bearer", 
-        "user": user_out 
-    }
-
-@router.get("/me", response_model=TokenResponse)
+    return {**tokens, "user": user_out}
+
+# --- Renovação dos tokens ---
+@router.post("/refresh", response_model=TokenResponse, dependencies=[query_budget(1)])
+def refresh_tokens(body: RefreshTokenRequest, db: Session = Depends(get_db)):
+    claims = decode_token(body.refresh_token, "refresh")
+    user = db.query(UserModel).filter(UserModel.id == int(claims["sub"]), UserModel.deleted_at.is_(None)).first()
+    if not user:
+        raise HTTPException(status_code=401, detail="Usuário não encontrado")
+
+    # Rotação: cada refresh token vale uma vez
+    revoke_token(claims["jti"])
+    return {**issue_tokens(user.id), "user": UserOut.model_validate(user)}
+
+# --- Logout ---
+@router.post("/logout", dependencies=[query_budget(0)])
+def logout(body: LogoutRequest | None = None, claims: dict = Depends(get_current_claims)):
+    if "jti" in claims:
+        revoke_token(claims["jti"])
+    if body and body.refresh_token:
+        try:
+            refresh_claims = decode_token(body.refresh_token, "refresh")
+        except HTTPException:
+            refresh_claims = None # já expirado ou revogado: nada a fazer
+        if refresh_claims and refresh_claims["sub"] == claims["sub"]:
+            revoke_token(refresh_claims["jti"])
+    return {"message": "Logout realizado com sucesso."}
+
+@router.get("/me", response_model=TokenResponse, dependencies=[query_budget(1)])
 def get_profile(
     current_user: UserOut = Depends(get_current_user),
     token: str = Depends(oauth2_scheme)
@@ -90,7 +108,7 @@ def get_profile(
         "user": current_user
     }
 
-@router.put("/me/avatar", response_model=UserOut)
+@router.put("/me/avatar", response_model=UserOut, dependencies=[query_budget(3)])
 def update_avatar_usuario(
     avatar_data: UserUpdateAvatar,
     db: Session = Depends(get_db),
@@ -109,35 +127,17 @@ def update_avatar_usuario(
         )
     return current_user
 
-@router.delete("/me", status_code=status.HTTP_200_OK)
+@router.delete("/me", status_code=status.HTTP_202_ACCEPTED, dependencies=[query_budget(2)])
 def delete_current_user(
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user) # Obtém o usuário logado
 ):
     user_id_to_delete = current_user.id
 
     try:
-        db.query(MovieModel).filter(MovieModel.user_id == user_id_to_delete).delete(synchronize_session=False)
-        db.query(SeriesModel).filter(SeriesModel.user_id == user_id_to_delete).delete(synchronize_session=False)
-        db.query(AnimeModel).filter(AnimeModel.user_id == user_id_to_delete).delete(synchronize_session=False)
-
-        list_ids = db.query(ListaModel.id).filter(ListaModel.user_id == user_id_to_delete).all()
-        list_ids_tuple = [l_id[0] for l_id in list_ids] # Extrai os IDs da tupla
-        if list_ids_tuple:
-             db.query(ListaItemModel).filter(ListaItemModel.lista_id.in_(list_ids_tuple)).delete(synchronize_session=False)
-
-        db.query(ListaModel).filter(ListaModel.user_id == user_id_to_delete).delete(synchronize_session=False)
-
-        user_to_delete = db.query(UserModel).filter(UserModel.id == user_id_to_delete).first()
-        if user_to_delete:
-             db.delete(user_to_delete)
-        else:
-             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuário não encontrado para exclusão.")
-
-        db.commit()
-
-        return {"message": "Conta deletada com sucesso."}
-
+        # Na hora: marca como excluída e anonimiza (os tokens da conta deixam de valer)
+        soft_delete_user(db, user_id_to_delete)
     except Exception as e:
         db.rollback()
         print(f"Erro ao deletar usuário {user_id_to_delete}: {e}")
@@ -145,8 +145,25 @@ def delete_current_user(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Não foi possível deletar a conta: {e}"
         )
+
+    # Depois: avaliações, listas, seguidores e atividades são removidos em lotes, fora da requisição
+    job_id = create_job("account_deletion", user_id=user_id_to_delete)
+    background_tasks.add_task(run_account_deletion_job, job_id, user_id_to_delete)
+
+    return {"message": "Conta deletada com sucesso.", "job_id": job_id}
+
+def _deleted_account_claims(token: str = Depends(oauth2_scheme)):
+    # A exclusão revoga os tokens da conta: aqui o token (assinado e dentro da validade) só identifica o dono do job
+    return decode_token(token, "access", check_revoked=False)
+
+@router.get("/deletion/{job_id}", dependencies=[query_budget(0)])
+def get_deletion_status(job_id: str, claims: dict = Depends(_deleted_account_claims)):
+    job = get_job(job_id)
+    if not job or job.get("kind") != "account_deletion" or job.get("user_id") != int(claims["sub"]):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job não encontrado ou expirado")
+    return {key: job.get(key) for key in ("id", "status", "step", "deleted", "error")}
     
-@router.put("/me/username", response_model=UserOut)
+@router.put("/me/username", response_model=UserOut, dependencies=[query_budget(4)])
 def update_username(
     user_data: UserUpdateUsername,
     db: Session = Depends(get_db),
@@ -1,26 +1,45 @@
 # app/api/routes/media_router.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
+import shutil
+import tempfile
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import Integer, and_, case, delete, func, literal, select, tuple_, update
+from sqlalchemy.orm import Session, joinedload, selectinload
 from typing import List
 from app.config import get_db
+from app.core.http_cache import cached_json_response
+from app.core.pagination import encode_cursor, decode_offset_cursor
+from app.core.sql import dialect_insert
+from app.core.query_budget import query_budget
+from app.core.tracing import span
 from app.services.tmdb_service import (
     get_popular_movies, get_popular_series,
-    get_movie_details, get_series_details,
-    get_movie_credits, get_series_credits,
     search_movie,
     search_series,
+    locale_params, resolve_locale,
+    CACHE_LIST_TTL,
 )
 from app.services.anilist_service import (
     get_top_animes,
-    get_anime_details,
     search_anime,
 )
+from app.services.ranking import rank, RANKING_POLICY
+from app.services.rating_service import build_rating_values, UNTITLED
+from app.services.media_service import merge_media_fields, insert_media_stubs, media_ref_subquery_for, get_or_create_media
+from app.services.stats_service import record_rating_change, get_rating_stats, get_rating_stats_many
+from app.services.feed_service import record_activity, fan_out_activity
+from app.services.import_service import IMPORT_FORMATS, EXPORT_FORMATS, run_import_job, iter_export
+from app.services.write_behind import write_handler, write_behind_enabled, get_overlay, enqueue_write
+from app.services.enrichment_service import request_enrichment
+from app.core.jobs import create_job, get_job
 from app.models.movie import MovieModel
 from app.models.serie import SeriesModel
 from app.models.anime import AnimeModel
 from app.models.user import UserModel
 from app.models.lista import ListaModel
 from app.models.lista_item import ListaItemModel
+from app.models.media import MediaModel
+from app.models.activity import ACTIVITY_RATING, ACTIVITY_LIST_ITEM
 from app.schemas.requests import (
     SearchRequest,
     RateRequest,
@@ -31,9 +50,17 @@ from app.schemas.lista_schema import (
     ListaCreate, 
     ListaOut, 
     ListaWithItens,
+    ListaSummary,
     ListaWithDetailedItens,
+    ListaItemData,
     ListaItemCreate, 
     ListaItemOut, 
+    ListaItemBulkCreate,
+    ListaItemBulkDelete,
+    ListaReorderRequest,
+    ListaCloneRequest,
+    ListaMergeRequest,
+    BulkOperationResult,
     ItemIdRequest, 
     ListaIdRequest, 
     UserIdRequest,
@@ -44,11 +71,23 @@ from app.schemas.lista_schema import (
 media_router = APIRouter()
 
 # --- Populares ---
-@media_router.get("/popular", summary="20 filmes, 20 séries e 20 animes mais populares")
-def popular():
-    movies = get_popular_movies(20)
-    series = get_popular_series(20)
-    animes = get_top_animes(20)
+@media_router.get("/popular", summary="Filmes, séries e animes mais populares (limit de cada tipo por página)", dependencies=[query_budget(1)])
+def popular(
+    response: Response,
+    limit: int = Query(20, ge=1, le=50),
+    cursor: str | None = Query(None, description="Valor do header X-Next-Cursor da página anterior"),
+    policy: str | None = Query(None, pattern="^(score|round_robin)$", description="Mistura: score (nota normalizada por fonte) ou round_robin"),
+    db: Session = Depends(get_db),
+    locale: tuple = Depends(locale_params),
+):
+    language, region = locale
+    offset = decode_offset_cursor(cursor)
+    movies = get_popular_movies(limit, language, region, offset=offset)
+    series = get_popular_series(limit, language, offset=offset)
+    animes = get_top_animes(limit, offset)
+    # O cursor avança os três tipos juntos; segue enquanto algum ainda tiver uma página cheia
+    if limit in (len(movies), len(series), len(animes)):
+        response.headers["X-Next-Cursor"] = encode_cursor(offset + limit)
 
     # adiciona o tipo de mídia em cada item
     for m in movies:
@@ -57,152 +96,263 @@ def popular():
         s["type"] = "serie"
     for a in animes:
         a["type"] = "anime"
-        a["popularity"] = a.get("averageScore", 0)
 
-    # junta tudo
-    all_results = movies + series + animes
+    # nota da comunidade CineList de cada item (uma única query)
+    stats = get_rating_stats_many(db, [(item["type"], item["id"]) for item in movies + series + animes])
 
-    # ordena por popularidade (ajuste a chave conforme o nome real no retorno)
-    sorted_results = sorted(all_results, key=lambda x: x.get("popularity") or 0, reverse=True)
+    def with_stats(items):
+        return [{**item, "cinelist_rating": stats[(item["type"], item["id"])]} for item in items]
 
-    return {"results": sorted_results}
+    # Popularidade normalizada por fonte; as estatísticas de cada fonte vêm da primeira página e valem um ciclo do cache
+    results = rank(
+        {"movie": with_stats(movies), "serie": with_stats(series), "anime": with_stats(animes)},
+        policy=policy or RANKING_POLICY, scope=f"popular:{region or 'all'}", ttl=CACHE_LIST_TTL, refresh=offset == 0,
+    )
+    return {"results": results}
+
+
+# --- Detalhes e nota da comunidade ---
+@media_router.get("/stats/{media_type}/{media_id}", summary="Nota média, desvio padrão e histograma das avaliações do CineList", dependencies=[query_budget(1)])
+def media_stats(media_type: str, media_id: int, request: Request, db: Session = Depends(get_db)):
+    media_type = media_type.lower()
+    if media_type not in ("movie", "serie", "anime"):
+        raise HTTPException(status_code=400, detail="Tipo de mídia inválido")
+    stats = get_rating_stats(db, media_type, media_id)
+    return cached_json_response(request, {"type": media_type, "media_id": media_id, **stats}, 60)
+
+@media_router.get("/details/{media_type}/{media_id}", summary="Metadados da mídia com a nota da comunidade CineList", dependencies=[query_budget(4)])
+def media_details(media_type: str, media_id: int, request: Request, db: Session = Depends(get_db)):
+    media_type = media_type.lower()
+    if media_type not in ("movie", "serie", "anime"):
+        raise HTTPException(status_code=400, detail="Tipo de mídia inválido")
+
+    # Só vai às APIs externas se a mídia ainda não estiver na tabela media
+    media_ref = get_or_create_media(db, media_type, media_id)
+    if not media_ref:
+        raise HTTPException(status_code=404, detail=f"{media_type.capitalize()} não encontrado na API")
+    db.commit()
+
+    media = db.get(MediaModel, media_ref[0])
+    details = {
+        column.name: getattr(media, column.name)
+        for column in MediaModel.__table__.columns
+        if column.name not in ("id", "media_type", "external_id", "fetched_at")
+    }
+    return cached_json_response(request, {
+        "type": media_type,
+        "media_id": media_id,
+        **details,
+        "cinelist_rating": get_rating_stats(db, media_type, media_id),
+    }, 60)
+
+
+# --- Recomendações ---
+def _update_recommender(changes: list):
+    # Import tardio: numpy/scipy só são carregados quando o recomendador é usado
+    from app.services.recommender_service import apply_rating_changes
+    apply_rating_changes(changes)
+
+@media_router.get("/recommendations/{user_id}", summary="Recomendações \"porque você avaliou X\" a partir do índice item-item", dependencies=[query_budget(2)])
+def recommendations(user_id: int, request: Request, limit: int = Query(20, ge=1, le=100), db: Session = Depends(get_db)):
+    from app.services.recommender_service import get_index, user_ratings_query
+
+    index = get_index()
+    if index is None:
+        raise HTTPException(status_code=503, detail="Índice de recomendações ainda não foi gerado")
+
+    rated = db.execute(user_ratings_query(user_id)).all()
+    user_ratings = {(row.media_type, row.media_id): row.rating for row in rated if row.rating is not None}
+    titles = {(row.media_type, row.media_id): row.title for row in rated}
+
+    recommended = index.recommend(user_ratings, limit)
+
+    # Títulos e imagens das mídias recomendadas numa única query
+    keys = [index.item_key(position) for position, _, _ in recommended]
+    media = {
+        (row.media_type, row.external_id): row
+        for row in db.query(MediaModel.media_type, MediaModel.external_id, MediaModel.title, MediaModel.poster_path).filter(
+            tuple_(MediaModel.media_type, MediaModel.external_id).in_(keys)
+        )
+    } if keys else {}
+
+    results = []
+    for (media_type, media_id), (_, score, because) in zip(keys, recommended):
+        row = media.get((media_type, media_id))
+        because_key = index.item_key(because)
+        results.append({
+            "type": media_type,
+            "media_id": media_id,
+            "title": row.title if row else None,
+            "poster_path": row.poster_path if row else None,
+            "score": round(score, 4),
+            "because": {"type": because_key[0], "media_id": because_key[1], "title": titles.get(because_key)},
+        })
+
+    return cached_json_response(request, {"user_id": user_id, "results": results}, 60, private=True)
 
 
 # --- Busca ---
-@media_router.post("/search", summary="Busca por nome da mídia")
-def search(req: SearchRequest):
-    movies = search_movie(req.name, limit=20)
-    series = search_series(req.name, limit=20)
-    animes = search_anime(req.name, limit=20)
+def _search_all(name: str, language: str, region: str | None, limit: int | None = None, policy: str | None = None):
+    movies = search_movie(name, 20, language, region)
+    series = search_series(name, 20, language)
+    animes = search_anime(name, limit=20)
 
     # Adiciona o tipo de mídia em cada item
     for m in movies:
         m["type"] = "movie"
-        m["popularity"] = m.get("vote_average", 0)
     for s in series:
         s["type"] = "serie"
-        s["popularity"] = s.get("vote_average", 0)
     for a in animes:
         a["type"] = "anime"
-        a["popularity"] = a.get("averageScore", 0)
 
-    # Junta tudo
-    all_results = movies + series + animes
+    # Popularidade normalizada dentro dos resultados de cada fonte, top-k com merge das listas já ordenadas
+    results = rank({"movie": movies, "serie": series, "anime": animes}, limit, policy or RANKING_POLICY)
+    return {"results": results}
 
-    # Ordena por popularidade (ajuste a chave conforme o nome do campo real)
-    sorted_results = sorted(all_results, key=lambda x: x.get("popularity") or 0, reverse=True)
+@media_router.get("/search", summary="Busca por nome da mídia (GET, cacheável)")
+def search_get(
+    request: Request,
+    name: str = Query(..., min_length=1),
+    limit: int | None = Query(None, ge=1, le=60),
+    policy: str | None = Query(None, pattern="^(score|round_robin)$", description="Mistura: score (nota normalizada por fonte) ou round_robin"),
+    locale: tuple = Depends(locale_params),
+):
+    return cached_json_response(request, _search_all(name, *locale, limit, policy), CACHE_LIST_TTL)
 
-    return {"results": sorted_results}
+@media_router.post("/search", summary="Busca por nome da mídia")
+def search(req: SearchRequest):
+    return _search_all(req.name, *resolve_locale(req.language, req.region))
 
 
-# --- Avaliar mídia ---
-@media_router.post("/rate", summary="Avalia uma mídia e salva no banco de dados")
-def rate(request: RateRequest, db: Session = Depends(get_db)):
-    media_type = request.media_type.lower()
-    media_id = request.media_id
-    rating = request.rating
-    user_id = request.user_id
+# --- Escritas: síncronas ou write-behind (app/services/write_behind.py) ---
+RATING_MODELS = {"movie": MovieModel, "serie": SeriesModel, "anime": AnimeModel}
 
-    # Verifica se o usuário existe
-    user = db.query(UserModel).filter(UserModel.id == user_id).first()
+def _rating_entity(media_type: str, media_id: int):
+    return f"rating:{media_type}:{media_id}"
+
+def _find_rating(db: Session, media_type: str, media_id: int, user_id: int):
+    model = RATING_MODELS[media_type]
+    media_column = getattr(model, f"{media_type}_id")  # movie_id, serie_id ou anime_id
+    return db.query(model).filter(media_column == media_id, model.user_id == user_id).first()
+
+def _validate_rating_request(db: Session, media_type: str, user_id: int, rating: float | None):
+    user = db.query(UserModel.id).filter(UserModel.id == user_id, UserModel.deleted_at.is_(None)).first()
     if not user:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
-
-    if not 0 <= rating <= 10:
+    if rating is not None and not 0 <= rating <= 10:
         raise HTTPException(status_code=400, detail="A nota deve estar entre 0 e 10.")
-
-    model_map = {"movie": MovieModel, "serie": SeriesModel, "anime": AnimeModel}
-    if media_type not in model_map:
+    if media_type not in RATING_MODELS:
         raise HTTPException(status_code=400, detail="Tipo de mídia inválido")
 
-    model = model_map[media_type]
+def _pending_state(db: Session, user_id: int, entity: str, find):
+    """
+    No modo write-behind: (existe agora, existe no banco, dados atuais) da entidade, considerando
+    as escritas ainda na fila. find() busca a linha no banco quando não há escrita pendente.
+    """
+    state = get_overlay(user_id).get(entity)
+    if state:
+        return state["present"], state["base"], state["data"]
+    row = find()
+    return row is not None, row is not None, row
 
-    # Verifica se já existe avaliação
-    if media_type == "anime":
-        item = db.query(model).filter(model.anime_id == media_id, model.user_id == user_id).first()
-    elif media_type == "movie":
-        item = db.query(model).filter(model.movie_id == media_id, model.user_id == user_id).first()
-    else:  # serie
-        item = db.query(model).filter(model.serie_id == media_id, model.user_id == user_id).first()
-    if item:
-        raise HTTPException(
-            status_code=409,
-            detail=f"{media_type.capitalize()} já foi avaliado por este usuário. Atualize ou delete a avaliação pelo Perfil."
-        )
+def _run_tasks(background_tasks: BackgroundTasks, tasks: list):
+    for task in tasks:
+        background_tasks.add_task(*task)
 
-    # --- Criação do item por tipo ---
-    if media_type == "movie":
-        data = get_movie_details(media_id)
-        credits = get_movie_credits(media_id)
-        director = next((p['name'] for p in credits.get('crew', []) if p['job'] == 'Director'), None)
-        cast = ", ".join([actor['name'] for actor in credits.get('cast', [])[:10]])
-
-        item = MovieModel(
-            movie_id=data["id"],
-            title=data["title"],
-            overview=data.get("overview", ""),
-            release_date=data.get("release_date"),
-            director=director,
-            cast=cast,
-            rating=rating,
-            runtime=data.get("runtime"),
-            budget=data.get("budget"),
-            revenue=data.get("revenue"),
-            comment=request.comment,
-            user_id=user_id,
-            poster_path=data.get("poster_path"),
-            backdrop_path=data.get("backdrop_path"),
-        )
+def _queued(body: dict):
+    return ORJSONResponse(body, status_code=202)
 
-    elif media_type == "serie":
-        data = get_series_details(media_id)
-        credits = get_series_credits(media_id)
-        creator = next(
-            (p['name'] for p in credits.get('crew', []) if p['job'] == 'Director'),
-            data.get("created_by")[0]['name'] if data.get("created_by") else None
-        )
-        cast_list = [actor['name'] for actor in credits.get('cast', [])[:10]]
-        cast = ", ".join(cast_list) if cast_list else None
-
-        item = SeriesModel(
-            serie_id=data["id"],
-            title=data["name"],
-            overview=data.get("overview", ""),
-            release_date=data.get("first_air_date"),
-            creator=creator,
-            cast=cast,
-            rating=rating,
-            episodes=data.get("number_of_episodes"),
-            status=data.get("status"),
-            last_episode=data.get("last_air_date"),
-            comment=request.comment,
-            user_id=user_id,
-            poster_path=data.get("poster_path"),
-            backdrop_path=data.get("backdrop_path"),
-        )
+def _rating_not_found(media_type: str):
+    return HTTPException(status_code=404, detail=f"{media_type.capitalize()} não encontrado no banco de dados para este usuário")
 
-    elif media_type == "anime":
-        data = get_anime_details(media_id) # Esta função agora retorna os campos padronizados
-        if not data:
-            raise HTTPException(status_code=404, detail="Anime não encontrado na API")
-
-        item = AnimeModel(
-            anime_id=data["id"],
-            title=data["title"].get("romaji") or data["title"].get("english") or "Unknown",
-            description=data.get("description", ""),
-            score=rating,
-            release_date=data.get("release_date"),
-            episodes=data.get("episodes"),
-            status=data.get("status"),
-            comment=request.comment,
-            user_id=user_id,
-            poster_path=data.get("poster_path"),
-            backdrop_path=data.get("backdrop_path"),
-        )
+def _rating_exists(media_type: str):
+    return HTTPException(
+        status_code=409,
+        detail=f"{media_type.capitalize()} já foi avaliado por este usuário. Atualize ou delete a avaliação pelo Perfil."
+    )
+
+@write_handler("rate")
+def _apply_rate(db: Session, data: dict, tasks: list):
+    media_type, media_id, user_id, rating = data["media_type"], data["media_id"], data["user_id"], data["rating"]
+    if _find_rating(db, media_type, media_id, user_id):
+        raise _rating_exists(media_type)
+
+    # --- Criação do item por tipo ---
+    # Sem chamada às APIs externas: os metadados da mídia são completados depois, em segundo plano
+    values = build_rating_values(db, media_type, media_id, rating, data["comment"], user_id, card=data)
+    item = RATING_MODELS[media_type](**values)
 
     db.add(item)
-    db.commit()
+    record_rating_change(db, media_type, media_id, added=rating)
+    activity_id = record_activity(db, user_id, ACTIVITY_RATING, media_type, media_id, title=values["title"], rating=rating)
+    tasks.append((_update_recommender, [(user_id, media_type, media_id, rating)]))
+    tasks.append((fan_out_activity, activity_id, user_id))
+    tasks.append((request_enrichment,))
+    return item
+
+@write_handler("update_rating")
+def _apply_update_rating(db: Session, data: dict, tasks: list):
+    media_type, media_id, user_id, rating = data["media_type"], data["media_id"], data["user_id"], data["rating"]
+    item = _find_rating(db, media_type, media_id, user_id)
+    if not item:
+        raise _rating_not_found(media_type)
+
+    # Atualiza nota (e o agregado da comunidade, trocando a nota antiga pela nova)
+    if media_type == "anime":
+        old_rating, item.score = item.score, rating
+    else:
+        old_rating, item.rating = item.rating, rating
+    record_rating_change(db, media_type, media_id, added=rating, removed=old_rating)
+    tasks.append((_update_recommender, [(user_id, media_type, media_id, rating)]))
+
+    # Atualiza comentário
+    if data["comment"] is not None:
+        item.comment = data["comment"]
+    return item
+
+@write_handler("delete_rating")
+def _apply_delete_rating(db: Session, data: dict, tasks: list):
+    media_type, media_id, user_id = data["media_type"], data["media_id"], data["user_id"]
+    item = _find_rating(db, media_type, media_id, user_id)
+    if not item:
+        raise _rating_not_found(media_type)
+
+    old_rating = item.score if media_type == "anime" else item.rating
+    db.delete(item)
+    record_rating_change(db, media_type, media_id, removed=old_rating)
+    tasks.append((_update_recommender, [(user_id, media_type, media_id, None)]))
+    return item
+
+# --- Avaliar mídia ---
+@media_router.post("/rate", summary="Avalia uma mídia e salva no banco de dados", dependencies=[query_budget(8)])
+def rate(request: RateRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    media_type = request.media_type.lower()
+    media_id = request.media_id
+    rating = request.rating
+    user_id = request.user_id
+
+    _validate_rating_request(db, media_type, user_id, rating)
+    data = {
+        "media_type": media_type, "media_id": media_id, "rating": rating, "comment": request.comment, "user_id": user_id,
+        # Card da mídia (opcional), para o stub da tabela media
+        "title": _media_title(request.title) if request.title else None,
+        "poster_path": request.poster_path, "backdrop_path": request.backdrop_path,
+        "overview": request.overview, "release_date": request.release_date,
+    }
+
+    if write_behind_enabled():
+        entity = _rating_entity(media_type, media_id)
+        exists, in_db, _ = _pending_state(db, user_id, entity, lambda: _find_rating(db, media_type, media_id, user_id))
+        if exists:
+            raise _rating_exists(media_type)
+        return _queued(enqueue_write("rate", user_id, entity, data, present=True, base=in_db))
+
+    tasks = []
+    item = _apply_rate(db, data, tasks)
+    with span("db.commit"):
+        db.commit()
     db.refresh(item)
+    _run_tasks(background_tasks, tasks)
 
     return {
         "message": f"{media_type} avaliado",
@@ -213,79 +363,153 @@ def rate(request: RateRequest, db: Session = Depends(get_db)):
         "type": media_type
     }
 
-@media_router.post("/rate/user/get", summary="Obtém todas as mídias avaliadas por um usuário")
-def get_user_ratings(request: UserIdRequest, db: Session = Depends(get_db)):
-    user_id = request.user_id
-
-    # Busca as avaliações em cada tabela, filtrando pelo ID do usuário
-    rated_movies = db.query(MovieModel).filter(MovieModel.user_id == user_id).all()
-    rated_series = db.query(SeriesModel).filter(SeriesModel.user_id == user_id).all()
-    rated_animes = db.query(AnimeModel).filter(AnimeModel.user_id == user_id).all()
+def _get_user_ratings(db: Session, user_id: int):
+    # Busca as avaliações em cada tabela, filtrando pelo ID do usuário.
+    # joinedload traz os metadados compartilhados (tabela media) na mesma query.
+    rated_movies = db.query(MovieModel).options(joinedload(MovieModel.media)).filter(MovieModel.user_id == user_id).all()
+    rated_series = db.query(SeriesModel).options(joinedload(SeriesModel.media)).filter(SeriesModel.user_id == user_id).all()
+    rated_animes = db.query(AnimeModel).options(joinedload(AnimeModel.media)).filter(AnimeModel.user_id == user_id).all()
 
     all_ratings = []
 
     # Processa os filmes, adicionando o tipo e convertendo para um formato adequado
     for movie in rated_movies:
         movie_data = {c.name: getattr(movie, c.name) for c in movie.__table__.columns}
+        merge_media_fields("movie", movie_data, movie.media)
         movie_data["type"] = "movie"
         all_ratings.append(movie_data)
 
     # Processa as séries
     for serie in rated_series:
         serie_data = {c.name: getattr(serie, c.name) for c in serie.__table__.columns}
+        merge_media_fields("serie", serie_data, serie.media)
         serie_data["type"] = "serie"
         all_ratings.append(serie_data)
 
     # Processa os animes
     for anime in rated_animes:
         anime_data = {c.name: getattr(anime, c.name) for c in anime.__table__.columns}
+        merge_media_fields("anime", anime_data, anime.media)
         anime_data["type"] = "anime"
         all_ratings.append(anime_data)
         
-    return {"results": all_ratings}
+    return {"results": _apply_rating_overlay(all_ratings, user_id)}
 
-# --- Atualizar avaliação ---
-@media_router.put("/rate/update", summary="Atualiza a avaliação de uma mídia já existente")
-def update_rating(request: UpdateRatingRequest, db: Session = Depends(get_db)):
-    media_type = request.media_type.lower()
-    media_id = request.media_id
-    rating = request.rating
-    user_id = request.user_id
+def _apply_rating_overlay(ratings: list, user_id: int):
+    """Read-your-writes: aplica as avaliações ainda na fila do write-behind (marcadas com "pending")."""
+    pending = {entity: state for entity, state in get_overlay(user_id).items() if entity.startswith("rating:")}
+    if not pending:
+        return ratings
+
+    def pending_fields(media_type: str, data: dict):
+        rating_column = "score" if media_type == "anime" else "rating"
+        return {rating_column: data.get("rating"), "comment": data.get("comment"), "pending": True}
+
+    results = []
+    for rating in ratings:
+        media_type = rating["type"]
+        state = pending.pop(_rating_entity(media_type, rating[f"{media_type}_id"]), None)
+        if state is None:
+            results.append(rating)
+        elif state["present"]:
+            results.append({**rating, **pending_fields(media_type, state["data"])})
+    for state in pending.values():
+        data = state["data"]
+        if state["present"]:
+            media_type = data["media_type"]
+            results.append({
+                f"{media_type}_id": data["media_id"], "user_id": user_id,
+                "title": data.get("title"), "poster_path": data.get("poster_path"),
+                **pending_fields(media_type, data), "type": media_type,
+            })
+    return results
+
+@media_router.get("/rate/user/{user_id}", summary="Obtém todas as mídias avaliadas por um usuário (GET)", dependencies=[query_budget(3)])
+def get_user_ratings_get(user_id: int, request: Request, db: Session = Depends(get_db)):
+    return cached_json_response(request, _get_user_ratings(db, user_id), 0, private=True)
+
+@media_router.post("/rate/user/get", summary="Obtém todas as mídias avaliadas por um usuário", dependencies=[query_budget(3)])
+def get_user_ratings(request: UserIdRequest, db: Session = Depends(get_db)):
+    return _get_user_ratings(db, request.user_id)
 
-    user = db.query(UserModel).filter(UserModel.id == user_id).first()
+# --- Importação / exportação de avaliações ---
+@media_router.post("/rate/import", status_code=202, summary="Importa avaliações em lote (CSV/JSON do CineList, Letterboxd ou MyAnimeList)", dependencies=[query_budget(1)])
+def import_ratings(
+    background_tasks: BackgroundTasks,
+    user_id: int = Form(...),
+    fmt: str = Form("cinelist_csv", alias="format"),
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+):
+    fmt = fmt.lower()
+    if fmt not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato inválido. Use um de: {', '.join(IMPORT_FORMATS)}")
+
+    user = db.query(UserModel.id).filter(UserModel.id == user_id, UserModel.deleted_at.is_(None)).first()
     if not user:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
-    if not 0 <= rating <= 10:
-        raise HTTPException(status_code=400, detail="A nota deve estar entre 0 e 10.")
 
-    model_map = {"movie": MovieModel, "serie": SeriesModel, "anime": AnimeModel}
-    if media_type not in model_map:
-        raise HTTPException(status_code=400, detail="Tipo de mídia inválido")
+    # Copia o upload para um arquivo temporário: o job roda depois que a requisição termina
+    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{fmt}") as tmp:
+        shutil.copyfileobj(file.file, tmp)
 
-    model = model_map[media_type]
-    
-    if media_type == "anime":
-        item = db.query(model).filter(model.anime_id == media_id, model.user_id == user_id).first()
-    elif media_type == "movie":
-        item = db.query(model).filter(model.movie_id == media_id, model.user_id == user_id).first()
-    else:  # serie
-        item = db.query(model).filter(model.serie_id == media_id, model.user_id == user_id).first()
+    job_id = create_job("rating_import", user_id=user_id, format=fmt)
+    background_tasks.add_task(run_import_job, job_id, tmp.name, fmt, user_id)
 
-    if not item:
-        raise HTTPException(status_code=404, detail=f"{media_type.capitalize()} não encontrado no banco de dados para este usuário")
+    return {"job_id": job_id, "status": "queued"}
 
-    # Atualiza nota
-    if media_type == "anime":
-        item.score = rating
-    else:
-        item.rating = rating
+@media_router.get("/rate/import/{job_id}", summary="Progresso de uma importação de avaliações")
+def get_import_status(job_id: str):
+    job = get_job(job_id)
+    if not job or job.get("kind") != "rating_import":
+        raise HTTPException(status_code=404, detail="Importação não encontrada")
+    return job
 
-    # Atualiza comentário
-    if request.comment is not None:
-        item.comment = request.comment
+@media_router.get("/rate/export/{user_id}", summary="Exporta todas as avaliações de um usuário (streaming)", dependencies=[query_budget(1)])
+def export_ratings(user_id: int, fmt: str = Query("csv", alias="format"), db: Session = Depends(get_db)):
+    fmt = fmt.lower()
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato inválido. Use um de: {', '.join(EXPORT_FORMATS)}")
+
+    user = db.query(UserModel.id).filter(UserModel.id == user_id, UserModel.deleted_at.is_(None)).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+
+    media_type = "text/csv" if fmt == "csv" else "application/json"
+    return StreamingResponse(
+        iter_export(user_id, fmt),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="cinelist-avaliacoes-{user_id}.{fmt}"'},
+    )
+
+# --- Atualizar avaliação ---
+@media_router.put("/rate/update", summary="Atualiza a avaliação de uma mídia já existente", dependencies=[query_budget(5)])
+def update_rating(request: UpdateRatingRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    media_type = request.media_type.lower()
+    media_id = request.media_id
+    rating = request.rating
+    user_id = request.user_id
+
+    _validate_rating_request(db, media_type, user_id, rating)
+    data = {"media_type": media_type, "media_id": media_id, "rating": rating, "comment": request.comment, "user_id": user_id}
 
+    if write_behind_enabled():
+        entity = _rating_entity(media_type, media_id)
+        exists, in_db, current = _pending_state(db, user_id, entity, lambda: _find_rating(db, media_type, media_id, user_id))
+        if not exists:
+            raise _rating_not_found(media_type)
+        if not isinstance(current, dict):
+            current = {"media_type": media_type, "media_id": media_id, "title": current.title, "comment": current.comment}
+        shown = {**current, "rating": rating}
+        if request.comment is not None:
+            shown["comment"] = request.comment
+        return _queued(enqueue_write("update_rating", user_id, entity, data, present=True, base=in_db, shown=shown))
+
+    tasks = []
+    item = _apply_update_rating(db, data, tasks)
     db.commit()
     db.refresh(item)
+    _run_tasks(background_tasks, tasks)
 
     return {
         "message": f"Avaliação de {media_type} atualizada",
@@ -297,32 +521,26 @@ def update_rating(request: UpdateRatingRequest, db: Session = Depends(get_db)):
     }
 
 # --- Deletar avaliação ---
-@media_router.delete("/rate/delete", summary="Remove a mídia e sua avaliação do banco")
-def delete_rating(request: DeleteRequest, db: Session = Depends(get_db)):
+@media_router.delete("/rate/delete", summary="Remove a mídia e sua avaliação do banco", dependencies=[query_budget(4)])
+def delete_rating(request: DeleteRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     media_type = request.media_type.lower()
     media_id = request.media_id
     user_id = request.user_id
 
-    user = db.query(UserModel).filter(UserModel.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    _validate_rating_request(db, media_type, user_id, None)
+    data = {"media_type": media_type, "media_id": media_id, "user_id": user_id}
 
-    model_map = {"movie": MovieModel, "serie": SeriesModel, "anime": AnimeModel}
-    if media_type not in model_map:
-        raise HTTPException(status_code=400, detail="Tipo de mídia inválido")
-
-    model = model_map[media_type]
-    if media_type == "anime":
-        item = db.query(model).filter(model.anime_id == media_id, model.user_id == user_id).first()
-    elif media_type == "movie":
-        item = db.query(model).filter(model.movie_id == media_id, model.user_id == user_id).first()
-    else:  # serie
-        item = db.query(model).filter(model.serie_id == media_id, model.user_id == user_id).first()
-    if not item:
-        raise HTTPException(status_code=404, detail=f"{media_type.capitalize()} não encontrado no banco de dados para este usuário")
+    if write_behind_enabled():
+        entity = _rating_entity(media_type, media_id)
+        exists, in_db, _ = _pending_state(db, user_id, entity, lambda: _find_rating(db, media_type, media_id, user_id))
+        if not exists:
+            raise _rating_not_found(media_type)
+        return _queued(enqueue_write("delete_rating", user_id, entity, data, present=False, base=in_db))
 
-    db.delete(item)
+    tasks = []
+    item = _apply_delete_rating(db, data, tasks)
     db.commit()
+    _run_tasks(background_tasks, tasks)
 
     return {
         "message": f"{media_type.capitalize()} removido do banco de dados",
@@ -333,9 +551,9 @@ def delete_rating(request: DeleteRequest, db: Session = Depends(get_db)):
 
 
 # --- Criar lista ---
-@media_router.post("/listas/create", response_model=ListaOut, summary="Cria uma nova lista para o usuário")
+@media_router.post("/listas/create", response_model=ListaOut, summary="Cria uma nova lista para o usuário", dependencies=[query_budget(3)])
 def create_lista(request: ListaCreate, db: Session = Depends(get_db)):
-    user = db.query(UserModel).filter(UserModel.id == request.user_id).first()
+    user = db.query(UserModel).filter(UserModel.id == request.user_id, UserModel.deleted_at.is_(None)).first()
     if not user:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
     nova_lista = ListaModel(**request.model_dump())
@@ -344,118 +562,500 @@ def create_lista(request: ListaCreate, db: Session = Depends(get_db)):
     db.refresh(nova_lista)
     return nova_lista
 
-# --- Adicionar item na lista ---
-@media_router.post("/listas/item/add", response_model=ListaItemOut, summary="Adiciona uma mídia em uma lista")
-def add_item(request: ListaItemCreate, db: Session = Depends(get_db)):
-    lista = db.query(ListaModel).filter(ListaModel.id == request.lista_id).first()
-    if not lista:
-        raise HTTPException(status_code=404, detail="Lista não encontrada")
-    existente = db.query(ListaItemModel).filter(
-        ListaItemModel.lista_id == request.lista_id,
-        ListaItemModel.media_id == request.media_id,
-        ListaItemModel.media_type == request.media_type
-    ).first()
-    if existente:
-        raise HTTPException(status_code=409, detail="Essa mídia já está na lista")
+def _media_title(title: str | dict | None):
+    """Título normalizado (a AniList manda um dict com as variações)."""
+    if isinstance(title, dict):
+        return title.get("romaji") or title.get("english") or UNTITLED
+    return title or UNTITLED
 
-    media_title_str = ""
-    if isinstance(request.title, dict):
-        media_title_str = request.title.get("romaji") or request.title.get("english") or "Sem título"
-    else:
-        media_title_str = request.title or "Sem título"
+def _lista_item_values(lista_id: int, item: ListaItemData):
+    """Monta as colunas de um item de lista a partir dos dados enviados pelo front."""
+    media_title_str = _media_title(item.title)
 
-    novo_item = ListaItemModel(
-        lista_id=request.lista_id,
-        media_type=request.media_type,
-        media_id=request.media_id,
+    return {
+        "lista_id": lista_id,
+        "media_type": item.media_type,
+        "media_id": item.media_id,
         
         # --- Usando os dados do request ---
-        media_title=media_title_str, # O título normalizado
-        poster_path=request.poster_path,
-        backdrop_path=request.backdrop_path,
-        overview=request.overview,
-        vote_average=request.vote_average,
+        "media_title": media_title_str, # O título normalizado
+        "poster_path": item.poster_path,
+        "backdrop_path": item.backdrop_path,
+        "overview": item.overview,
+        "vote_average": item.vote_average,
         
         # --- Usando os dados de data do request ---
-        release_date=request.release_date,
-        first_air_date=request.first_air_date,
-        startDate=request.startDate
+        "release_date": item.release_date,
+        "first_air_date": item.first_air_date,
+        "startDate": item.startDate,
+
+        # Referência aos metadados compartilhados, resolvida no próprio INSERT
+        "media_ref_id": media_ref_subquery_for(item.media_type, item.media_id),
+    }
+
+def _media_stub(values: dict):
+    """Dados básicos da mídia (vindos do card do front) para a tabela media."""
+    return {
+        "media_type": values["media_type"],
+        "external_id": values["media_id"],
+        "title": values["media_title"],
+        "overview": values["overview"],
+        "release_date": values["release_date"] or values["first_air_date"],
+        "poster_path": values["poster_path"],
+        "backdrop_path": values["backdrop_path"],
+    }
+
+def _next_position(lista_id: int):
+    """Subquery com a próxima posição livre da lista (calculada no próprio INSERT)."""
+    return (
+        select(func.coalesce(func.max(ListaItemModel.position), 0) + 1)
+        .where(ListaItemModel.lista_id == lista_id)
+        .scalar_subquery()
     )
+
+def _item_entity(lista_id: int, media_type: str, media_id: int):
+    return f"item:{lista_id}:{media_type}:{media_id}"
+
+def _find_item(db: Session, lista_id: int, media_type: str, media_id: int):
+    return db.query(ListaItemModel).filter(
+        ListaItemModel.lista_id == lista_id,
+        ListaItemModel.media_id == media_id,
+        ListaItemModel.media_type == media_type
+    ).first()
+
+def _item_detail(values: dict):
+    """Item no formato de /listas/{lista_id} (usado também pelo overlay do write-behind)."""
+    return {
+        "id": values["media_id"],
+        "media_type": values["media_type"],
+        "type": values["media_type"],
+        "title": values["media_title"],
+        "poster_path": values["poster_path"],
+        "backdrop_path": values["backdrop_path"],
+        "overview": values["overview"],
+        "vote_average": values["vote_average"],
+        "release_date": values["release_date"],
+        "first_air_date": values["first_air_date"],
+        "startDate": values["startDate"],
+    }
+
+@write_handler("add_item")
+def _apply_add_item(db: Session, data: dict, tasks: list):
+    request = ListaItemCreate(**data)
+    lista = db.query(ListaModel).filter(ListaModel.id == request.lista_id).first()
+    if not lista:
+        raise HTTPException(status_code=404, detail="Lista não encontrada")
+    if _find_item(db, request.lista_id, request.media_type, request.media_id):
+        raise HTTPException(status_code=409, detail="Essa mídia já está na lista")
+
+    values = _lista_item_values(request.lista_id, request)
+    insert_media_stubs(db, [_media_stub(values)])
+    novo_item = ListaItemModel(**values, position=_next_position(request.lista_id))
     
     db.add(novo_item)
+    owner_id = lista.user_id
+    activity_id = record_activity(
+        db, owner_id, ACTIVITY_LIST_ITEM, request.media_type, request.media_id,
+        title=values["media_title"], lista_id=request.lista_id,
+    )
+    tasks.append((fan_out_activity, activity_id, owner_id))
+    return novo_item
+
+@write_handler("delete_item")
+def _apply_delete_item(db: Session, data: dict, tasks: list):
+    lista = db.query(ListaModel).filter(
+        ListaModel.id == data["lista_id"],
+        ListaModel.user_id == data["user_id"]
+    ).first()
+    if not lista:
+        raise HTTPException(status_code=404, detail="Lista não encontrada para este usuário")
+    item = _find_item(db, data["lista_id"], data["media_type"], data["media_id"])
+    if not item:
+        raise HTTPException(status_code=404, detail="Item não encontrado na lista")
+    db.delete(item)
+
+# --- Adicionar item na lista ---
+@media_router.post("/listas/item/add", response_model=ListaItemOut, summary="Adiciona uma mídia em uma lista", dependencies=[query_budget(6)])
+def add_item(request: ListaItemCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    if write_behind_enabled():
+        lista = db.query(ListaModel.user_id).filter(ListaModel.id == request.lista_id).first()
+        if not lista:
+            raise HTTPException(status_code=404, detail="Lista não encontrada")
+        entity = _item_entity(request.lista_id, request.media_type, request.media_id)
+        exists, in_db, _ = _pending_state(
+            db, lista.user_id, entity, lambda: _find_item(db, request.lista_id, request.media_type, request.media_id)
+        )
+        if exists:
+            raise HTTPException(status_code=409, detail="Essa mídia já está na lista")
+        values = {**request.model_dump(), "media_title": _media_title(request.title)}
+        return _queued(enqueue_write(
+            "add_item", lista.user_id, entity, request.model_dump(), present=True, base=in_db, shown=_item_detail(values),
+        ))
+
+    tasks = []
+    novo_item = _apply_add_item(db, request.model_dump(), tasks)
     db.commit()
     db.refresh(novo_item)
+    _run_tasks(background_tasks, tasks)
     return novo_item
 
 # --- Remover item da lista ---
-@media_router.delete("/listas/item/delete", summary="Remove uma mídia de uma lista")
+@media_router.delete("/listas/item/delete", summary="Remove uma mídia de uma lista", dependencies=[query_budget(3)])
 def delete_item(request: DeleteItemRequest, db: Session = Depends(get_db)):
-    lista = db.query(ListaModel).filter(
+    if write_behind_enabled():
+        lista = db.query(ListaModel.id).filter(
+            ListaModel.id == request.lista_id,
+            ListaModel.user_id == request.user_id
+        ).first()
+        if not lista:
+            raise HTTPException(status_code=404, detail="Lista não encontrada para este usuário")
+        entity = _item_entity(request.lista_id, request.media_type, request.media_id)
+        exists, in_db, _ = _pending_state(
+            db, request.user_id, entity, lambda: _find_item(db, request.lista_id, request.media_type, request.media_id)
+        )
+        if not exists:
+            raise HTTPException(status_code=404, detail="Item não encontrado na lista")
+        return _queued(enqueue_write("delete_item", request.user_id, entity, request.model_dump(), present=False, base=in_db))
+
+    _apply_delete_item(db, request.model_dump(), [])
+    db.commit()
+    return {"message": "Item removido da lista"}
+
+@media_router.get("/writes/{write_id}", summary="Situação de uma alteração enfileirada no modo write-behind (queued, done ou failed)")
+def get_write_status(write_id: str):
+    job = get_job(write_id)
+    if not job or job.get("kind") != "write":
+        raise HTTPException(status_code=404, detail="Alteração não encontrada")
+    return {key: job.get(key) for key in ("id", "write_kind", "status", "error")}
+
+# --- Operações em lote nas listas ---
+# Cada operação roda numa única transação, com uma instrução SQL para o lote inteiro
+# (em vez de lookup + checagem + insert + commit por item).
+
+@media_router.post("/listas/item/add/bulk", response_model=BulkOperationResult, summary="Adiciona várias mídias em uma lista de uma vez", dependencies=[query_budget(3)])
+def add_items_bulk(request: ListaItemBulkCreate, db: Session = Depends(get_db)):
+    # Confere a lista e já traz a próxima posição livre na mesma query
+    lista = db.query(ListaModel.id, _next_position(request.lista_id)).filter(
+        ListaModel.id == request.lista_id
+    ).first()
+    if not lista:
+        raise HTTPException(status_code=404, detail="Lista não encontrada")
+    next_position = lista[1]
+
+    results = []
+    rows = []
+    seen = set()
+    for item in request.itens:
+        key = (item.media_type, item.media_id)
+        if key in seen:
+            results.append({"media_id": item.media_id, "media_type": item.media_type, "status": "duplicate"})
+            continue
+        seen.add(key)
+        rows.append(_lista_item_values(request.lista_id, item))
+        results.append({"media_id": item.media_id, "media_type": item.media_type, "status": None})
+
+    # Posições em sequência a partir da última posição atual da lista
+    for offset, row in enumerate(rows):
+        row["position"] = next_position + offset
+
+    insert_media_stubs(db, [_media_stub(row) for row in rows])
+
+    # INSERT multi-linha; o que já estava na lista é ignorado pelo índice único
+    stmt = dialect_insert(db, ListaItemModel).values(rows).on_conflict_do_nothing(
+        index_elements=["lista_id", "media_type", "media_id"]
+    ).returning(ListaItemModel.media_type, ListaItemModel.media_id)
+    inserted = {(row.media_type, row.media_id) for row in db.execute(stmt)}
+    db.commit()
+
+    for result in results:
+        if result["status"] is None:
+            added = (result["media_type"], result["media_id"]) in inserted
+            result["status"] = "added" if added else "duplicate"
+
+    return {"lista_id": request.lista_id, "results": results}
+
+@media_router.delete("/listas/item/delete/bulk", response_model=BulkOperationResult, summary="Remove várias mídias de uma lista de uma vez", dependencies=[query_budget(2)])
+def delete_items_bulk(request: ListaItemBulkDelete, db: Session = Depends(get_db)):
+    lista_exists = db.query(ListaModel.id).filter(
         ListaModel.id == request.lista_id,
         ListaModel.user_id == request.user_id
     ).first()
-    if not lista:
+    if not lista_exists:
         raise HTTPException(status_code=404, detail="Lista não encontrada para este usuário")
-    item = db.query(ListaItemModel).filter(
+
+    keys = [(item.media_type, item.media_id) for item in request.itens]
+    stmt = delete(ListaItemModel).where(
         ListaItemModel.lista_id == request.lista_id,
-        ListaItemModel.media_id == request.media_id,
-        ListaItemModel.media_type == request.media_type
+        tuple_(ListaItemModel.media_type, ListaItemModel.media_id).in_(keys),
+    ).returning(ListaItemModel.media_type, ListaItemModel.media_id)
+    removed = {(row.media_type, row.media_id) for row in db.execute(stmt)}
+    db.commit()
+
+    results = [
+        {
+            "media_id": item.media_id,
+            "media_type": item.media_type,
+            "status": "removed" if (item.media_type, item.media_id) in removed else "not_found",
+        }
+        for item in request.itens
+    ]
+    return {"lista_id": request.lista_id, "results": results}
+
+@media_router.put("/listas/reorder", response_model=BulkOperationResult, summary="Reordena os itens de uma lista", dependencies=[query_budget(3)])
+def reorder_lista(request: ListaReorderRequest, db: Session = Depends(get_db)):
+    lista_exists = db.query(ListaModel.id).filter(
+        ListaModel.id == request.lista_id,
+        ListaModel.user_id == request.user_id
     ).first()
-    if not item:
-        raise HTTPException(status_code=404, detail="Item não encontrado na lista")
-    db.delete(item)
+    if not lista_exists:
+        raise HTTPException(status_code=404, detail="Lista não encontrada para este usuário")
+
+    existing = {
+        (row.media_type, row.media_id)
+        for row in db.query(ListaItemModel.media_type, ListaItemModel.media_id).filter(
+            ListaItemModel.lista_id == request.lista_id
+        )
+    }
+
+    # Um único UPDATE com CASE: os itens enviados ganham as posições 1..N,
+    # os que não vieram no request vão para depois, mantendo a ordem relativa
+    ordered = []
+    for item in request.itens:
+        key = (item.media_type, item.media_id)
+        if key in existing and key not in ordered:
+            ordered.append(key)
+
+    whens = [
+        (and_(ListaItemModel.media_type == media_type, ListaItemModel.media_id == media_id), position)
+        for position, (media_type, media_id) in enumerate(ordered, start=1)
+    ]
+    # Itens antigos sem posição vão para o fim, na ordem de inserção
+    trailing = len(ordered) + func.coalesce(ListaItemModel.position, len(existing) + ListaItemModel.id)
+    new_position = case(*whens, else_=trailing) if whens else trailing
+    db.execute(
+        update(ListaItemModel)
+        .where(ListaItemModel.lista_id == request.lista_id)
+        .values(position=new_position)
+        .execution_options(synchronize_session=False)
+    )
     db.commit()
-    return {"message": "Item removido da lista"}
+
+    results = [
+        {
+            "media_id": item.media_id,
+            "media_type": item.media_type,
+            "status": "moved" if (item.media_type, item.media_id) in existing else "not_found",
+        }
+        for item in request.itens
+    ]
+    return {"lista_id": request.lista_id, "results": results}
+
+def _copy_items_stmt(db: Session, source_lista_id: int, target_lista_id: int):
+    """INSERT ... SELECT que copia os itens de uma lista para outra, ignorando os que já existem no destino."""
+    columns = [
+        "media_type", "media_id", "media_title", "poster_path", "backdrop_path",
+        "overview", "vote_average", "release_date", "first_air_date", "startDate", "media_ref_id",
+    ]
+    source = select(
+        *[getattr(ListaItemModel, c) for c in columns],
+        literal(target_lista_id, Integer).label("lista_id"),
+        # Os itens copiados entram depois dos que já estão no destino, na ordem da origem
+        (
+            select(func.coalesce(func.max(ListaItemModel.position), 0))
+            .where(ListaItemModel.lista_id == target_lista_id)
+            .scalar_subquery()
+            + func.row_number().over(order_by=(
+                ListaItemModel.position.is_(None), ListaItemModel.position, ListaItemModel.id
+            ))
+        ).label("position"),
+    ).where(ListaItemModel.lista_id == source_lista_id)
+
+    return dialect_insert(db, ListaItemModel).from_select(
+        columns + ["lista_id", "position"], source
+    ).on_conflict_do_nothing(
+        index_elements=["lista_id", "media_type", "media_id"]
+    ).returning(ListaItemModel.media_type, ListaItemModel.media_id)
+
+@media_router.post("/listas/clone", response_model=BulkOperationResult, summary="Cria uma cópia de uma lista (com todos os itens) para o usuário", dependencies=[query_budget(4)])
+def clone_lista(request: ListaCloneRequest, db: Session = Depends(get_db)):
+    origem = db.query(ListaModel).filter(ListaModel.id == request.lista_id).first()
+    if not origem:
+        raise HTTPException(status_code=404, detail="Lista não encontrada")
+    user_exists = db.query(UserModel.id).filter(UserModel.id == request.user_id, UserModel.deleted_at.is_(None)).first()
+    if not user_exists:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+
+    nova_lista = ListaModel(
+        nome=request.nome or origem.nome,
+        description=request.description if request.description is not None else origem.description,
+        user_id=request.user_id,
+    )
+    db.add(nova_lista)
+    db.flush() # gera o id da nova lista sem fechar a transação
+    nova_lista_id = nova_lista.id
+
+    copied = db.execute(_copy_items_stmt(db, origem.id, nova_lista_id)).all()
+    db.commit()
+
+    results = [{"media_id": row.media_id, "media_type": row.media_type, "status": "added"} for row in copied]
+    return {"lista_id": nova_lista_id, "results": results}
+
+@media_router.post("/listas/merge", response_model=BulkOperationResult, summary="Copia os itens de uma lista para outra (opcionalmente removendo a origem)", dependencies=[query_budget(4)])
+def merge_listas(request: ListaMergeRequest, db: Session = Depends(get_db)):
+    if request.source_lista_id == request.target_lista_id:
+        raise HTTPException(status_code=400, detail="As listas de origem e destino devem ser diferentes")
+
+    listas = db.query(ListaModel).filter(
+        ListaModel.id.in_([request.source_lista_id, request.target_lista_id])
+    ).all()
+    by_id = {lista.id: lista for lista in listas}
+    destino = by_id.get(request.target_lista_id)
+    origem = by_id.get(request.source_lista_id)
+    if not destino or destino.user_id != request.user_id:
+        raise HTTPException(status_code=404, detail="Lista de destino não encontrada para este usuário")
+    if not origem:
+        raise HTTPException(status_code=404, detail="Lista de origem não encontrada")
+    if request.delete_source and origem.user_id != request.user_id:
+        raise HTTPException(status_code=403, detail="Só é possível remover a lista de origem se ela for do usuário")
+
+    origem_id, destino_id = origem.id, destino.id
+    copied = db.execute(_copy_items_stmt(db, origem_id, destino_id)).all()
+    added = {(row.media_type, row.media_id) for row in copied}
+
+    source_items = db.query(ListaItemModel.media_type, ListaItemModel.media_id).filter(
+        ListaItemModel.lista_id == origem_id
+    ).all()
+
+    if request.delete_source:
+        db.execute(delete(ListaModel).where(ListaModel.id == origem_id))
+    db.commit()
+
+    results = [
+        {
+            "media_id": row.media_id,
+            "media_type": row.media_type,
+            "status": "added" if (row.media_type, row.media_id) in added else "duplicate",
+        }
+        for row in source_items
+    ]
+    return {"lista_id": destino_id, "results": results}
 
 # --- Obter UMA lista com itens DETALHADOS ---
-@media_router.post("/listas/get", response_model=ListaWithDetailedItens, summary="Retorna uma lista com seus itens já salvos no DB")
-def get_lista(request: ListaIdRequest, db: Session = Depends(get_db)):
+def _pending_items(user_id: int, lista_id: int, overlay: dict | None = None):
+    """Itens da lista com escrita pendente no write-behind: {entidade: estado}."""
+    if overlay is None:
+        overlay = get_overlay(user_id)
+    prefix = f"item:{lista_id}:"
+    return {entity: state for entity, state in overlay.items() if entity.startswith(prefix)}
+
+def _get_lista_detail(db: Session, lista_id: int):
+    # selectinload: 1 query para a lista + 1 para todos os itens (sem duplicar a linha da lista por item)
     lista = db.query(ListaModel).options(
-        joinedload(ListaModel.itens)
-    ).filter(ListaModel.id == request.lista_id).first()
+        selectinload(ListaModel.itens)
+    ).filter(ListaModel.id == lista_id).first()
     
     if not lista:
         raise HTTPException(status_code=404, detail="Lista não encontrada")
     
     items_from_db = []
     for item in lista.itens:
-        item_data = {
-            "id": item.media_id,
-            "media_type": item.media_type,
-            "type": item.media_type,
-            "title": item.media_title,
-            "poster_path": item.poster_path,
-            "backdrop_path": item.backdrop_path,
-            "overview": item.overview,
-            "vote_average": item.vote_average,
-            "release_date": item.release_date,
-            "first_air_date": item.first_air_date,
-            "startDate": item.startDate,
-        }
-        
+        item_data = _item_detail({column.name: getattr(item, column.name) for column in item.__table__.columns})
         items_from_db.append(item_data)
 
+    # Read-your-writes: itens ainda na fila do write-behind
+    pending = _pending_items(lista.user_id, lista.id)
+    if pending:
+        items_from_db = [
+            item for item in items_from_db
+            if _item_entity(lista.id, item["media_type"], item["id"]) not in pending
+        ]
+        items_from_db += [state["data"] for state in pending.values() if state["present"]]
+
     response_data = {
         "id": lista.id,
         "nome": lista.nome,
         "description": lista.description,
         "user_id": lista.user_id,
-        "item_count": len(lista.itens),
+        "item_count": len(items_from_db),
         "itens": items_from_db
     }
     
     return response_data
 
+@media_router.get("/listas/{lista_id}", response_model=ListaWithDetailedItens, summary="Retorna uma lista com seus itens (GET)", dependencies=[query_budget(2)])
+def get_lista_get(lista_id: int, request: Request, db: Session = Depends(get_db)):
+    lista = ListaWithDetailedItens.model_validate(_get_lista_detail(db, lista_id))
+    return cached_json_response(request, lista.model_dump(mode="json"), 0, private=True)
+
+@media_router.post("/listas/get", response_model=ListaWithDetailedItens, summary="Retorna uma lista com seus itens já salvos no DB", dependencies=[query_budget(2)])
+def get_lista(request: ListaIdRequest, db: Session = Depends(get_db)):
+    return _get_lista_detail(db, request.lista_id)
+
 # --- Listar TODAS as listas de um usuário (versão RESUMIDA) ---
-@media_router.post("/listas/user/get", response_model=List[ListaWithItens], summary="Retorna todas as listas de um usuário")
-def get_listas_by_user(request: UserIdRequest, db: Session = Depends(get_db)):
-    listas = db.query(ListaModel).filter(ListaModel.user_id == request.user_id).all()
-    if not listas:
-        return []
+def _get_user_listas(db: Session, user_id: int):
+    # selectinload evita o N+1: os itens de todas as listas vêm numa única query extra
+    listas = db.query(ListaModel).options(
+        selectinload(ListaModel.itens)
+    ).filter(ListaModel.user_id == user_id).all()
+    listas = [ListaWithItens.model_validate(l).model_dump(mode="json") for l in listas]
+
+    # Read-your-writes: itens ainda na fila do write-behind (sem id até serem gravados)
+    overlay = get_overlay(user_id)
+    for lista in listas:
+        pending = _pending_items(user_id, lista["id"], overlay) if overlay else None
+        if not pending:
+            continue
+        lista["itens"] = [
+            item for item in lista["itens"]
+            if _item_entity(lista["id"], item["media_type"], item["media_id"]) not in pending
+        ]
+        lista["itens"] += [
+            {"id": None, "lista_id": lista["id"], "media_type": state["data"]["media_type"],
+             "media_id": state["data"]["id"], "media_title": state["data"]["title"]}
+            for state in pending.values() if state["present"]
+        ]
+        lista["item_count"] = len(lista["itens"])
     return listas
 
+@media_router.get("/listas/user/{user_id}", response_model=List[ListaWithItens], summary="Retorna todas as listas de um usuário (GET)", dependencies=[query_budget(2)])
+def get_listas_by_user_get(user_id: int, request: Request, db: Session = Depends(get_db)):
+    return cached_json_response(request, _get_user_listas(db, user_id), 0, private=True)
+
+@media_router.post("/listas/user/get", response_model=List[ListaWithItens], summary="Retorna todas as listas de um usuário", dependencies=[query_budget(2)])
+def get_listas_by_user(request: UserIdRequest, db: Session = Depends(get_db)):
+    return _get_user_listas(db, request.user_id)
+
+# --- Listar as listas de um usuário SEM os itens (só a contagem) ---
+@media_router.get("/listas/user/{user_id}/summary", response_model=List[ListaSummary], summary="Retorna as listas de um usuário com a contagem de itens, sem os itens", dependencies=[query_budget(1)])
+def get_listas_summary_by_user(user_id: int, request: Request, db: Session = Depends(get_db)):
+    # Subquery correlacionada: uma única consulta, usando o índice de lista_itens.lista_id
+    item_count = (
+        select(func.count(ListaItemModel.id))
+        .where(ListaItemModel.lista_id == ListaModel.id)
+        .correlate(ListaModel)
+        .scalar_subquery()
+    )
+    rows = db.query(ListaModel, item_count).filter(
+        ListaModel.user_id == user_id
+    ).order_by(ListaModel.id).all()
+
+    # Read-your-writes: soma os itens adicionados/removidos que ainda estão na fila do write-behind
+    overlay = get_overlay(user_id)
+    listas = []
+    for lista, count in rows:
+        if overlay:
+            count += sum(state["present"] - state["base"] for state in _pending_items(user_id, lista.id, overlay).values())
+        listas.append(ListaSummary(
+            id=lista.id,
+            nome=lista.nome,
+            description=lista.description,
+            user_id=lista.user_id,
+            item_count=count,
+        ).model_dump(mode="json"))
+    return cached_json_response(request, listas, 0, private=True)
+
 # --- Deletar lista e todos os itens ---
-@media_router.delete("/listas/delete", summary="Remove uma lista e todos os itens dela")
+@media_router.delete("/listas/delete", summary="Remove uma lista e todos os itens dela", dependencies=[query_budget(2)])
 def delete_lista(request: DeleteListRequest, db: Session = Depends(get_db)):
     lista = db.query(ListaModel).filter(
         ListaModel.id == request.lista_id,
@@ -1,14 +1,29 @@
 # app/api/routes/movie_router.py
-from fastapi import APIRouter
-from app.services.tmdb_service import get_popular_movies, search_movie
+from fastapi import APIRouter, Depends, Query, Request, Response
+from app.services.tmdb_service import get_popular_movies, search_movie, locale_params, resolve_locale, CACHE_LIST_TTL
 from app.schemas.requests import SearchRequest
+from app.core.http_cache import cached_json_response
+from app.core.pagination import encode_cursor, decode_offset_cursor
 
 movies_router = APIRouter()
 
-@movies_router.get("/", summary="Top 50 filmes populares")
-def list_top_movies():
-    return get_popular_movies(50)
+@movies_router.get("/", summary="Filmes populares (paginado: próxima página no header X-Next-Cursor)")
+def list_top_movies(
+    response: Response,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: str | None = Query(None, description="Valor do header X-Next-Cursor da página anterior"),
+    locale: tuple = Depends(locale_params),
+):
+    offset = decode_offset_cursor(cursor)
+    movies = get_popular_movies(limit, *locale, offset=offset)
+    if len(movies) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(offset + limit)
+    return movies
+
+@movies_router.get("/search", summary="Buscar filmes por nome (GET, cacheável)")
+def search_movies_get(request: Request, name: str = Query(..., min_length=1), locale: tuple = Depends(locale_params)):
+    return cached_json_response(request, search_movie(name, 30, *locale), CACHE_LIST_TTL)
 
 @movies_router.post("/search", summary="Buscar filmes por nome")
 def search_movies(req: SearchRequest):
-    return search_movie(req.name, limit=30)
\ No newline at end of file
+    return search_movie(req.name, 30, *resolve_locale(req.language, req.region))
@@ -1,14 +1,29 @@
 # app/api/routes/serie_router.py
-from fastapi import APIRouter
-from app.services.tmdb_service import get_popular_series, search_series
+from fastapi import APIRouter, Depends, Query, Request, Response
+from app.services.tmdb_service import get_popular_series, search_series, locale_params, resolve_locale, CACHE_LIST_TTL
 from app.schemas.requests import SearchRequest
+from app.core.http_cache import cached_json_response
+from app.core.pagination import encode_cursor, decode_offset_cursor
 
 series_router = APIRouter()
 
-@series_router.get("/", summary="Top 50 séries populares")
-def list_top_series():
-    return get_popular_series(50)
+@series_router.get("/", summary="Séries populares (paginado: próxima página no header X-Next-Cursor)")
+def list_top_series(
+    response: Response,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: str | None = Query(None, description="Valor do header X-Next-Cursor da página anterior"),
+    locale: tuple = Depends(locale_params),
+):
+    offset = decode_offset_cursor(cursor)
+    series = get_popular_series(limit, locale[0], offset=offset)
+    if len(series) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(offset + limit)
+    return series
+
+@series_router.get("/search", summary="Buscar séries por nome (GET, cacheável)")
+def search_series_get(request: Request, name: str = Query(..., min_length=1), locale: tuple = Depends(locale_params)):
+    return cached_json_response(request, search_series(name, 30, locale[0]), CACHE_LIST_TTL)
 
 @series_router.post("/search", summary="Buscar séries por nome")
 def search_series_route(req: SearchRequest):
-    return search_series(req.name, limit=30)
\ No newline at end of file
+    return search_series(req.name, 30, resolve_locale(req.language)[0])
@@ -1,34 +1,93 @@
 # app/api/routes/users_router.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import func, tuple_
 from sqlalchemy.orm import Session
 from typing import List
 
 from app.config import get_db
 from app.models.user import UserModel
-from app.schemas.user_schema import UserPublicOut
-from app.core.security import get_current_user
+from app.models.follow import FollowModel
+from app.schemas.user_schema import UserPublicOut, FeedPage
+from app.core.security import get_current_user, get_current_user_id
+from app.core.query_budget import query_budget
+from app.core.cache import get_from_cache, set_to_cache
+from app.core.pagination import encode_cursor, decode_cursor, escape_like
+from app.services.feed_service import follow_user, unfollow_user, get_feed
 
 # Novo router com prefixo /users
 users_router = APIRouter()
 
-@users_router.get("/get", response_model=List[UserPublicOut])
+# Por quanto tempo a contagem do diretório (X-Total-Count) fica em cache
+USER_COUNT_TTL = 60
+
+def _username_prefix(prefix: str):
+    # lower(username) LIKE 'abc%' usa o índice ix_users_username_lower_pattern
+    return func.lower(UserModel.username).like(f"{escape_like(prefix)}%", escape="\\")
+
+def _count_users(db: Session, prefix: str | None):
+    """Total de usuários (com o prefixo, se houver), em cache por USER_COUNT_TTL segundos."""
+    cache_key = f"users:count:{prefix or ''}"
+    total = get_from_cache(cache_key)
+    if total is None:
+        query = db.query(func.count(UserModel.id)).filter(UserModel.deleted_at.is_(None))
+        if prefix:
+            query = query.filter(_username_prefix(prefix))
+        total = query.scalar()
+        set_to_cache(cache_key, total, USER_COUNT_TTL)
+    return total
+
+@users_router.get("/get", response_model=List[UserPublicOut], dependencies=[query_budget(3)])
 def get_all_users(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = Query(None, description="Valor do header X-Next-Cursor da página anterior"),
+    q: str | None = Query(None, min_length=1, max_length=50, description="Prefixo do nome de usuário"),
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user)
 ):
-    users = db.query(UserModel).filter(
-        UserModel.id != current_user.id
-    ).order_by(UserModel.username).all()
+    # Keyset em (username, id), no índice ix_users_username_id: cada página custa o mesmo, não importa o tamanho da tabela
+    query = db.query(UserModel).filter(UserModel.id != current_user.id, UserModel.deleted_at.is_(None))
+
+    prefix = q.lower() if q else None
+    if prefix:
+        query = query.filter(_username_prefix(prefix))
+    if cursor:
+        username, user_id = decode_cursor(cursor, 2)
+        if not isinstance(username, str) or not isinstance(user_id, int):
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+        query = query.filter(tuple_(UserModel.username, UserModel.id) > tuple_(username, user_id))
+
+    users = query.order_by(UserModel.username, UserModel.id).limit(limit).all()
     
+    if len(users) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(users[-1].username, users[-1].id)
+
+    # O total exclui o próprio usuário logado, como a listagem
+    total = _count_users(db, prefix)
+    if not prefix or current_user.username.lower().startswith(prefix):
+        total -= 1
+    response.headers["X-Total-Count"] = str(max(total, 0))
+
     return users
 
-@users_router.get("/{user_id}", response_model=UserPublicOut)
+# --- Feed de atividades de quem o usuário segue ---
+@users_router.get("/me/feed", response_model=FeedPage, dependencies=[query_budget(3)])
+def get_my_feed(
+    limit: int = Query(20, ge=1, le=100),
+    before: int | None = Query(None, description="Cursor: id do último evento da página anterior"),
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    events, next_cursor = get_feed(db, current_user_id, limit, before)
+    return {"results": events, "next_cursor": next_cursor}
+
+@users_router.get("/{user_id}", response_model=UserPublicOut, dependencies=[query_budget(1)])
 def get_user_by_id(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_user) # Garante que só usuários logados vejam
+    current_user_id: int = Depends(get_current_user_id) # Garante que só usuários logados vejam (sem ir ao banco)
 ):
-    user = db.query(UserModel).filter(UserModel.id == user_id).first()
+    user = db.query(UserModel).filter(UserModel.id == user_id, UserModel.deleted_at.is_(None)).first()
     
     if not user:
         raise HTTPException(
@@ -36,4 +95,73 @@ def get_user_by_id(
             detail="Usuário não encontrado"
         )
         
-    return user
\ No newline at end of file
+    return user
+
+# --- Seguir / deixar de seguir ---
+def _get_user_or_404(db: Session, user_id: int):
+    exists = db.query(UserModel.id).filter(UserModel.id == user_id, UserModel.deleted_at.is_(None)).first()
+    if not exists:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuário não encontrado")
+
+@users_router.post("/{user_id}/follow", dependencies=[query_budget(5)])
+def follow(
+    user_id: int,
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    if user_id == current_user_id:
+        raise HTTPException(status_code=400, detail="Você não pode seguir a si mesmo")
+    _get_user_or_404(db, user_id)
+
+    created = follow_user(db, current_user_id, user_id)
+    return {"message": "Seguindo" if created else "Você já segue este usuário", "user_id": user_id}
+
+@users_router.delete("/{user_id}/follow", dependencies=[query_budget(5)])
+def unfollow(
+    user_id: int,
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    removed = unfollow_user(db, current_user_id, user_id)
+    return {"message": "Deixou de seguir" if removed else "Você não segue este usuário", "user_id": user_id}
+
+def _follow_page(db: Session, response: Response, user_id: int, limit: int, before: int | None, followers: bool):
+    """
+    Página de seguidores (ou seguidos), mais recentes primeiro, com keyset no id da relação.
+    O cursor da próxima página vai no header X-Next-Cursor.
+    """
+    other_id = FollowModel.follower_id if followers else FollowModel.followed_id
+    own_id = FollowModel.followed_id if followers else FollowModel.follower_id
+
+    query = db.query(UserModel, FollowModel.id).join(FollowModel, UserModel.id == other_id).filter(
+        own_id == user_id, UserModel.deleted_at.is_(None)
+    )
+    if before:
+        query = query.filter(FollowModel.id < before)
+    rows = query.order_by(FollowModel.id.desc()).limit(limit).all()
+
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = str(rows[-1][1])
+    return [user for user, _ in rows]
+
+@users_router.get("/{user_id}/followers", response_model=List[UserPublicOut], dependencies=[query_budget(1)])
+def get_followers(
+    user_id: int,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    before: int | None = Query(None),
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    return _follow_page(db, response, user_id, limit, before, followers=True)
+
+@users_router.get("/{user_id}/following", response_model=List[UserPublicOut], dependencies=[query_budget(1)])
+def get_following(
+    user_id: int,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    before: int | None = Query(None),
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    return _follow_page(db, response, user_id, limit, before, followers=False)
@@ -1,18 +1,74 @@
 # app/config.py
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
+import threading
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.orm import sessionmaker, declarative_base
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-# Cria o engine do SQLAlchemy que representa a conexão com o banco de dados
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+# Conexões por worker: pool fixo + conexões extras temporárias em picos
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "30"))
+# Threads do threadpool por worker, onde rodam as rotas síncronas (cada uma segura uma sessão do banco)
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))
+
+_engine = None
+_engine_lock = threading.Lock()
+_engine_hooks = []
+
+
+def get_engine():
+    """
+    Engine do SQLAlchemy, criado no primeiro uso (idempotente e thread-safe).
+    Importar o app não abre conexão nem carrega o driver do banco.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                options = {}
+                if not DATABASE_URL.startswith("sqlite"):
+                    options = {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW}
+                engine = create_engine(DATABASE_URL, pool_pre_ping=True, **options)
+                if engine.dialect.name == "sqlite":
+                    # O SQLite só aplica as FKs (e o ON DELETE CASCADE) com o pragma ligado em cada conexão
+                    event.listen(engine, "connect", _enable_sqlite_foreign_keys)
+                for hook in _engine_hooks:
+                    hook(engine)
+                _engine = engine
+    return _engine
+
+
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def on_engine_created(hook):
+    """Registra uma função chamada com o engine assim que ele for criado (ex: listeners de queries)."""
+    _engine_hooks.append(hook)
+    if _engine is not None:
+        hook(_engine)
+
+
+def dispose_engine():
+    """Fecha as conexões do pool (shutdown da aplicação)."""
+    if _engine is not None:
+        _engine.dispose()
+
+
+class _LazySessionmaker(sessionmaker):
+    """sessionmaker que só cria o engine quando a primeira sessão é aberta."""
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
+
 
 # Fábrica de sessões ligados ao engine
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = _LazySessionmaker(autocommit=False, autoflush=False)
 
 # Classe base para modelos ORM
 Base = declarative_base()
@@ -23,3 +79,68 @@ def get_db():
         yield db # fornece a sessão para o endpoint
     finally: # garante o fechamento da sessão
         db.close()
+
+def sync_schema():
+    """
+    Cria as tabelas que não existem e aplica mudanças ADITIVAS em tabelas já existentes
+    (colunas e índices novos), já que o create_all sozinho não altera tabelas existentes.
+    Nunca remove nem altera colunas. Colunas novas em tabelas existentes entram como NULL,
+    ou com o server_default da coluna, se houver.
+    """
+    engine = get_engine()
+    Base.metadata.create_all(bind=engine)
+
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns:
+                column_sql = f'"{column.name}" {column.type.compile(dialect=engine.dialect)}'
+                if column.server_default is not None:
+                    default = column.server_default.arg
+                    column_sql += f" DEFAULT {default.text if hasattr(default, 'text') else repr(str(default))}"
+                _apply_schema_change(
+                    f"coluna {table.name}.{column.name}",
+                    lambda conn: conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column_sql}")),
+                )
+
+        existing_indexes = _existing_index_names(engine, inspector, table.name)
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                def create_index(conn, table=table, index=index):
+                    if index.unique and index.info.get("drop_duplicates"):
+                        _drop_duplicates(conn, table, index)
+                    index.create(bind=conn)
+                _apply_schema_change(f"índice {index.name}", create_index)
+
+def _drop_duplicates(conn, table, index):
+    """
+    Antes de criar um índice único numa tabela existente: apaga as linhas repetidas nas colunas
+    do índice, mantendo a de menor id (a mais antiga). Sem isso o índice não é criado.
+    """
+    columns = ", ".join(f'"{column.name}"' for column in index.columns)
+    removed = conn.execute(text(
+        f"DELETE FROM {table.name} WHERE id NOT IN (SELECT MIN(id) FROM {table.name} GROUP BY {columns})"
+    )).rowcount
+    if removed:
+        print(f"Aviso: {removed} linhas duplicadas removidas de {table.name} para criar o índice {index.name}")
+
+def _existing_index_names(engine, inspector, table_name: str):
+    # O SQLite não reflete índices de expressão (ex: lower(username)): lê os nomes direto do sqlite_master
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            rows = conn.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table"),
+                {"table": table_name},
+            )
+            return {row[0] for row in rows}
+    return {i["name"] for i in inspector.get_indexes(table_name)}
+
+def _apply_schema_change(description: str, apply):
+    """Aplica uma mudança em transação própria; se falhar (ex: dados duplicados num índice único), só avisa."""
+    try:
+        with get_engine().begin() as conn:
+            apply(conn)
+        print(f"Schema atualizado: {description}")
+    except Exception as e:
+        print(f"Aviso: não foi possível criar {description}: {e}")
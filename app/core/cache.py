@@ -1,35 +1,89 @@
 # app/core/cache.py
-import redis
 import os
-import json
+import threading
+import time
+import orjson
+from app.core.metrics import record_cache
+from app.core.tracing import span
 
 # O Railway injeta esta variável de ambiente automaticamente
 REDIS_URL = os.getenv("REDIS_URL")
-redis_client = None
+# Depois de uma falha de conexão, espera esse tempo antes de tentar de novo (nesse meio tempo o cache fica desligado)
+REDIS_RETRY_INTERVAL = 30
 
-if REDIS_URL:
+_clients = None         # (cliente de texto, cliente de bytes), criados no primeiro uso
+_clients_lock = threading.Lock()
+_retry_at = 0.0
+
+
+def _connect():
+    global _clients, _retry_at
+    if not REDIS_URL:
+        _retry_at = float("inf")
+        print("Aviso: REDIS_URL não definida. O cache está desabilitado.")
+        return
     try:
+        import redis  # importado só aqui: sem REDIS_URL, o app nem carrega o pacote
+
         # decode_responses=True faz o redis retornar strings em vez de bytes
         pool = redis.ConnectionPool.from_url(REDIS_URL, decode_responses=True)
-        redis_client = redis.Redis(connection_pool=pool)
-        redis_client.ping()
+        text_client = redis.Redis(connection_pool=pool)
+        text_client.ping()
+        # Cliente separado para valores binários (ex: respostas já comprimidas)
+        bytes_pool = redis.ConnectionPool.from_url(REDIS_URL, decode_responses=False)
+        _clients = (text_client, redis.Redis(connection_pool=bytes_pool))
         print("Conectado ao cache Redis com sucesso!")
     except Exception as e:
-        print(f"Aviso: Falha ao conectar ao Redis. O cache está desabilitado. Erro: {e}")
-        redis_client = None
-else:
-    print("Aviso: REDIS_URL não definida. O cache está desabilitado.")
+        _retry_at = time.monotonic() + REDIS_RETRY_INTERVAL
+        print(f"Aviso: Falha ao conectar ao Redis. O cache está desabilitado por {REDIS_RETRY_INTERVAL}s. Erro: {e}")
+
+
+def _get_clients():
+    # Caminho rápido: já conectado, ou desabilitado (sem REDIS_URL, ou esperando para tentar de novo)
+    if _clients is not None or time.monotonic() < _retry_at:
+        return _clients
+    with _clients_lock:
+        if _clients is None and time.monotonic() >= _retry_at:
+            _connect()
+    return _clients
+
+
+def get_redis():
+    """Cliente Redis (respostas em str), conectado no primeiro uso. None se o cache estiver desabilitado."""
+    clients = _get_clients()
+    return clients[0] if clients else None
+
+
+def get_redis_bytes():
+    """Cliente Redis para valores binários. None se o cache estiver desabilitado."""
+    clients = _get_clients()
+    return clients[1] if clients else None
+
+
+def close_redis():
+    """Fecha os pools de conexão (shutdown da aplicação)."""
+    global _clients
+    with _clients_lock:
+        if _clients:
+            for client in _clients:
+                client.connection_pool.disconnect()
+        _clients = None
 
 def get_from_cache(key: str):
     """
     Busca um valor do cache Redis. Retorna None se não encontrar ou se o Redis estiver offline.
     """
+    redis_client = get_redis()
     if not redis_client:
         return None
+    started = time.perf_counter()
     try:
-        data = redis_client.get(key)
-        return json.loads(data) if data else None
+        with span("cache.get", **{"cache.key": key}):
+            data = redis_client.get(key)
+        record_cache(key, "get", "hit" if data else "miss", time.perf_counter() - started)
+        return orjson.loads(data) if data else None
     except Exception as e:
+        record_cache(key, "get", "error", time.perf_counter() - started)
         print(f"Erro ao LER do cache Redis (key: {key}): {e}")
         return None
 
@@ -37,12 +91,95 @@ def set_to_cache(key: str, value: any, ttl_seconds: int):
     """
     Salva um valor no cache Redis com um tempo de expiração (TTL).
     """
+    redis_client = get_redis()
     if not redis_client:
         return
+    started = time.perf_counter()
     try:
-        # Serializa o objeto Python (lista/dicionário) para uma string JSON
-        data = json.dumps(value)
+        # Serializa o objeto Python (lista/dicionário) para JSON (orjson é bem mais rápido que json)
+        data = orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
         # setex = SET com EXpiração (TTL)
-        redis_client.setex(key, ttl_seconds, data)
+        with span("cache.set", **{"cache.key": key}):
+            redis_client.setex(key, ttl_seconds, data)
+        record_cache(key, "set", "ok", time.perf_counter() - started)
+    except Exception as e:
+        record_cache(key, "set", "error", time.perf_counter() - started)
+        print(f"Erro ao ESCREVER no cache Redis (key: {key}): {e}")
+
+def get_bytes_from_cache(key: str):
+    """
+    Busca um valor binário (sem desserializar) do cache Redis.
+    """
+    redis_bytes_client = get_redis_bytes()
+    if not redis_bytes_client:
+        return None
+    started = time.perf_counter()
+    try:
+        with span("cache.get", **{"cache.key": key}):
+            data = redis_bytes_client.get(key)
+        record_cache(key, "get", "hit" if data else "miss", time.perf_counter() - started)
+        return data
+    except Exception as e:
+        record_cache(key, "get", "error", time.perf_counter() - started)
+        print(f"Erro ao LER bytes do cache Redis (key: {key}): {e}")
+        return None
+
+def set_bytes_to_cache(key: str, value: bytes, ttl_seconds: int):
+    """
+    Salva um valor binário no cache Redis com TTL.
+    """
+    redis_bytes_client = get_redis_bytes()
+    if not redis_bytes_client:
+        return
+    started = time.perf_counter()
+    try:
+        with span("cache.set", **{"cache.key": key}):
+            redis_bytes_client.setex(key, ttl_seconds, value)
+        record_cache(key, "set", "ok", time.perf_counter() - started)
+    except Exception as e:
+        record_cache(key, "set", "error", time.perf_counter() - started)
+        print(f"Erro ao ESCREVER bytes no cache Redis (key: {key}): {e}")
+
+def get_many_from_cache(keys: list):
+    """
+    Busca vários valores numa única ida ao Redis (MGET). Retorna uma lista alinhada com keys,
+    com None para as chaves que não estão no cache (ou para todas, se o Redis estiver offline).
+    """
+    redis_client = get_redis()
+    if not redis_client or not keys:
+        return [None] * len(keys)
+    started = time.perf_counter()
+    try:
+        with span("cache.mget", **{"cache.key": keys[0], "cache.keys": len(keys)}):
+            values = redis_client.mget(keys)
+        duration = (time.perf_counter() - started) / len(keys)
+        for key, data in zip(keys, values):
+            record_cache(key, "get", "hit" if data else "miss", duration)
+        return [orjson.loads(data) if data else None for data in values]
+    except Exception as e:
+        for key in keys:
+            record_cache(key, "get", "error", time.perf_counter() - started)
+        print(f"Erro ao LER do cache Redis (keys: {keys[0]}...): {e}")
+        return [None] * len(keys)
+
+def set_many_to_cache(items: dict, ttl_seconds: int):
+    """
+    Salva vários valores {chave: valor} com o mesmo TTL, num pipeline (uma ida ao Redis).
+    """
+    redis_client = get_redis()
+    if not redis_client or not items:
+        return
+    started = time.perf_counter()
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for key, value in items.items():
+            pipe.setex(key, ttl_seconds, orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS))
+        with span("cache.set", **{"cache.key": next(iter(items)), "cache.keys": len(items)}):
+            pipe.execute()
+        duration = (time.perf_counter() - started) / len(items)
+        for key in items:
+            record_cache(key, "set", "ok", duration)
     except Exception as e:
-        print(f"Erro ao ESCREVER no cache Redis (key: {key}): {e}")
\ No newline at end of file
+        for key in items:
+            record_cache(key, "set", "error", time.perf_counter() - started)
+        print(f"Erro ao ESCREVER no cache Redis (keys: {next(iter(items))}...): {e}")
@@ -0,0 +1,147 @@
+# app/core/compression.py
+import gzip
+import orjson
+from starlette.datastructures import Headers, MutableHeaders
+from app.core.cache import get_bytes_from_cache, set_bytes_to_cache
+
+# brotli é opcional: sem ele, a negociação cai para gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4  # qualidade baixa/média: bem mais rápido e ainda menor que gzip para JSON
+# Headers da resposta guardados junto com os bytes e devolvidos no cache hit (ex: cursor da próxima página)
+REPLAYED_HEADERS = ("x-next-cursor", "x-total-count")
+
+
+def _negotiate_encoding(accept_encoding: str):
+    """Escolhe a melhor codificação aceita pelo cliente (br > gzip)."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        pieces = part.strip().split(";")
+        name = pieces[0].strip().lower()
+        q = 1.0
+        for param in pieces[1:]:
+            param = param.strip()
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if name:
+            accepted[name] = q
+
+    if brotli and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def _pack(headers: list, body: bytes) -> bytes:
+    """Headers repassados (JSON, numa linha) + corpo comprimido, num único valor do cache."""
+    return orjson.dumps(headers) + b"\n" + body
+
+
+def _unpack(value: bytes):
+    header_block, _, body = value.partition(b"\n")
+    return [(name.encode(), header.encode()) for name, header in orjson.loads(header_block)], body
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI que comprime respostas com gzip ou brotli, conforme o Accept-Encoding.
+    - Respostas menores que minimum_size vão sem compressão (não compensa o custo)
+    - Respostas em streaming (vários chunks) passam direto, sem buffer
+    - Para os caminhos em cached_paths (GET), os bytes já comprimidos ficam no Redis,
+      então um cache hit não precisa nem renderizar nem comprimir de novo (com os REPLAYED_HEADERS)
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, cached_paths: dict | None = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cached_paths = cached_paths or {}  # caminho -> TTL em segundos
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        encoding = _negotiate_encoding(headers.get("accept-encoding", ""))
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        cache_key = None
+        cache_ttl = self.cached_paths.get(scope["path"])
+        if scope["method"] == "GET" and cache_ttl:
+            query = scope.get("query_string", b"").decode("latin-1")
+            cache_key = f"http:{encoding}:v2:{scope['path']}?{query}"
+            cached = get_bytes_from_cache(cache_key)
+            if cached:
+                replayed, cached_body = _unpack(cached)
+                await send({
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"content-encoding", encoding.encode()),
+                        (b"content-length", str(len(cached_body)).encode()),
+                        (b"vary", b"Accept-Encoding"),
+                        *replayed,
+                    ],
+                })
+                await send({"type": "http.response.body", "body": cached_body})
+                return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            response_headers = MutableHeaders(raw=start_message["headers"])
+
+            # Streaming ou resposta já codificada: repassa sem mexer
+            if message.get("more_body", False) or "content-encoding" in response_headers:
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            if len(body) < self.minimum_size:
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = _compress(body, encoding)
+            response_headers["Content-Encoding"] = encoding
+            response_headers["Content-Length"] = str(len(compressed))
+            response_headers.add_vary_header("Accept-Encoding")
+
+            if cache_key and start_message["status"] == 200:
+                replayed = [[name, response_headers[name]] for name in REPLAYED_HEADERS if name in response_headers]
+                set_bytes_to_cache(cache_key, _pack(replayed, compressed), cache_ttl)
+
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,38 @@
+# app/core/http.py
+import os
+import threading
+
+# Conexões keep-alive reaproveitadas por host (TMDB, AniList); acima disso abre e fecha a cada chamada
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+# Timeout (segundos) das chamadas às APIs externas: sem ele, uma API travada segura a thread para sempre
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """Sessão HTTP compartilhada (requests.Session com pool de conexões keep-alive), criada no primeiro uso."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                # requests (e urllib3) só é importado aqui: o import do app não paga por ele
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def close_http_session():
+    """Fecha as conexões abertas (shutdown da aplicação)."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
@@ -0,0 +1,32 @@
+# app/core/http_cache.py
+import hashlib
+import orjson
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+def _render(content) -> bytes:
+    """Serializa o conteúdo no mesmo formato usado pelo ORJSONResponse (resposta padrão da API)."""
+    return orjson.dumps(jsonable_encoder(content), option=orjson.OPT_NON_STR_KEYS)
+
+def cached_json_response(request: Request, content, max_age: int, private: bool = False) -> Response:
+    """
+    Monta uma resposta JSON com Cache-Control e ETag para leituras via GET.
+    Se o cliente (ou a CDN) mandar If-None-Match com o mesmo ETag, responde 304 sem corpo.
+    - private=False: pode ser cacheado por CDNs/proxies (catálogo, buscas)
+    - private=True: só o navegador guarda, e sempre revalida (dados de usuário)
+    """
+    body = _render(content)
+    etag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+
+    if private:
+        cache_control = "private, max-age=0, must-revalidate"
+    else:
+        cache_control = f"public, max-age={max_age}"
+
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,60 @@
+# app/core/jobs.py
+import time
+import uuid
+import threading
+from app.core.cache import get_from_cache, set_to_cache
+
+# Por quanto tempo o progresso de um job fica consultável
+JOB_TTL = 24 * 3600
+
+# Fallback em memória quando o Redis está desabilitado (só vale para o próprio worker)
+_local_jobs = {}
+_local_lock = threading.Lock()
+
+
+def _job_key(job_id: str):
+    return f"job:{job_id}"
+
+
+def create_job(kind: str, **fields) -> str:
+    """Registra um job novo (status 'queued') e retorna o id dele."""
+    job_id = uuid.uuid4().hex
+    job = {
+        "id": job_id,
+        "kind": kind,
+        "status": "queued",
+        "created_at": time.time(),
+        "updated_at": time.time(),
+        **fields,
+    }
+    _save_job(job)
+    return job_id
+
+
+def update_job(job_id: str, **fields):
+    """Atualiza campos do job (progresso, status, erros...)."""
+    job = get_job(job_id) or {"id": job_id}
+    job.update(fields)
+    job["updated_at"] = time.time()
+    _save_job(job)
+    return job
+
+
+def get_job(job_id: str):
+    """Retorna o estado atual do job, ou None se não existir (ou já expirou)."""
+    job = get_from_cache(_job_key(job_id))
+    if job:
+        return job
+    with _local_lock:
+        job = _local_jobs.get(job_id)
+        return dict(job) if job else None
+
+
+def _save_job(job: dict):
+    set_to_cache(_job_key(job["id"]), job, JOB_TTL)
+    with _local_lock:
+        _local_jobs[job["id"]] = dict(job)
+        # Descarta jobs locais expirados para o dicionário não crescer indefinidamente
+        expired_before = time.time() - JOB_TTL
+        for old_id in [k for k, v in _local_jobs.items() if v.get("updated_at", 0) < expired_before]:
+            del _local_jobs[old_id]
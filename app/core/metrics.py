@@ -0,0 +1,218 @@
+# app/core/metrics.py
+import os
+import re
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from app.core.query_budget import current_query_stats, start_query_stats, reset_query_stats
+
+# prometheus_client é opcional: sem ele (ou com METRICS_ENABLED=0) tudo aqui vira no-op
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram,
+        REGISTRY, generate_latest, multiprocess,
+    )
+except ImportError:  # pragma: no cover
+    multiprocess = None
+
+METRICS_ENABLED = multiprocess is not None and os.getenv("METRICS_ENABLED", "1") != "0"
+
+# Com vários workers (gunicorn), cada processo grava os valores em arquivos nesse diretório
+# e o /metrics agrega todos. O diretório precisa existir e ser limpo a cada deploy.
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+_QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+if METRICS_ENABLED:
+    HTTP_LATENCY = Histogram(
+        "cinelist_http_request_duration_seconds", "Latência das requisições por rota",
+        ["method", "route", "status"], buckets=_LATENCY_BUCKETS,
+    )
+    UPSTREAM_LATENCY = Histogram(
+        "cinelist_upstream_request_duration_seconds", "Latência das chamadas às APIs externas",
+        ["provider", "endpoint"], buckets=_LATENCY_BUCKETS,
+    )
+    UPSTREAM_ERRORS = Counter(
+        "cinelist_upstream_errors_total", "Falhas nas chamadas às APIs externas",
+        ["provider", "endpoint", "error"],
+    )
+    CACHE_OPERATIONS = Counter(
+        "cinelist_cache_operations_total", "Operações no cache Redis por prefixo de chave",
+        ["prefix", "operation", "result"],
+    )
+    CACHE_LATENCY = Histogram(
+        "cinelist_cache_operation_duration_seconds", "Latência das operações no cache Redis",
+        ["prefix", "operation"], buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+    )
+    DB_QUERIES = Histogram(
+        "cinelist_db_queries_per_request", "Queries SQL executadas por requisição",
+        ["route"], buckets=_QUERY_COUNT_BUCKETS,
+    )
+    DB_TIME = Histogram(
+        "cinelist_db_time_per_request_seconds", "Tempo total em queries SQL por requisição",
+        ["route"], buckets=_LATENCY_BUCKETS,
+    )
+    # Threadpool do anyio (onde rodam as rotas síncronas): em uso, capacidade e fila
+    THREADPOOL_IN_USE = Gauge(
+        "cinelist_threadpool_in_use", "Threads do threadpool ocupadas", multiprocess_mode="livesum",
+    )
+    THREADPOOL_CAPACITY = Gauge(
+        "cinelist_threadpool_capacity", "Tamanho do threadpool", multiprocess_mode="livesum",
+    )
+    THREADPOOL_WAITING = Gauge(
+        "cinelist_threadpool_waiting", "Tarefas esperando uma thread livre", multiprocess_mode="livesum",
+    )
+
+
+# --- Rótulos ---
+
+_DYNAMIC_SEGMENT = re.compile(r"\d|^.{25,}$")
+
+def cache_prefix(key: str) -> str:
+    """
+    Prefixo da chave de cache usado como rótulo (ex: tmdb:popular_movies:20 -> tmdb:popular_movies).
+    Partes com números ou muito longas (ids, hashes) viram '*' para não explodir a cardinalidade.
+    """
+    parts = key.split(":")[:2]
+    return ":".join("*" if _DYNAMIC_SEGMENT.search(part) else part for part in parts)
+
+_ID_SEGMENT = re.compile(r"(?<=[a-z_])/\d+(?=/|$)")  # /3/movie/123 -> /3/movie/{id}
+
+def url_endpoint(url: str) -> str:
+    """Caminho da URL sem query string e com ids trocados por {id} (ex: /3/movie/{id}/credits)."""
+    path = url.split("://", 1)[-1]
+    path = path[path.find("/"):] if "/" in path else "/"
+    return _ID_SEGMENT.sub("/{id}", path.split("?", 1)[0])
+
+_GRAPHQL_FIELD = re.compile(r"\{\s*(\w+)\s*(?:\(([^)]*)\))?")
+_GRAPHQL_ARG = re.compile(r"(\w+)\s*:")
+
+@lru_cache(maxsize=64)
+def graphql_endpoint(query: str) -> str:
+    """
+    Campo raiz de uma query GraphQL com os nomes dos argumentos, descendo um nível em
+    Page (ex: Page.media(type,search,sort), Media(idMal,type)).
+    """
+    parts = []
+    position = 0
+    while match := _GRAPHQL_FIELD.search(query, position):
+        field, args = match.group(1), match.group(2)
+        if field != "Page":
+            arg_names = ",".join(_GRAPHQL_ARG.findall(args or ""))
+            parts.append(f"{field}({arg_names})")
+            break
+        parts.append(field)
+        position = match.end()
+    return ".".join(parts) or "unknown"
+
+
+# --- Instrumentação ---
+
+@contextmanager
+def track_upstream(provider: str, endpoint: str):
+    """Mede uma chamada a uma API externa; exceções contam como erro (pelo tipo) e são relançadas."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        status = getattr(getattr(e, "response", None), "status_code", None)
+        UPSTREAM_ERRORS.labels(provider, endpoint, f"http_{status}" if status else type(e).__name__).inc()
+        raise
+    finally:
+        UPSTREAM_LATENCY.labels(provider, endpoint).observe(time.perf_counter() - started)
+
+
+def record_upstream_error(provider: str, endpoint: str, error: str):
+    """Erro que não vira exceção (ex: resposta GraphQL com 'errors')."""
+    if METRICS_ENABLED:
+        UPSTREAM_ERRORS.labels(provider, endpoint, error).inc()
+
+
+def record_cache(key: str, operation: str, result: str, duration: float):
+    """operation: get/set; result: hit/miss/ok/error."""
+    if METRICS_ENABLED:
+        prefix = cache_prefix(key)
+        CACHE_OPERATIONS.labels(prefix, operation, result).inc()
+        CACHE_LATENCY.labels(prefix, operation).observe(duration)
+
+
+def _update_threadpool_gauges():
+    try:
+        from anyio.to_thread import current_default_thread_limiter
+        limiter = current_default_thread_limiter()
+        THREADPOOL_IN_USE.set(limiter.borrowed_tokens)
+        THREADPOOL_CAPACITY.set(limiter.total_tokens)
+        THREADPOOL_WAITING.set(limiter.statistics().tasks_waiting)
+    except Exception:
+        pass
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mede a latência de cada requisição por rota (o template, ex:
+    /media/listas/{lista_id}, não o caminho real) e as queries SQL feitas nela.
+    Fica por fora da compressão, então também mede as respostas servidas do cache.
+    cached_paths: os caminhos que a compressão serve do cache (sem rota); são os únicos
+    caminhos sem rota que viram rótulo, o resto fica como "unmatched".
+    """
+
+    def __init__(self, app, cached_paths=()):
+        self.app = app
+        self.cached_paths = frozenset(cached_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        token = start_query_stats() if current_query_stats() is None else None
+        stats = current_query_stats()
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        _update_threadpool_gauges()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            route = scope.get("route")
+            if route is not None:
+                label = route.path
+            elif scope["path"] in self.cached_paths and status_code < 400:
+                label = scope["path"]  # resposta servida do cache da compressão, antes do roteamento
+            else:
+                # 404, redirects (ex: 307 da barra final), /docs...: o caminho real não vira rótulo
+                label = "unmatched"
+
+            HTTP_LATENCY.labels(scope["method"], label, str(status_code)).observe(elapsed)
+            DB_QUERIES.labels(label).observe(stats.count)
+            DB_TIME.labels(label).observe(stats.duration)
+            _update_threadpool_gauges()
+            if token is not None:
+                reset_query_stats(token)
+
+
+def metrics_response():
+    """Corpo e content-type do /metrics (agregando todos os workers no modo multiprocesso)."""
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_worker_dead(pid: int):
+    """Para o hook child_exit do gunicorn: descarta os gauges 'live' do worker que saiu."""
+    if METRICS_ENABLED and MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,87 @@
+# app/core/pagination.py
+import base64
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import orjson
+from fastapi import HTTPException
+from app.core.cache import get_redis
+
+# Catálogo paginado (populares do TMDB e da AniList): páginas da API externa buscadas em segundo plano
+# à frente da última pedida, e quantas podem estar na fila de uma vez (o resto é descartado)
+CATALOG_PREFETCH_PAGES = int(os.getenv("CATALOG_PREFETCH_PAGES", "1"))
+CATALOG_PREFETCH_MAX_PENDING = int(os.getenv("CATALOG_PREFETCH_MAX_PENDING", "8"))
+# Páginas além dessa ficam pouco tempo no cache: rolar fundo não enche o Redis
+CATALOG_HOT_PAGES = int(os.getenv("CATALOG_HOT_PAGES", "5"))
+CATALOG_DEEP_PAGE_TTL = int(os.getenv("CATALOG_DEEP_PAGE_TTL", "60"))
+# Maior deslocamento aceito num cursor do catálogo (o TMDB não passa da página 500)
+CATALOG_MAX_OFFSET = 10_000
+
+_prefetch_pool = None
+_prefetch_lock = threading.Lock()
+_prefetch_pending = set()
+
+def encode_cursor(*values) -> str:
+    """Cursor opaco (base64 de um array JSON) com os valores da chave de ordenação do último item da página."""
+    return base64.urlsafe_b64encode(orjson.dumps(list(values))).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Decodifica um cursor gerado por encode_cursor. Cursor adulterado ou de outra rota -> 400."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = orjson.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    return values
+
+def decode_offset_cursor(cursor: str | None) -> int:
+    """Posição do primeiro item a partir de um cursor do catálogo (encode_cursor(offset)); sem cursor, 0."""
+    if not cursor:
+        return 0
+    offset, = decode_cursor(cursor, 1)
+    if not isinstance(offset, int) or not 0 <= offset <= CATALOG_MAX_OFFSET:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    return offset
+
+def page_window(offset: int, limit: int, page_size: int):
+    """Páginas da API externa (a partir de 1) que cobrem os itens [offset, offset + limit) e a posição do primeiro na primeira página."""
+    first = offset // page_size + 1
+    last = (offset + limit - 1) // page_size + 1
+    return list(range(first, last + 1)), offset % page_size
+
+def page_ttl(page: int, ttl: int) -> int:
+    """TTL do cache de uma página do catálogo: as primeiras ficam ttl; as mais fundas, CATALOG_DEEP_PAGE_TTL."""
+    return ttl if page <= CATALOG_HOT_PAGES else min(ttl, CATALOG_DEEP_PAGE_TTL)
+
+def prefetch(key: str, func, *args):
+    """
+    Roda func(*args) numa thread em segundo plano (ex: buscar a próxima página para o cache), uma vez por key.
+    Com a fila cheia (CATALOG_PREFETCH_MAX_PENDING), a busca é descartada: quem pedir a página busca na hora.
+    Sem Redis não há onde guardar o resultado, então não faz nada.
+    """
+    global _prefetch_pool
+    if CATALOG_PREFETCH_PAGES <= 0 or get_redis() is None:
+        return
+    with _prefetch_lock:
+        if key in _prefetch_pending or len(_prefetch_pending) >= CATALOG_PREFETCH_MAX_PENDING:
+            return
+        if _prefetch_pool is None:
+            _prefetch_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch")
+        _prefetch_pending.add(key)
+
+    def run():
+        try:
+            func(*args)
+        except Exception as e:
+            print(f"Aviso: falha ao buscar antecipadamente {key}: {e}")
+        finally:
+            with _prefetch_lock:
+                _prefetch_pending.discard(key)
+
+    _prefetch_pool.submit(run)
+
+def escape_like(value: str) -> str:
+    """Escapa os curingas do LIKE (% e _) para usar o texto do usuário numa busca por prefixo (escape="\\")."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
@@ -0,0 +1,121 @@
+# app/core/profiler.py
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+# Profiler por amostragem, opcional e por requisição. Liga de dois jeitos:
+# - header "X-Profile: <PROFILE_TOKEN>" (só com PROFILE_TOKEN definido): sempre grava o perfil
+# - PROFILE_SAMPLE_RATE (0 a 1): fração das requisições perfiladas; só grava as lentas
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "500"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_MAX_DEPTH = 128
+
+PROFILING_ENABLED = bool(PROFILE_TOKEN) or PROFILE_SAMPLE_RATE > 0
+
+_current_profile: ContextVar["SamplingProfile | None"] = ContextVar("profile", default=None)
+
+# Frames em que o event loop está só esperando I/O (amostras descartadas)
+_IDLE_FUNCTIONS = {"select", "poll", "epoll", "_run_once", "run_forever"}
+
+
+class SamplingProfile:
+    """
+    Amostra, a cada PROFILE_INTERVAL_MS, a pilha das threads que estão atendendo a requisição:
+    a do event loop e as do threadpool onde a rota síncrona roda (registradas por register_thread).
+    O resultado sai em "collapsed stacks" (uma pilha por linha + contagem), o formato lido
+    pelo flamegraph.pl e pelo speedscope.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_MS / 1000):
+        self.interval = interval
+        self.thread_ids = {threading.get_ident()}
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in tuple(self.thread_ids):
+                frame = frames.get(thread_id)
+                if frame is not None and frame.f_code.co_name not in _IDLE_FUNCTIONS:
+                    self.samples[_collapse(frame)] += 1
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+def _collapse(frame):
+    names = []
+    while frame is not None and len(names) < PROFILE_MAX_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def register_thread():
+    """Inclui a thread atual no perfil da requisição em andamento (se houver). Custo: um ContextVar.get."""
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.thread_ids.add(threading.get_ident())
+
+
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9_.-]+")
+
+class ProfilerMiddleware:
+    """Middleware ASGI que decide se a requisição é perfilada e grava o perfil em PROFILE_DIR."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        requested = bool(PROFILE_TOKEN) and dict(scope["headers"]).get(b"x-profile") == PROFILE_TOKEN.encode()
+        if not requested and random.random() >= PROFILE_SAMPLE_RATE:
+            await self.app(scope, receive, send)
+            return
+
+        profile = SamplingProfile()
+        token = _current_profile.set(profile)
+        started = time.perf_counter()
+        profile.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profile.stop()
+            _current_profile.reset(token)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if requested or elapsed_ms >= PROFILE_SLOW_MS:
+                route = scope.get("route")
+                _write_profile(profile, scope["method"], route.path if route else scope["path"], elapsed_ms)
+
+
+def _write_profile(profile: SamplingProfile, method: str, path: str, elapsed_ms: float):
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = _UNSAFE_CHARS.sub("_", f"{method}{path}").strip("_")
+        file_path = os.path.join(PROFILE_DIR, f"{int(time.time() * 1000)}-{name}-{elapsed_ms:.0f}ms.folded")
+        with open(file_path, "w") as f:
+            f.write(profile.collapsed())
+        print(f"Perfil da requisição {method} {path} ({elapsed_ms:.0f} ms) salvo em {file_path}")
+    except OSError as e:
+        print(f"Erro ao salvar o perfil da requisição {method} {path}: {e}")
@@ -0,0 +1,143 @@
+# app/core/query_budget.py
+import os
+import time
+from collections import deque
+from contextvars import ContextVar
+from fastapi import Depends
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+# off    -> não conta nada (padrão em produção)
+# warn   -> conta e avisa no log quando a rota estoura o orçamento
+# strict -> conta e responde 500 quando uma leitura estoura o orçamento (testes / debug). Numa escrita o commit
+#           já aconteceu: a resposta original segue, com o header X-Query-Budget-Exceeded
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "off").lower()
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Últimos estouros registrados (warn e strict): a suíte de testes falha se algum aparecer
+budget_violations = deque(maxlen=100)
+
+
+class QueryStats:
+    """Contador de queries SQL (e do tempo gasto nelas) de uma única requisição."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.budget = None
+        self.statements = []
+
+
+_current_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats():
+    """Retorna o contador da requisição atual (ou None fora de uma requisição)."""
+    return _current_stats.get()
+
+
+def start_query_stats():
+    """Abre um contador para a requisição atual. Retorna o token para reset_query_stats."""
+    return _current_stats.set(QueryStats())
+
+
+def reset_query_stats(token):
+    _current_stats.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.statements.append(statement)
+        context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    started = getattr(context, "_query_started", None)
+    if stats is not None and started is not None:
+        stats.duration += time.perf_counter() - started
+
+
+_installed_engines = set()
+
+def install_query_counter(engine):
+    """Registra os listeners que contam (e cronometram) as queries executadas pelo engine."""
+    if id(engine) in _installed_engines:
+        return
+    _installed_engines.add(id(engine))
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def query_budget(max_queries: int):
+    """
+    Dependência que declara quantas queries a rota pode executar por requisição.
+    Uso: @router.get(..., dependencies=[query_budget(3)])
+    """
+    def _set_budget():
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.budget = max_queries
+    return Depends(_set_budget)
+
+
+class QueryBudgetMiddleware:
+    """
+    Middleware ASGI que abre um contador por requisição e confere o orçamento declarado
+    pela rota antes de enviar a resposta. Detecta regressões de N+1 nos routers.
+    """
+
+    def __init__(self, app, mode: str = QUERY_BUDGET_MODE):
+        self.app = app
+        self.mode = mode
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Reaproveita o contador aberto pelo MetricsMiddleware, se houver
+        stats = _current_stats.get()
+        token = None
+        if stats is None:
+            stats = QueryStats()
+            token = _current_stats.set(stats)
+        replaced = False
+
+        async def send_wrapper(message):
+            nonlocal replaced
+            if replaced:
+                return
+
+            if message["type"] == "http.response.start" and stats.budget is not None and stats.count > stats.budget:
+                detail = (
+                    f"{scope['method']} {scope['path']} executou {stats.count} queries "
+                    f"(orçamento: {stats.budget})"
+                )
+                print(f"Aviso: orçamento de queries estourado: {detail}")
+                for statement in stats.statements:
+                    print(f"    {statement}")
+                budget_violations.append(detail)
+
+                if self.mode == "strict" and scope["method"] not in SAFE_METHODS:
+                    MutableHeaders(raw=message["headers"])["X-Query-Budget-Exceeded"] = detail.encode("ascii", "replace").decode()
+                elif self.mode == "strict":
+                    replaced = True
+                    response = ORJSONResponse(
+                        status_code=500,
+                        content={"detail": f"Orçamento de queries estourado: {detail}"},
+                    )
+                    await response(scope, receive, send)
+                    return
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if token is not None:
+                _current_stats.reset(token)
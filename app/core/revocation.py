@@ -0,0 +1,180 @@
+# app/core/revocation.py
+"""
+Tokens revogados (logout, rotação do refresh token, exclusão de conta), conferidos sem ir ao banco.
+
+- No Redis: o zset auth:revoked (jti -> momento da revogação) e o zset auth:revoked_users
+  (user_id -> momento da revogação: os tokens do usuário emitidos antes disso deixam de valer).
+- Em cada worker: um filtro de Bloom com os jti revogados e um dict com os usuários revogados,
+  sincronizados com o Redis a cada REVOCATION_SYNC_SECONDS. Um jti fora do filtro (o caso comum)
+  é aceito sem nenhuma chamada de rede; só os que caem no filtro (revogados ou falso positivo)
+  são confirmados no Redis.
+
+Revogações feitas neste worker valem na hora; as de outros workers, depois da próxima sincronização.
+Sem Redis, valem só para o próprio worker.
+"""
+import hashlib
+import math
+import os
+import threading
+import time
+from app.core.cache import get_redis
+
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "5"))
+# Capacidade inicial do filtro e taxa de falsos positivos (cada falso positivo custa uma consulta ao Redis)
+BLOOM_CAPACITY = 100_000
+BLOOM_ERROR_RATE = 0.001
+# O filtro não remove itens: é reconstruído do zero (sem os expirados) nesse intervalo
+BLOOM_REBUILD_SECONDS = 3600
+
+REVOKED_KEY = "auth:revoked"
+REVOKED_USERS_KEY = "auth:revoked_users"
+# Margem na sincronização incremental, para revogações gravadas por workers com o relógio um pouco atrasado
+SYNC_OVERLAP_SECONDS = 5
+
+
+class BloomFilter:
+    """Filtro de Bloom em bytearray: `in` pode dar falso positivo, nunca falso negativo."""
+
+    def __init__(self, capacity: int, error_rate: float = BLOOM_ERROR_RATE):
+        self.capacity = capacity
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        # Double hashing (Kirsch-Mitzenmacher): k posições a partir de dois hashes de 64 bits
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+# Tempo máximo de vida de um token (o refresh); revogações mais antigas que isso já não importam
+_max_token_lifetime = 30 * 86400
+
+_bloom = BloomFilter(BLOOM_CAPACITY)
+_revoked_users = {}     # user_id -> momento da revogação
+_local_revoked = {}     # jti -> momento da revogação (as deste worker; é a lista inteira sem Redis)
+_lock = threading.Lock()
+_synced_at = 0.0        # time.time() da última sincronização com o Redis
+_next_sync = 0.0        # time.monotonic()
+_next_rebuild = time.monotonic() + BLOOM_REBUILD_SECONDS
+
+
+def configure(max_token_lifetime: int):
+    """Chamado por app.core.security com a validade do refresh token (em segundos)."""
+    global _max_token_lifetime
+    _max_token_lifetime = max_token_lifetime
+
+
+def revoke_token(jti: str):
+    """Revoga um token pelo jti (logout, refresh token já usado)."""
+    now = time.time()
+    with _lock:
+        _local_revoked[jti] = now
+        _bloom.add(jti)
+    redis_client = get_redis()
+    if redis_client:
+        try:
+            redis_client.zadd(REVOKED_KEY, {jti: now})
+        except Exception as e:
+            print(f"Erro ao gravar a revogação do token no Redis: {e}")
+
+
+def revoke_user_tokens(user_id: int):
+    """Revoga todos os tokens do usuário emitidos até agora (exclusão de conta, refresh token roubado)."""
+    now = time.time()
+    with _lock:
+        _revoked_users[user_id] = now
+    redis_client = get_redis()
+    if redis_client:
+        try:
+            redis_client.zadd(REVOKED_USERS_KEY, {str(user_id): now})
+        except Exception as e:
+            print(f"Erro ao gravar a revogação dos tokens do usuário {user_id} no Redis: {e}")
+
+
+def is_revoked(claims: dict):
+    """True se o token (claims já verificadas) foi revogado, pelo jti ou pelo usuário."""
+    _maybe_sync()
+    revoked_at = _revoked_users.get(int(claims["sub"]))
+    if revoked_at is not None and claims.get("iat", 0) <= revoked_at:
+        return True
+    jti = claims.get("jti")
+    if jti is None or jti not in _bloom:
+        return False
+    if jti in _local_revoked:
+        return True
+    redis_client = get_redis()
+    if not redis_client:
+        return False
+    try:
+        return redis_client.zscore(REVOKED_KEY, jti) is not None
+    except Exception as e:
+        # Na dúvida (o jti está no filtro), recusa: o cliente pode renovar o token
+        print(f"Erro ao consultar a revogação do token no Redis: {e}")
+        return True
+
+
+# --- Sincronização com o Redis ---
+
+def _maybe_sync():
+    global _next_sync
+    if time.monotonic() < _next_sync:
+        return
+    # Só uma thread sincroniza; as outras seguem com o filtro atual
+    if not _lock.acquire(blocking=False):
+        return
+    try:
+        _next_sync = time.monotonic() + REVOCATION_SYNC_SECONDS
+        _sync()
+    finally:
+        _lock.release()
+
+
+def _sync():
+    global _bloom, _synced_at, _next_rebuild
+    now = time.time()
+    expired_before = now - _max_token_lifetime
+    for jti in [jti for jti, revoked_at in _local_revoked.items() if revoked_at < expired_before]:
+        del _local_revoked[jti]
+    for user_id in [user_id for user_id, revoked_at in _revoked_users.items() if revoked_at < expired_before]:
+        del _revoked_users[user_id]
+
+    redis_client = get_redis()
+    rebuild = time.monotonic() >= _next_rebuild or _bloom.count > _bloom.capacity
+    since = "-inf" if rebuild else f"({_synced_at - SYNC_OVERLAP_SECONDS}"
+    jtis, users = [], []
+    if redis_client:
+        try:
+            pipe = redis_client.pipeline()
+            pipe.zremrangebyscore(REVOKED_KEY, "-inf", expired_before)
+            pipe.zremrangebyscore(REVOKED_USERS_KEY, "-inf", expired_before)
+            pipe.zrangebyscore(REVOKED_KEY, since, "+inf")
+            pipe.zrangebyscore(REVOKED_USERS_KEY, since, "+inf", withscores=True)
+            _, _, jtis, users = pipe.execute()
+        except Exception as e:
+            print(f"Erro ao sincronizar os tokens revogados com o Redis: {e}")
+            return
+
+    if rebuild:
+        bloom = BloomFilter(max(BLOOM_CAPACITY, 2 * (len(jtis) + len(_local_revoked))))
+        for jti in _local_revoked:
+            bloom.add(jti)
+        _bloom = bloom
+        _next_rebuild = time.monotonic() + BLOOM_REBUILD_SECONDS
+    for jti in jtis:
+        _bloom.add(jti)
+    for user_id, revoked_at in users:
+        user_id = int(user_id)
+        _revoked_users[user_id] = max(revoked_at, _revoked_users.get(user_id, 0))
+    _synced_at = now
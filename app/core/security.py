@@ -1,71 +1,162 @@
 # app/core/security.py
+import time
+import uuid
 from datetime import datetime, timedelta
-from pydantic import ValidationError
-from jose import jwt, JWTError
-from passlib.context import CryptContext
+from functools import lru_cache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from app.config import get_db
 from app.models.user import UserModel
+from app.core import revocation
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
 
 # Configurações básicas do JWT
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60))
+# Access token curto (verificado sem ir ao banco); o refresh token (POST /auth/refresh) renova
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 15))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 30))
+# auto (PyJWT se instalado) | pyjwt | jose
+JWT_BACKEND = os.getenv("JWT_BACKEND", "auto").lower()
+# Tokens já verificados mantidos em memória (assinatura conferida uma vez por token, por worker)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+revocation.configure(REFRESH_TOKEN_EXPIRE_DAYS * 86400)
+
+@lru_cache(maxsize=1)
+def _pwd_context():
+    # passlib só é carregado no primeiro hash/verificação (fica fora do import do app)
+    from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # --- Funções de senha ---
 def get_password_hash(password: str) -> str:
     password_bytes = password.encode('utf-8')
     truncated_bytes = password_bytes[:72]
-    return pwd_context.hash(truncated_bytes)
+    return _pwd_context().hash(truncated_bytes)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     password_bytes = plain_password.encode('utf-8')
     truncated_bytes = password_bytes[:72]
-    
-    return pwd_context.verify(truncated_bytes, hashed_password)
+
+    return _pwd_context().verify(truncated_bytes, hashed_password)
 
 # --- Funções JWT ---
+# As bibliotecas de JWT (e o cryptography, que elas carregam) só são importadas no primeiro uso,
+# fora do import do app
+@lru_cache(maxsize=1)
+def _jose_jwt():
+    from jose import jwt
+
+    return jwt
+
+@lru_cache(maxsize=1)
+def _pyjwt():
+    # PyJWT é opcional: quando instalado, verifica os tokens HS* mais rápido que o python-jose
+    try:
+        import jwt
+    except ImportError:
+        return None
+    return jwt
+
+def _use_pyjwt():
+    if JWT_BACKEND == "jose":
+        return False
+    if JWT_BACKEND == "pyjwt" and _pyjwt() is None:
+        print("Aviso: JWT_BACKEND=pyjwt, mas o PyJWT não está instalado. Usando o python-jose.")
+    return _pyjwt() is not None and ALGORITHM.startswith("HS")
+
+@lru_cache(maxsize=1)
+def _verification_key():
+    from jose import jwk
+
+    # O python-jose reconstrói a chave a cada decode quando recebe a string; aqui ela é montada uma vez
+    return jwk.construct(SECRET_KEY, ALGORITHM)
+
+@lru_cache(maxsize=1)
+def _decoder():
+    if _use_pyjwt():
+        pyjwt = _pyjwt()
+        return lambda token: pyjwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    return lambda token: _jose_jwt().decode(token, _verification_key(), algorithms=[ALGORITHM])
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def _verify_token(token: str) -> dict:
+    # Exceções não entram no cache; a expiração é conferida de novo em decode_token.
+    # O dict é compartilhado entre as requisições: não modifique.
+    return _decoder()(token)
+
+def _encode(claims: dict, expires_delta: timedelta):
+    claims["exp"] = datetime.utcnow() + expires_delta
+    # iat com milissegundos: revoke_user_tokens invalida só os tokens emitidos antes da revogação
+    claims["iat"] = round(time.time(), 3)
+    claims["jti"] = uuid.uuid4().hex
+    return _jose_jwt().encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    to_encode["typ"] = "access"
+    return _encode(to_encode, expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
 
-def decode_access_token(token: str):
+def create_refresh_token(user_id: int):
+    return _encode({"sub": str(user_id), "typ": "refresh"}, timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+
+def issue_tokens(user_id: int):
+    """Par de tokens do login/registro/refresh (campos do TokenResponse)."""
+    return {
+        "access_token": create_access_token({"sub": str(user_id)}),
+        "refresh_token": create_refresh_token(user_id),
+        "token_type": "bearer",
+    }
+
+def _invalid_token(detail: str = "Token inválido ou expirado"):
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def decode_token(token: str, token_type: str = "access", check_revoked: bool = True):
+    """
+    Verifica assinatura, expiração, tipo e revogação do token, sem acessar o banco.
+    Tokens sem "typ" (emitidos antes dos refresh tokens) valem como access.
+    check_revoked=False aceita token revogado (só para rotas que não dão acesso à conta).
+    """
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
-    except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token inválido ou expirado",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
+        payload = _verify_token(token)
+    except Exception:  # JWTError (python-jose) ou PyJWTError, e tokens malformados
+        raise _invalid_token()
+    if payload.get("exp", 0) <= time.time():
+        raise _invalid_token()
+    if payload.get("typ", "access") != token_type:
+        raise _invalid_token(f"Token inválido: esperado um token do tipo '{token_type}'")
+    if payload.get("sub") is None:
+        raise _invalid_token("Token inválido: 'sub' não encontrado")
+    if check_revoked and revocation.is_revoked(payload):
+        if token_type == "refresh":
+            # Refresh token usado de novo depois da rotação: provavelmente vazou. Derruba todas as sessões.
+            revocation.revoke_user_tokens(int(payload["sub"]))
+        raise _invalid_token("Token revogado")
+    return payload
+
+def decode_access_token(token: str):
+    return decode_token(token, "access")
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    payload = decode_access_token(token)
-    user_id = payload.get("sub")
-    
-    # Validação robusta de user_id
-    if user_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token inválido: 'sub' não encontrado",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    user = db.query(UserModel).filter(UserModel.id == int(user_id)).first()
+def get_current_claims(token: str = Depends(oauth2_scheme)):
+    """Dependência só com as claims do access token (sem consulta ao banco)."""
+    return decode_access_token(token)
+
+def get_current_user_id(claims: dict = Depends(get_current_claims)) -> int:
+    """Id do usuário logado, sem consulta ao banco. Use quando a rota não precisa do UserModel."""
+    return int(claims["sub"])
+
+def get_current_user(user_id: int = Depends(get_current_user_id), db: Session = Depends(get_db)):
+    # Contas excluídas (deleted_at preenchido) perdem o acesso na hora, mesmo com token ainda válido
+    user = db.query(UserModel).filter(UserModel.id == user_id, UserModel.deleted_at.is_(None)).first()
     if not user:
         raise HTTPException(status_code=401, detail="Usuário não encontrado")
-    return user
\ No newline at end of file
+    return user
@@ -0,0 +1,12 @@
+# app/core/sql.py
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+def dialect_insert(db: Session, model):
+    """
+    Retorna um INSERT do dialeto em uso (PostgreSQL em produção, SQLite em dev/benchmark),
+    que suporta on_conflict_do_nothing / on_conflict_do_update e RETURNING.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(model)
+    return postgresql.insert(model)
@@ -0,0 +1,108 @@
+# app/core/startup.py
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import text
+from app.config import DB_POOL_SIZE, DB_MAX_OVERFLOW, DATABASE_URL, THREADPOOL_SIZE, get_engine, dispose_engine, sync_schema
+from app.core.cache import get_redis, close_redis
+from app.core.http import get_http_session, close_http_session
+from app.services.write_behind import start_consumer, stop_consumer
+from app.services.enrichment_service import start_worker, stop_worker
+from app.services.upstream_store import close_store
+
+# Cria tabelas/colunas/índices novos ao subir. Com vários workers (ou autoscaling), deixe 0 e rode
+# "python -m app.core.startup sync-schema" uma vez no deploy: cada worker sobe sem tocar no schema.
+SCHEMA_SYNC_ON_STARTUP = os.getenv("SCHEMA_SYNC_ON_STARTUP", "1") != "0"
+# Abre as conexões (banco, Redis, TMDB/AniList) em paralelo antes de aceitar requisições,
+# para a primeira requisição de cada worker não pagar o custo de conectar
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "1") != "0"
+
+
+def _warm_db():
+    with get_engine().connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+def _warm_redis():
+    get_redis()
+
+
+def _warm_http():
+    # Abre (e deixa no pool) a conexão TLS com cada API externa; a resposta não importa
+    from app.services.tmdb_service import TMDB_BASE_URL
+    from app.services.anilist_service import ANILIST_URL
+    session = get_http_session()
+    for url in (TMDB_BASE_URL, ANILIST_URL):
+        session.head(url, timeout=2)
+
+
+WARMUP_STEPS = {"banco": _warm_db, "redis": _warm_redis, "http": _warm_http}
+
+
+def warm_up():
+    """Executa os passos de aquecimento em paralelo; falhas só geram aviso (o serviço sobe mesmo assim)."""
+    with ThreadPoolExecutor(max_workers=len(WARMUP_STEPS)) as pool:
+        futures = {name: pool.submit(step) for name, step in WARMUP_STEPS.items()}
+    for name, future in futures.items():
+        error = future.exception()
+        if error:
+            print(f"Aviso: aquecimento de {name} falhou: {error}")
+
+
+def configure_threadpool():
+    """Ajusta o threadpool do anyio (rotas síncronas). Precisa rodar dentro do event loop."""
+    from anyio.to_thread import current_default_thread_limiter
+    current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+
+
+def check_pool_size():
+    """Avisa quando o pool do banco é menor que o número de rotas síncronas que podem rodar ao mesmo tempo."""
+    if DATABASE_URL and DATABASE_URL.startswith("sqlite"):
+        return
+    connections = DB_POOL_SIZE + DB_MAX_OVERFLOW
+    if connections < THREADPOOL_SIZE:
+        print(
+            f"Aviso: DB_POOL_SIZE + DB_MAX_OVERFLOW ({connections}) é menor que THREADPOOL_SIZE ({THREADPOOL_SIZE}): "
+            f"com o threadpool cheio, requisições vão esperar por uma conexão do banco."
+        )
+
+
+def startup():
+    """Chamado pelo lifespan do FastAPI antes do worker aceitar requisições."""
+    started = time.perf_counter()
+    check_pool_size()
+    if SCHEMA_SYNC_ON_STARTUP:
+        sync_schema()
+    if STARTUP_WARMUP:
+        warm_up()
+    start_consumer()
+    start_worker()
+    print(f"Inicialização concluída em {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+def shutdown():
+    """Chamado pelo lifespan ao desligar: termina os lotes em andamento (write-behind, enriquecimento) e fecha os pools de conexão."""
+    stop_consumer()
+    stop_worker()
+    close_http_session()
+    close_redis()
+    close_store()
+    dispose_engine()
+
+
+def prepare_cli():
+    """Para os comandos de manutenção (python -m ...): registra todos os modelos e garante o schema."""
+    import app.main  # noqa: F401 (importa os modelos)
+    sync_schema()
+
+
+if __name__ == "__main__":
+    # Uso: python -m app.core.startup sync-schema
+    import sys
+
+    if sys.argv[1:] != ["sync-schema"]:
+        print("Uso: python -m app.core.startup sync-schema")
+        sys.exit(1)
+
+    prepare_cli()
+    print("Schema sincronizado")
@@ -0,0 +1,163 @@
+# app/core/tracing.py
+import functools
+import os
+from contextlib import contextmanager
+from sqlalchemy import event
+from app.core.profiler import PROFILING_ENABLED, register_thread
+
+# file    -> um span por linha (JSON) em TRACING_FILE
+# console -> spans no stdout
+# otlp    -> coletor OTLP/HTTP (endereço em OTEL_EXPORTER_OTLP_ENDPOINT, padrão http://localhost:4318)
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "").lower()
+TRACING_FILE = os.getenv("TRACING_FILE", "traces.jsonl")
+TRACING_SAMPLE_RATIO = float(os.getenv("TRACING_SAMPLE_RATIO", "1"))
+SQL_STATEMENT_MAX_LEN = 1000
+
+_tracer = None
+trace = None
+propagate = None
+
+
+def _create_exporter():
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+    if TRACING_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter()
+    if TRACING_EXPORTER == "file":
+        return ConsoleSpanExporter(
+            out=open(TRACING_FILE, "a", buffering=1),
+            formatter=lambda span: span.to_json(indent=None) + "\n",
+        )
+    return ConsoleSpanExporter()
+
+
+# OpenTelemetry é opcional e só é importado com TRACING_EXPORTER definido (o SDK pesa no tempo de import)
+if TRACING_EXPORTER:
+    try:
+        from opentelemetry import propagate, trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+        provider = TracerProvider(
+            resource=Resource.create({"service.name": "cinelist-backend"}),
+            sampler=ParentBased(TraceIdRatioBased(TRACING_SAMPLE_RATIO)),
+        )
+        provider.add_span_processor(BatchSpanProcessor(_create_exporter()))
+        trace.set_tracer_provider(provider)
+        _tracer = trace.get_tracer("cinelist")
+    except ImportError:
+        print("Aviso: TRACING_EXPORTER definido, mas o opentelemetry-sdk não está instalado. O tracing está desabilitado.")
+    except Exception as e:
+        print(f"Aviso: Falha ao configurar o tracing ({TRACING_EXPORTER}). O tracing está desabilitado. Erro: {e}")
+        _tracer = None
+
+TRACING_ENABLED = _tracer is not None
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Span filho do span atual (o da requisição, ou de outro serviço).
+    Sem tracing, só registra a thread no profiler da requisição (se houver).
+    """
+    register_thread()
+    if _tracer is None:
+        yield None
+        return
+    with _tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
+
+
+def traced(name: str | None = None):
+    """Decorator que envolve a função num span (nome padrão: modulo.funcao)."""
+    def decorator(func):
+        if not TRACING_ENABLED and not PROFILING_ENABLED:
+            return func
+        span_name = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --- SQL ---
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    register_thread()
+    if _tracer is not None:
+        context._trace_span = _tracer.start_span("db.query", attributes={
+            "db.system": conn.dialect.name,
+            "db.statement": statement[:SQL_STATEMENT_MAX_LEN],
+        })
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    current = getattr(context, "_trace_span", None)
+    if current is not None:
+        current.end()
+
+
+def _handle_error(exception_context):
+    current = getattr(exception_context.execution_context, "_trace_span", None)
+    if current is not None:
+        current.record_exception(exception_context.original_exception)
+        current.set_status(trace.Status(trace.StatusCode.ERROR))
+        current.end()
+
+
+def install_sql_tracing(engine):
+    """Um span por query SQL (e registro da thread no profiler), se tracing ou profiling estiverem ligados."""
+    if not TRACING_ENABLED and not PROFILING_ENABLED:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+# --- Requisição ---
+
+class TracingMiddleware:
+    """
+    Middleware ASGI que abre o span raiz de cada requisição (continuando o trace do cliente,
+    se vier o header traceparent) e o nomeia pela rota (ex: POST /media/rate).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _tracer is None:
+            await self.app(scope, receive, send)
+            return
+
+        carrier = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        with _tracer.start_as_current_span(
+            f"{scope['method']} {scope['path']}",
+            context=propagate.extract(carrier),
+            kind=trace.SpanKind.SERVER,
+            attributes={"http.method": scope["method"], "http.target": scope["path"]},
+        ) as current:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                if route is not None:
+                    current.update_name(f"{scope['method']} {route.path}")
+                    current.set_attribute("http.route", route.path)
+                current.set_attribute("http.status_code", status_code)
+                if status_code >= 500:
+                    current.set_status(trace.Status(trace.StatusCode.ERROR))
@@ -1,36 +1,93 @@
 # app/main.py
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from app.config import Base, engine
+from fastapi.responses import ORJSONResponse, Response
+from app.config import on_engine_created
+from app.core.startup import configure_threadpool, startup, shutdown
+from app.core.compression import CompressionMiddleware
+from app.core.query_budget import QUERY_BUDGET_MODE, QueryBudgetMiddleware, install_query_counter
+from app.core.metrics import METRICS_ENABLED, MetricsMiddleware, metrics_response
+from app.core.tracing import TRACING_ENABLED, TracingMiddleware, install_sql_tracing
+from app.core.profiler import PROFILING_ENABLED, ProfilerMiddleware
 from app.models.user import UserModel
+from app.models.media import MediaModel
+from app.models.media_rating_stats import MediaRatingStatsModel
+from app.models.follow import FollowModel
+from app.models.activity import ActivityModel
 from app.models.movie import MovieModel
 from app.models.anime import AnimeModel
 from app.models.serie import SeriesModel
 from app.models.lista import ListaModel
 from app.models.lista_item import ListaItemModel
+from app.models.upstream_response import UpstreamResponseModel
+from app.models.applied_write import AppliedWriteModel
 from app.api.routes.anime_router import anime_router
 from app.api.routes.movie_router import movies_router
 from app.api.routes.serie_router import series_router
 from app.api.routes.media_router import media_router
 from app.api.routes.auth_router import router as auth_router
 from app.api.routes.users_router import users_router
+from app.services.tmdb_service import CACHE_LIST_TTL
 
-# Cria todas as tabelas no banco (caso não existam)
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema e conexões ficam para o startup (fora do import): importar o app é rápido e sem I/O
+    configure_threadpool()
+    await run_in_threadpool(startup)
+    yield
+    await run_in_threadpool(shutdown)
 
-app = FastAPI(title="CineList API")
+# ORJSONResponse serializa as respostas grandes (listas do TMDB/AniList) bem mais rápido que o json padrão
+app = FastAPI(title="CineList API", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 origins = [
     "http://localhost:5173",  # front-end local (Vite)
     "https://mycinelist.vercel.app"# front-end no vercel
 ]
 
+# Contador de queries por requisição (usado pelas métricas e pelo QUERY_BUDGET_MODE=warn|strict)
+if METRICS_ENABLED or QUERY_BUDGET_MODE != "off":
+    on_engine_created(install_query_counter)
+
+# Spans por query SQL (TRACING_EXPORTER) e registro das threads no profiler
+on_engine_created(install_sql_tracing)
+
+# Orçamento de queries: fica por dentro de todos os outros middlewares, mais perto das rotas.
+if QUERY_BUDGET_MODE != "off":
+    app.add_middleware(QueryBudgetMiddleware)
+
+# Compressão gzip/brotli negociada pelo Accept-Encoding.
+# Registrado antes do CORS: o Starlette empilha os middlewares na ordem inversa,
+# então o CORS continua sendo o mais externo (e também vale para respostas vindas do cache).
+# Catálogos públicos: os bytes já comprimidos ficam no cache pelo mesmo TTL das listas
+COMPRESSION_CACHED_PATHS = {
+    "/movies/": CACHE_LIST_TTL,
+    "/series/": CACHE_LIST_TTL,
+    "/anime/": CACHE_LIST_TTL,
+    "/media/popular": CACHE_LIST_TTL,
+}
+app.add_middleware(CompressionMiddleware, minimum_size=1024, cached_paths=COMPRESSION_CACHED_PATHS)
+
+# Métricas Prometheus (latência por rota, queries por requisição, threadpool).
+# Por fora da compressão para medir também as respostas servidas do cache.
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, cached_paths=COMPRESSION_CACHED_PATHS)
+
+# Profiler por amostragem (header X-Profile ou PROFILE_SAMPLE_RATE) e span raiz de cada requisição
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilerMiddleware)
+if TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],             # permite todos os métodos HTTP (GET, POST, PUT, DELETE, etc.)
     allow_headers=["*"],             # permite todos os headers, incluindo Authorization
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],  # paginação por cursor, lida pelo front
 )
 
 # Routers separados por tipo de mídia
@@ -47,3 +104,9 @@ app.include_router(users_router, prefix="/users", tags=["Users"])
 @app.get("/")
 def root():
     return {"message": "API Online"}
+
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        body, content_type = metrics_response()
+        return Response(content=body, media_type=content_type)
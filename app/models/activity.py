@@ -0,0 +1,31 @@
+# app/models/activity.py
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
+from app.config import Base
+
+# Tipos de evento do feed
+ACTIVITY_RATING = "rating"         # avaliou uma mídia
+ACTIVITY_LIST_ITEM = "list_item"   # adicionou uma mídia numa lista
+
+class ActivityModel(Base):
+    """
+    Evento de atividade de um usuário (feed de quem o segue). O id é crescente,
+    então também serve de ordem e de cursor nas timelines.
+    """
+    __tablename__ = "activities"
+    __table_args__ = (
+        # Atividades recentes de um usuário (leitura por pull e backfill ao seguir)
+        Index("ix_activities_user_id_id", "user_id", "id"),
+        # Eventos de uma mídia (troca do título provisório depois do enriquecimento)
+        Index("ix_activities_media", "media_type", "media_id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String, nullable=False)
+    media_type = Column(String, nullable=False)
+    media_id = Column(Integer, nullable=False)
+    title = Column(String, nullable=True)
+    rating = Column(Float, nullable=True)       # só em "rating"
+    lista_id = Column(Integer, nullable=True)   # só em "list_item"
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
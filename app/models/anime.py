@@ -16,12 +16,16 @@ class AnimeModel(Base):
     episodes = Column(Integer, nullable=True)
     status = Column(String, nullable=True)
     comment = Column(String, nullable=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
 
     # ADICIONADO: Campos para as imagens
     poster_path = Column(String, nullable=True)
     backdrop_path = Column(String, nullable=True)
     
+    # Metadados compartilhados (tabela media); as colunas acima ficam NULL nas avaliações novas
+    media_ref_id = Column(Integer, ForeignKey("media.id"), nullable=True, index=True)
+    media = relationship("MediaModel")
+
     user = relationship("UserModel", back_populates="anime_ratings")
 
 # Schema Pydantic
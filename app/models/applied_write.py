@@ -0,0 +1,13 @@
+# app/models/applied_write.py
+from sqlalchemy import Column, String, DateTime
+from app.config import Base
+
+class AppliedWriteModel(Base):
+    """
+    Mutações do write-behind já aplicadas, gravadas na mesma transação da mutação (app/services/write_behind.py).
+    Uma entrada reentregue pela stream depois do commit (o consumidor caiu antes do XACK) não é aplicada de novo.
+    """
+    __tablename__ = "applied_writes"
+
+    write_id = Column(String, primary_key=True)
+    applied_at = Column(DateTime, nullable=False, index=True)  # para apagar as antigas
@@ -0,0 +1,18 @@
+# app/models/follow.py
+from datetime import datetime
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index
+from app.config import Base
+
+class FollowModel(Base):
+    __tablename__ = "follows"
+    __table_args__ = (
+        # Um usuário só segue outro uma vez; também serve para "quem eu sigo"
+        Index("uq_follows_follower_followed", "follower_id", "followed_id", unique=True),
+        # "Quem me segue" (fan-out e lista de seguidores)
+        Index("ix_follows_followed_id", "followed_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    follower_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    followed_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -9,10 +9,13 @@ class ListaModel(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     nome = Column(String, nullable=False)
     description = Column(String, nullable=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
 
     # relacionamento com UserModel
     user = relationship("UserModel", back_populates="listas")
 
     # relacionamento com os itens
-    itens = relationship("ListaItemModel", back_populates="lista", cascade="all, delete-orphan")
+    # passive_deletes: ao deletar a lista, o ON DELETE CASCADE do banco remove os itens
+    # (o ORM não precisa carregar cada item só para apagá-lo)
+    itens = relationship("ListaItemModel", back_populates="lista", cascade="all, delete-orphan", passive_deletes=True,
+                         order_by="(ListaItemModel.position.is_(None), ListaItemModel.position, ListaItemModel.id)")
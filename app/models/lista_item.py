@@ -1,13 +1,18 @@
 #app/models/lista_item.py
-from sqlalchemy import Column, Integer, String, ForeignKey, Float, JSON
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, JSON, Index
 from sqlalchemy.orm import relationship
 from app.config import Base
 
 class ListaItemModel(Base):
     __tablename__ = "lista_itens"
+    # Uma mídia só pode aparecer uma vez por lista (base para o INSERT ... ON CONFLICT DO NOTHING).
+    # drop_duplicates: em bancos antigos, o sync_schema apaga os itens repetidos antes de criar o índice
+    __table_args__ = (
+        Index("uq_lista_itens_lista_media", "lista_id", "media_type", "media_id", unique=True, info={"drop_duplicates": True}),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    lista_id = Column(Integer, ForeignKey("listas.id", ondelete="CASCADE"), nullable=False)
+    lista_id = Column(Integer, ForeignKey("listas.id", ondelete="CASCADE"), nullable=False, index=True)
     media_type = Column(String, nullable=False)  # "movie", "serie", "anime"
     media_id = Column(Integer, nullable=False)   # id da API
     media_title = Column(String, nullable=False) # salvar nome da mídia
@@ -23,4 +28,10 @@ class ListaItemModel(Base):
     first_air_date = Column(String, nullable=True)   # Para Séries
     startDate = Column(JSON, nullable=True)          # Para Animes (AniList envia um objeto)
 
+    # Ordem do item dentro da lista (itens antigos ficam NULL e vão para o fim)
+    position = Column(Integer, nullable=True)
+
+    # Metadados compartilhados da mídia (tabela media)
+    media_ref_id = Column(Integer, ForeignKey("media.id"), nullable=True, index=True)
+
     lista = relationship("ListaModel", back_populates="itens")
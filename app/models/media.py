@@ -0,0 +1,46 @@
+# app/models/media.py
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index, text
+from app.config import Base
+
+class MediaModel(Base):
+    """
+    Metadados de uma mídia (filme, série ou anime), guardados uma única vez
+    e referenciados pelas avaliações e pelos itens de lista.
+    """
+    __tablename__ = "media"
+    __table_args__ = (
+        Index("uq_media_type_external_id", "media_type", "external_id", unique=True),
+        # Fila do enrichment_service: só as mídias ainda sem os metadados completos
+        Index(
+            "ix_media_pending_enrichment", "enrich_after",
+            postgresql_where=text("fetched_at IS NULL"), sqlite_where=text("fetched_at IS NULL"),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    media_type = Column(String, nullable=False)    # "movie", "serie", "anime"
+    external_id = Column(Integer, nullable=False)  # id no TMDB / AniList
+
+    title = Column(String, nullable=False)
+    overview = Column(String, nullable=True)       # "description" no caso dos animes
+    release_date = Column(String, nullable=True)
+    director = Column(String, nullable=True)       # filmes
+    creator = Column(String, nullable=True)        # séries
+    cast = Column(String, nullable=True)
+    runtime = Column(Integer, nullable=True)
+    budget = Column(Float, nullable=True)
+    revenue = Column(Float, nullable=True)
+    episodes = Column(Integer, nullable=True)
+    status = Column(String, nullable=True)
+    last_episode = Column(String, nullable=True)
+    poster_path = Column(String, nullable=True)
+    backdrop_path = Column(String, nullable=True)
+
+    # Quando os metadados completos foram buscados na API externa.
+    # NULL = só temos os dados básicos (ex: vindos de um card do front ao adicionar numa lista)
+    fetched_at = Column(DateTime, nullable=True)
+
+    # Enriquecimento em segundo plano (enrichment_service): tentativas que falharam e quando tentar de novo.
+    # enrich_after NULL = assim que possível
+    enrich_attempts = Column(Integer, nullable=False, server_default="0")
+    enrich_after = Column(DateTime, nullable=True)
@@ -0,0 +1,33 @@
+# app/models/media_rating_stats.py
+from sqlalchemy import Column, Integer, String, Float
+from app.config import Base
+
+# Faixas do histograma: nota arredondada de 0 a 10
+HISTOGRAM_BUCKETS = range(11)
+
+class MediaRatingStatsModel(Base):
+    """
+    Agregado das notas da comunidade CineList por mídia, mantido de forma incremental
+    a cada avaliação criada/alterada/removida (média = soma / quantidade).
+    """
+    __tablename__ = "media_rating_stats"
+
+    media_type = Column(String, primary_key=True)  # "movie", "serie", "anime"
+    media_id = Column(Integer, primary_key=True)   # id no TMDB / AniList
+
+    rating_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Float, nullable=False, default=0)
+    rating_sum_sq = Column(Float, nullable=False, default=0) # soma dos quadrados (para o desvio padrão)
+
+    # Histograma: quantas notas caíram em cada faixa (nota arredondada)
+    bucket_0 = Column(Integer, nullable=False, default=0)
+    bucket_1 = Column(Integer, nullable=False, default=0)
+    bucket_2 = Column(Integer, nullable=False, default=0)
+    bucket_3 = Column(Integer, nullable=False, default=0)
+    bucket_4 = Column(Integer, nullable=False, default=0)
+    bucket_5 = Column(Integer, nullable=False, default=0)
+    bucket_6 = Column(Integer, nullable=False, default=0)
+    bucket_7 = Column(Integer, nullable=False, default=0)
+    bucket_8 = Column(Integer, nullable=False, default=0)
+    bucket_9 = Column(Integer, nullable=False, default=0)
+    bucket_10 = Column(Integer, nullable=False, default=0)
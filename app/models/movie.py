@@ -19,12 +19,16 @@ class MovieModel(Base):
     revenue = Column(Float, nullable=True)
     rating = Column(Float, nullable=True)
     comment = Column(String, nullable=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     
     # ADICIONADO: Campos para as imagens
     poster_path = Column(String, nullable=True)
     backdrop_path = Column(String, nullable=True)
     
+    # Metadados compartilhados (tabela media); as colunas acima ficam NULL nas avaliações novas
+    media_ref_id = Column(Integer, ForeignKey("media.id"), nullable=True, index=True)
+    media = relationship("MediaModel")
+
     user = relationship("UserModel", back_populates="movie_ratings")
 
 # Schema Pydantic
@@ -0,0 +1,29 @@
+# app/models/upstream_response.py
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from app.config import Base
+
+class UpstreamResponseModel(Base):
+    """
+    Última resposta de uma chamada às APIs externas (URL do TMDB ou consulta GraphQL da AniList),
+    com os validadores HTTP para revalidar com requisições condicionais (app/services/upstream_store.py).
+    """
+    __tablename__ = "upstream_responses"
+    __table_args__ = (
+        Index("uq_upstream_responses_key", "key", unique=True),
+        # Para invalidar as respostas de uma mídia (ex: ids do /changes do TMDB)
+        Index("ix_upstream_responses_resource", "provider", "resource", "resource_id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    provider = Column(String, nullable=False)      # "tmdb", "anilist"
+    key = Column(String, nullable=False)           # URL sem a api_key, ou hash da consulta GraphQL
+    resource = Column(String, nullable=True)       # "movie", "tv", "anime"
+    resource_id = Column(Integer, nullable=True)   # id da mídia na API
+
+    body = Column(Text, nullable=False)            # JSON da resposta
+    etag = Column(String, nullable=True)
+    last_modified = Column(String, nullable=True)
+
+    fetched_at = Column(DateTime, nullable=False)  # quando o corpo foi baixado
+    # Última confirmação de que o corpo continua atual (304, ou /changes sem a mídia). NULL = revalidar
+    validated_at = Column(DateTime, nullable=True)
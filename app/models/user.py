@@ -1,10 +1,21 @@
 # app/models/user.py
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, DateTime, Index, func, text
 from sqlalchemy.orm import relationship
 from app.config import Base
 
 class UserModel(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Busca por prefixo no diretório (lower(username) LIKE 'abc%'); no PostgreSQL o
+        # text_pattern_ops permite usar o índice no LIKE independente da collation do banco
+        Index(
+            "ix_users_username_lower_pattern",
+            func.lower(text("username")).label("username_lower"),
+            postgresql_ops={"username_lower": "text_pattern_ops"},
+        ),
+        # Keyset do diretório: ORDER BY username, id e (username, id) > (cursor) saem do índice
+        Index("ix_users_username_id", "username", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, nullable=False)
@@ -12,6 +23,13 @@ class UserModel(Base):
     password = Column(String, nullable=False)
     avatar = Column(String, nullable=False, default='default')
 
+    # Contadores do grafo de seguidores (mantidos em follow/unfollow)
+    follower_count = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    following_count = Column(Integer, nullable=False, default=0, server_default=text("0"))
+
+    # Exclusão de conta: preenchido na hora (tokens deixam de valer), os dados são removidos depois
+    deleted_at = Column(DateTime, nullable=True)
+
     # relacionamento com avaliações
     movie_ratings = relationship("MovieModel", back_populates="user")
     serie_ratings = relationship("SeriesModel", back_populates="user")
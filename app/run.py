@@ -0,0 +1,171 @@
+# app/run.py
+"""
+Ponto de entrada de produção:
+
+    python -m app.run
+
+Sobe o gunicorn com workers uvicorn (supervisão, timeout e reciclagem dos workers); sem o gunicorn
+(ex: Windows), sobe o uvicorn direto com um worker.
+Toda a configuração vem de variáveis de ambiente (veja .env.example) e é conferida antes de subir.
+"""
+import glob
+import importlib.util
+import multiprocessing
+import os
+import tempfile
+from dataclasses import dataclass, field, fields
+from app.config import DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, THREADPOOL_SIZE
+
+# Não importe nada que carregue o prometheus_client aqui: o PROMETHEUS_MULTIPROC_DIR
+# precisa estar definido antes (prepare_metrics_dir)
+
+try:
+    from uvicorn.workers import UvicornWorker
+except ImportError:  # pragma: no cover (gunicorn não existe no Windows)
+    UvicornWorker = None
+
+
+def _env_int(name: str, default: int):
+    return int(os.getenv(name) or default)
+
+
+def _default_workers():
+    # As rotas síncronas rodam no threadpool de cada worker; um worker por CPU aproveita
+    # todos os núcleos sem disputa de GIL entre processos. WEB_CONCURRENCY é o nome usado pelos PaaS.
+    return _env_int("WORKERS", _env_int("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+
+
+@dataclass
+class ServerConfig:
+    host: str = field(default_factory=lambda: os.getenv("HOST", "0.0.0.0"))
+    port: int = field(default_factory=lambda: _env_int("PORT", 8000))
+    workers: int = field(default_factory=_default_workers)
+    worker_class: str = field(default_factory=lambda: os.getenv("WORKER_CLASS", "app.run.CinelistUvicornWorker"))
+    threadpool_size: int = THREADPOOL_SIZE
+    loop: str = field(default_factory=lambda: os.getenv("UVICORN_LOOP", "auto"))    # auto | uvloop | asyncio
+    http: str = field(default_factory=lambda: os.getenv("UVICORN_HTTP", "auto"))    # auto | httptools | h11
+    keepalive: int = field(default_factory=lambda: _env_int("KEEPALIVE", 5))
+    timeout: int = field(default_factory=lambda: _env_int("WORKER_TIMEOUT", 60))
+    graceful_timeout: int = field(default_factory=lambda: _env_int("GRACEFUL_TIMEOUT", 30))
+    # Recicla o worker depois de N requisições (0 desliga); o jitter evita que todos reiniciem juntos
+    max_requests: int = field(default_factory=lambda: _env_int("MAX_REQUESTS", 10000))
+    max_requests_jitter: int = field(default_factory=lambda: _env_int("MAX_REQUESTS_JITTER", 1000))
+    backlog: int = field(default_factory=lambda: _env_int("BACKLOG", 2048))
+    log_level: str = field(default_factory=lambda: os.getenv("LOG_LEVEL", "info"))
+
+    def check(self):
+        """Confere a configuração e retorna a lista de avisos."""
+        warnings = []
+        cpus = multiprocessing.cpu_count()
+        if self.workers > 2 * cpus + 1:
+            warnings.append(f"WORKERS={self.workers} é mais que 2 x CPUs + 1 ({2 * cpus + 1}): os workers vão disputar CPU")
+        if UvicornWorker is None:
+            warnings.append("gunicorn não está disponível: subindo só o uvicorn, com 1 worker e sem MAX_REQUESTS/WORKER_TIMEOUT")
+        for option, module in (("loop", "uvloop"), ("http", "httptools")):
+            if getattr(self, option) == module and importlib.util.find_spec(module) is None:
+                warnings.append(f"UVICORN_{option.upper()}={module}, mas o {module} não está instalado")
+        if DATABASE_URL and not DATABASE_URL.startswith("sqlite"):
+            # pool x threadpool é conferido em cada worker (app/core/startup.py); aqui, o total no banco
+            connections = DB_POOL_SIZE + DB_MAX_OVERFLOW
+            print(f"Conexões com o banco: até {self.workers * connections} ({self.workers} workers x {connections})")
+        elif DATABASE_URL and self.workers > 1:
+            warnings.append("SQLite com vários workers: as escritas concorrentes vão esperar pelo lock do arquivo")
+        if self.timeout and self.graceful_timeout > self.timeout:
+            warnings.append("GRACEFUL_TIMEOUT maior que WORKER_TIMEOUT: o worker pode ser morto antes de terminar as requisições")
+        if self.max_requests and not self.max_requests_jitter:
+            warnings.append("MAX_REQUESTS sem MAX_REQUESTS_JITTER: todos os workers vão reiniciar ao mesmo tempo")
+        return warnings
+
+    def gunicorn_options(self):
+        return {
+            "bind": f"{self.host}:{self.port}",
+            "workers": self.workers,
+            "worker_class": self.worker_class,
+            "keepalive": self.keepalive,
+            "timeout": self.timeout,
+            "graceful_timeout": self.graceful_timeout,
+            "max_requests": self.max_requests,
+            "max_requests_jitter": self.max_requests_jitter,
+            "backlog": self.backlog,
+            "loglevel": self.log_level,
+            "child_exit": child_exit,
+        }
+
+
+if UvicornWorker is not None:
+    class CinelistUvicornWorker(UvicornWorker):
+        """Worker uvicorn do gunicorn com o event loop e o parser HTTP escolhidos em UVICORN_LOOP/UVICORN_HTTP."""
+        CONFIG_KWARGS = {
+            "loop": os.getenv("UVICORN_LOOP", "auto"),
+            "http": os.getenv("UVICORN_HTTP", "auto"),
+        }
+
+
+def child_exit(server, worker):
+    # Métricas multiprocesso (PROMETHEUS_MULTIPROC_DIR): descarta os gauges do worker que saiu
+    from app.core.metrics import mark_worker_dead
+    mark_worker_dead(worker.pid)
+
+
+def prepare_metrics_dir(workers: int):
+    """
+    Com vários workers, as métricas Prometheus precisam de um diretório compartilhado, vazio a cada
+    início. Tem que rodar antes de qualquer import do prometheus_client.
+    """
+    if workers <= 1 or os.getenv("METRICS_ENABLED", "1") == "0":
+        return
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if not directory:
+        directory = tempfile.mkdtemp(prefix="cinelist-metrics-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, "*.db")):
+        os.remove(path)
+
+
+def run_gunicorn(config: ServerConfig):
+    from gunicorn.app.base import BaseApplication
+
+    class CinelistApplication(BaseApplication):
+        def load_config(self):
+            for key, value in config.gunicorn_options().items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app.main import app
+            return app
+
+    CinelistApplication().run()
+
+
+def run_uvicorn(config: ServerConfig):
+    import uvicorn
+    uvicorn.run(
+        "app.main:app",
+        host=config.host,
+        port=config.port,
+        loop=config.loop,
+        http=config.http,
+        timeout_keep_alive=config.keepalive,
+        timeout_graceful_shutdown=config.graceful_timeout,
+        backlog=config.backlog,
+        log_level=config.log_level,
+    )
+
+
+def main():
+    config = ServerConfig()
+    for warning in config.check():
+        print(f"Aviso: {warning}")
+    summary = ", ".join(f"{f.name}={getattr(config, f.name)}" for f in fields(config))
+    print(f"Configuração do servidor: {summary}")
+
+    if UvicornWorker is not None:
+        prepare_metrics_dir(config.workers)
+        run_gunicorn(config)
+    else:
+        run_uvicorn(config)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 # app/schemas/lista_schema.py
-from pydantic import BaseModel, computed_field
+from pydantic import BaseModel, Field, computed_field
 from typing import List, Optional, Any, Union
 
 # --- Base ---
@@ -24,9 +24,8 @@ class ListaItemBase(BaseModel):
     media_id: int
     media_title: str
 
-# --- Criação de item ---
-class ListaItemCreate(BaseModel):
-    lista_id: int
+# --- Dados de uma mídia a ser salva numa lista ---
+class ListaItemData(BaseModel):
     media_type: str
     media_id: int
 
@@ -41,9 +40,13 @@ class ListaItemCreate(BaseModel):
     first_air_date: Optional[str] = None
     startDate: Optional[dict] = None
 
+# --- Criação de item ---
+class ListaItemCreate(ListaItemData):
+    lista_id: int
+
 # --- Retorno de item ---
 class ListaItemOut(ListaItemBase):
-    id: int
+    id: int | None = None # None enquanto o item está na fila do write-behind
     lista_id: int
     class Config:
         from_attributes = True
@@ -57,6 +60,11 @@ class ListaWithItens(ListaOut):
     def item_count(self) -> int:
         return len(self.itens)
 
+# --- SCHEMA PARA RESUMO SEM ITENS (usado em /listas/user/{user_id}/summary) ---
+# A contagem vem de um COUNT no banco, sem carregar os itens
+class ListaSummary(ListaOut):
+    item_count: int = 0
+
 # --- SCHEMA PARA ITEM DETALHADO (usado em /listas/get) ---
 class MediaItemDetailSchema(BaseModel):
     id: int
@@ -100,4 +108,45 @@ class DeleteItemRequest(BaseModel):
 
 class DeleteListRequest(BaseModel):
     user_id: int
-    lista_id: int
\ No newline at end of file
+    lista_id: int
+
+# --- Operações em lote ---
+BULK_MAX_ITEMS = 500
+
+class MediaRef(BaseModel):
+    media_id: int
+    media_type: str
+
+class ListaItemBulkCreate(BaseModel):
+    lista_id: int
+    itens: List[ListaItemData] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+class ListaItemBulkDelete(BaseModel):
+    user_id: int
+    lista_id: int
+    itens: List[MediaRef] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+class ListaReorderRequest(BaseModel):
+    user_id: int
+    lista_id: int
+    itens: List[MediaRef] = Field(..., max_length=BULK_MAX_ITEMS) # na ordem desejada
+
+class ListaCloneRequest(BaseModel):
+    user_id: int # dono da nova lista
+    lista_id: int # lista de origem
+    nome: Optional[str] = None
+    description: Optional[str] = None
+
+class ListaMergeRequest(BaseModel):
+    user_id: int
+    source_lista_id: int
+    target_lista_id: int
+    delete_source: bool = False
+
+class BulkItemResult(MediaRef):
+    status: str # "added", "duplicate", "removed", "not_found", "moved"
+
+class BulkOperationResult(BaseModel):
+    lista_id: int
+    results: List[BulkItemResult] = []
+
@@ -4,6 +4,8 @@ from pydantic import BaseModel
 # --- Busca ---
 class SearchRequest(BaseModel):
     name: str
+    language: str | None = None # idioma do TMDB (ex: en-US); padrão: TMDB_LANGUAGE
+    region: str | None = None   # país (ex: BR) para a busca de filmes
 
 # --- Avaliações ---
 class RateRequest(BaseModel):
@@ -13,6 +15,13 @@ class RateRequest(BaseModel):
     comment: str | None = None
     user_id: int
 
+    # Dados do card (opcionais): mostrados até os metadados completos serem buscados em segundo plano
+    title: str | dict | None = None # string (TMDB) ou dict (AniList)
+    poster_path: str | None = None
+    backdrop_path: str | None = None
+    overview: str | None = None
+    release_date: str | None = None
+
 class UpdateRatingRequest(BaseModel):
     media_type: str
     media_id: int
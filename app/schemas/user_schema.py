@@ -1,4 +1,5 @@
 # app/schemas/user_schema.py
+from datetime import datetime
 from pydantic import BaseModel, EmailStr
 
 class UserLogin(BaseModel):
@@ -21,6 +22,8 @@ class UserPublicOut(BaseModel):
     id: int
     username: str
     avatar: str
+    follower_count: int = 0
+    following_count: int = 0
 
     class Config:
         from_attributes = True
@@ -34,8 +37,37 @@ class UserRegister(BaseModel):
 # Para a resposta padronizada de /login e /register
 class TokenResponse(BaseModel):
     access_token: str
+    refresh_token: str | None = None # só em /login, /register e /refresh
     token_type: str
     user: UserOut
 
+# Para /refresh e /logout
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: str | None = None
+
 class UserUpdateAvatar(BaseModel):
-    avatar: str
\ No newline at end of file
+    avatar: str
+
+# --- Feed de atividades ---
+class FeedUser(BaseModel):
+    id: int
+    username: str
+    avatar: str
+
+class FeedEvent(BaseModel):
+    id: int
+    kind: str # "rating" ou "list_item"
+    user: FeedUser
+    media_type: str
+    media_id: int
+    title: str | None = None
+    rating: float | None = None
+    lista_id: int | None = None
+    created_at: datetime
+
+class FeedPage(BaseModel):
+    results: list[FeedEvent]
+    next_cursor: int | None = None # passe como ?before= para a próxima página
@@ -0,0 +1,119 @@
+# app/services/account_service.py
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.config import SessionLocal
+from app.core.jobs import update_job
+from app.core.revocation import revoke_user_tokens
+from app.models.user import UserModel
+from app.models.lista import ListaModel
+from app.models.lista_item import ListaItemModel
+from app.services.stats_service import delete_user_ratings
+from app.services.feed_service import delete_user_follows, delete_user_activities
+
+PURGE_BATCH_SIZE = 500  # linhas por transação na remoção dos dados da conta
+
+
+def soft_delete_user(db: Session, user_id: int):
+    """
+    Exclusão imediata: marca a conta como excluída, revoga os tokens dela (inclusive nas rotas
+    que só leem as claims, sem ir ao banco) e anonimiza e-mail/usuário, liberando os dois para novos cadastros.
+    Os dados são removidos depois, em lotes, por purge_user. Faz commit.
+    """
+    db.query(UserModel).filter(UserModel.id == user_id).update({
+        UserModel.deleted_at: datetime.utcnow(),
+        UserModel.email: f"deleted-{user_id}@deleted.invalid",
+        UserModel.username: f"deleted-{user_id}",
+        UserModel.password: "!",  # nenhum hash bcrypt confere com isso
+    }, synchronize_session=False)
+    db.commit()
+    revoke_user_tokens(user_id)
+
+
+def _delete_list_items(db: Session, user_id: int, limit: int):
+    user_list_ids = select(ListaModel.id).where(ListaModel.user_id == user_id)
+    batch = select(ListaItemModel.id).where(ListaItemModel.lista_id.in_(user_list_ids)).limit(limit)
+    return db.query(ListaItemModel).filter(ListaItemModel.id.in_(batch)).delete(synchronize_session=False)
+
+
+def _delete_lists(db: Session, user_id: int, limit: int):
+    batch = select(ListaModel.id).where(ListaModel.user_id == user_id).limit(limit)
+    return db.query(ListaModel).filter(ListaModel.id.in_(batch)).delete(synchronize_session=False)
+
+
+# Etapas da remoção, na ordem das chaves estrangeiras (filhos antes do usuário)
+PURGE_STEPS = [
+    ("ratings", delete_user_ratings),
+    ("list_items", _delete_list_items),
+    ("lists", _delete_lists),
+    ("follows", delete_user_follows),
+    ("activities", delete_user_activities),
+]
+
+
+def purge_user(db: Session, user_id: int, batch_size: int = PURGE_BATCH_SIZE, on_progress=None):
+    """
+    Remove os dados de uma conta já marcada como excluída, em lotes de `batch_size`
+    linhas com um commit por lote (transações curtas, sem segurar locks por muito tempo).
+    Pode ser chamada de novo se for interrompida: continua de onde parou.
+    Retorna {etapa: linhas removidas}.
+    """
+    deleted = {name: 0 for name, _ in PURGE_STEPS}
+    for name, step in PURGE_STEPS:
+        while True:
+            removed = step(db, user_id, batch_size)
+            db.commit()
+            deleted[name] += removed
+            if on_progress:
+                on_progress(name, deleted)
+            if removed < batch_size:
+                break
+
+    # Por último o próprio usuário (o que sobrar cai no ON DELETE CASCADE)
+    db.query(UserModel).filter(UserModel.id == user_id, UserModel.deleted_at.isnot(None)).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+def run_account_deletion_job(job_id: str, user_id: int):
+    """Job de remoção da conta (BackgroundTasks), com o progresso de cada etapa em jobs."""
+    db = SessionLocal()
+    update_job(job_id, status="running")
+    try:
+        deleted = purge_user(
+            db, user_id,
+            on_progress=lambda step, deleted: update_job(job_id, step=step, deleted=deleted),
+        )
+        update_job(job_id, status="done", step=None, deleted=deleted)
+    except Exception as e:
+        db.rollback()
+        print(f"Erro no job de exclusão da conta {user_id}: {e}")
+        update_job(job_id, status="failed", error=str(e))
+    finally:
+        db.close()
+
+
+def purge_pending(db: Session):
+    """Conclui a remoção de todas as contas marcadas como excluídas (ex: job interrompido por um deploy)."""
+    user_ids = [row[0] for row in db.query(UserModel.id).filter(UserModel.deleted_at.isnot(None))]
+    for user_id in user_ids:
+        deleted = purge_user(db, user_id)
+        print(f"Conta {user_id} removida: {deleted}")
+    print(f"{len(user_ids)} conta(s) pendente(s) processada(s)")
+
+
+if __name__ == "__main__":
+    # Uso: python -m app.services.account_service purge
+    import sys
+    from app.core.startup import prepare_cli
+
+    if sys.argv[1:] != ["purge"]:
+        print("Uso: python -m app.services.account_service purge")
+        sys.exit(1)
+
+    prepare_cli()  # registra todos os modelos e garante o schema
+    session = SessionLocal()
+    try:
+        purge_pending(session)
+    finally:
+        session.close()
@@ -0,0 +1,95 @@
+# app/services/anilist_query.py
+"""
+Montagem das consultas GraphQL da AniList.
+
+As consultas usam fragments compartilhados: listas (populares, busca) e detalhes pedem o mesmo
+formato de mídia (MEDIA_FIELDS), então qualquer resposta preenche o cache por mídia do anilist_service.
+A complexidade (número de campos, com os fragments expandidos) e a profundidade de cada consulta são
+estimadas quando ela é montada e conferidas contra os limites configurados, para que uma consulta que
+cresceu demais falhe ao importar o módulo. É uma estimativa do formato da consulta: os campos de uma
+lista (ex: Page.media) contam uma vez, não perPage vezes, e o cálculo da AniList não é reproduzido,
+então passar na estimativa não garante que a API aceite a consulta.
+"""
+import os
+import re
+from dataclasses import dataclass
+
+# Limites aplicados pela AniList às consultas (configuráveis, caso a API mude)
+ANILIST_MAX_COMPLEXITY = int(os.getenv("ANILIST_MAX_COMPLEXITY", "500"))
+ANILIST_MAX_DEPTH = int(os.getenv("ANILIST_MAX_DEPTH", "10"))
+# Máximo de itens por página aceito pela AniList (Page.perPage)
+ANILIST_MAX_PER_PAGE = 50
+
+# Campo (com argumentos opcionais), spread de fragment, ou chave
+_TOKEN = re.compile(r"\.\.\.\s*(\w+)|(\w+)\s*(?:\([^)]*\))?|([{}])")
+
+
+@dataclass(frozen=True)
+class Fragment:
+    name: str
+    on: str
+    fields: str
+
+    def __str__(self):
+        return f"fragment {self.name} on {self.on} {{{self.fields}}}"
+
+
+@dataclass(frozen=True)
+class Query:
+    text: str
+    complexity: int
+    depth: int
+
+
+# Formato único de mídia: tudo o que os cards e a página de detalhes usam
+MEDIA_FIELDS = Fragment("MediaFields", "Media", """
+  id
+  title { romaji english }
+  description(asHtml: false)
+  startDate { year month day }
+  coverImage { large medium }
+  bannerImage
+  averageScore
+  popularity
+  genres
+  episodes
+  status
+""")
+
+
+def estimate(selection: str, fragments: dict, level: int = 0):
+    """
+    (complexidade, profundidade) de uma seleção: cada campo conta 1, uma vez (sem multiplicar a seleção
+    de uma lista pelo perPage); fragments são expandidos.
+    """
+    complexity, depth = 0, level
+    for spread, field, brace in _TOKEN.findall(selection):
+        if spread:
+            if spread not in fragments:
+                raise ValueError(f"Fragment desconhecido na consulta AniList: {spread}")
+            fragment_complexity, fragment_depth = estimate(fragments[spread].fields, fragments, level)
+            complexity += fragment_complexity
+            depth = max(depth, fragment_depth)
+        elif field:
+            complexity += 1
+            depth = max(depth, level + 1)
+        elif brace == "{":
+            level += 1
+        else:
+            level -= 1
+    return complexity, depth
+
+
+def build_query(variables: str, selection: str, fragments: tuple = (MEDIA_FIELDS,)):
+    """
+    Monta "query (variables) { selection }" com os fragments e confere os limites.
+    Ex: build_query("$id: Int", "Media(id: $id) { ...MediaFields }")
+    """
+    complexity, depth = estimate(selection, {fragment.name: fragment for fragment in fragments})
+    if complexity > ANILIST_MAX_COMPLEXITY or depth > ANILIST_MAX_DEPTH:
+        raise ValueError(
+            f"Consulta AniList acima dos limites: complexidade {complexity} (máx. {ANILIST_MAX_COMPLEXITY}), "
+            f"profundidade {depth} (máx. {ANILIST_MAX_DEPTH})"
+        )
+    text = f"query ({variables}) {{{selection}}}\n" + "\n".join(str(fragment) for fragment in fragments)
+    return Query(text, complexity, depth)
@@ -1,22 +1,50 @@
 # app/services/anilist_service.py
-import requests
+import os
 import hashlib 
-from app.core.cache import get_from_cache, set_to_cache
+import orjson
+from app.core.cache import get_from_cache, set_to_cache, get_many_from_cache, set_many_to_cache
+from app.core.http import HTTP_TIMEOUT, get_http_session
+from app.core.metrics import track_upstream, graphql_endpoint, record_upstream_error
+from app.core.pagination import CATALOG_PREFETCH_PAGES, page_window, page_ttl, prefetch
+from app.core.tracing import span, traced
+from app.services import upstream_store
+from app.services.anilist_query import ANILIST_MAX_PER_PAGE, build_query
 
-ANILIST_URL = "https://graphql.anilist.co"
+ANILIST_URL = os.getenv("ANILIST_API_URL", "https://graphql.anilist.co")
 
 # --- Duração do Cache ---
 CACHE_LIST_TTL = 300      # 5 minutos para listas (populares, busca)
 CACHE_DETAILS_TTL = 3600  # 1 hora para detalhes individuais
+# Respostas guardadas no upstream_store (a AniList não tem ETag nem feed de mudanças: revalida por idade)
+ANILIST_STORE_MAX_AGE = int(os.getenv("ANILIST_STORE_MAX_AGE", "86400"))
+
+# --- Consultas (todas com o mesmo formato de mídia: ...MediaFields) ---
+TOP_ANIMES_QUERY = build_query("$page: Int, $perPage: Int", """
+  Page(page: $page, perPage: $perPage) {
+    media(type: ANIME, sort: TRENDING_DESC) { ...MediaFields }
+  }
+""")
+SEARCH_QUERY = build_query("$page: Int, $perPage: Int, $search: String", """
+  Page(page: $page, perPage: $perPage) {
+    media(type: ANIME, search: $search, sort: [POPULARITY_DESC]) { ...MediaFields }
+  }
+""")
+DETAILS_QUERY = build_query("$id: Int", "Media(id: $id, type: ANIME) { ...MediaFields }")
+MAL_ID_QUERY = build_query("$idMal: Int", "Media(idMal: $idMal, type: ANIME) { ...MediaFields }")
 
 def _post_query(query: str, variables: dict):
     """Faz a requisição POST para a API GraphQL da AniList."""
+    import requests  # já carregado pela sessão HTTP (o import do módulo não carrega o requests)
+
+    endpoint = graphql_endpoint(query)
     try:
-        response = requests.post(ANILIST_URL, json={"query": query, "variables": variables})
-        response.raise_for_status()
-        data = response.json()
+        with span("anilist POST", **{"graphql.field": endpoint}), track_upstream("anilist", endpoint):
+            response = get_http_session().post(ANILIST_URL, json={"query": query, "variables": variables}, timeout=HTTP_TIMEOUT)
+            response.raise_for_status()
+            data = response.json()
 
         if "errors" in data:
+            record_upstream_error("anilist", endpoint, "graphql")
             error_message = data["errors"][0].get("message", "Erro desconhecido na API AniList")
             print(f"Erro GraphQL AniList: {error_message}")
             return {} 
@@ -30,81 +58,107 @@ def _post_query(query: str, variables: dict):
         print(f"Erro inesperado ao processar resposta AniList: {e}")
         return {}
 
-# --- Populares ---
-def get_top_animes(limit=50):
-    """Busca os animes mais populares, usando cache Redis."""
-    cache_key = f"anilist:trending_animes:{limit}"
+def _stored_post_query(query: str, variables: dict, resource: tuple | None = None):
+    """_post_query passando pelo upstream_store (a resposta sobrevive à expiração do Redis)."""
+    def download(etag, last_modified):
+        data = _post_query(query, variables)
+        return (data, None, None) if data else None
 
-    cached_data = get_from_cache(cache_key)
-    if cached_data:
-        return cached_data
+    key = "graphql:" + hashlib.sha256(query.encode() + orjson.dumps(variables, option=orjson.OPT_SORT_KEYS)).hexdigest()
+    return upstream_store.fetch("anilist", key, download, resource, ANILIST_STORE_MAX_AGE) or {}
+
+# --- Cache por mídia ---
+# Cada mídia vista (em lista, busca ou detalhes) fica numa chave própria; as listas guardam só os ids.
+# Assim, abrir os detalhes de um anime que apareceu nos populares não chama a AniList.
+
+def _media_key(anime_id: int):
+    return f"anilist:media:{anime_id}"
+
+
+def _cache_media(media_list: list):
+    set_many_to_cache({_media_key(media["id"]): media for media in media_list}, CACHE_DETAILS_TTL)
 
-    query = """
-    query ($page: Int, $perPage: Int) {
-      Page(page: $page, perPage: $perPage) {
-        media(type: ANIME, sort: TRENDING_DESC) {
-          id
-          title { romaji english }
-          description(asHtml: false)
-          startDate { year month day }
-          coverImage { large medium }
-          bannerImage
-          averageScore
-          genres
-        }
-      }
-    }
-    """
-    variables = {"page": 1, "perPage": limit}
-    raw_data = _post_query(query, variables)
-    page_data = raw_data.get("Page", {})
-    results = page_data.get("media", []) if page_data else []
+
+def _get_cached_list(cache_key: str):
+    """Mídias de uma lista em cache, ou None se a lista (ou alguma das mídias) não estiver no cache."""
+    ids = get_from_cache(cache_key)
+    if not ids:
+        return None
+    media_list = get_many_from_cache([_media_key(anime_id) for anime_id in ids])
+    return None if any(media is None for media in media_list) else media_list
+
+
+def _fetch_page_list(query, variables: dict, limit: int, cache_key: str):
+    """Busca até limit mídias (em páginas de até ANILIST_MAX_PER_PAGE) e guarda a lista e cada mídia."""
+    results = []
+    page = 1
+    while len(results) < limit:
+        per_page = min(limit - len(results), ANILIST_MAX_PER_PAGE)
+        raw_data = _post_query(query.text, {**variables, "page": page, "perPage": per_page})
+        page_data = raw_data.get("Page", {})
+        media_list = page_data.get("media", []) if page_data else []
+        results.extend(media_list)
+        if len(media_list) < per_page:
+            break
+        page += 1
 
     if results:
-        set_to_cache(cache_key, results, CACHE_LIST_TTL)
+        _cache_media(results)
+        set_to_cache(cache_key, [media["id"] for media in results], CACHE_LIST_TTL)
 
     return results
 
-# --- Detalhes individuais ---
-def get_anime_details(anime_id: int):
-    """Busca detalhes de um anime, usando cache Redis com TTL."""
-    cache_key = f"anilist:details:{anime_id}"
-    
-    cached_data = get_from_cache(cache_key)
-    if cached_data:
-        return cached_data
+# --- Populares ---
+# Páginas de tamanho fixo, cada uma com sua chave no cache: os cursores das rotas caem sempre nas mesmas páginas
+TOP_ANIMES_PAGE_SIZE = ANILIST_MAX_PER_PAGE
 
-    query = """
-    query ($id: Int) {
-      Media(id: $id, type: ANIME) {
-        id
-        title { romaji english }
-        description(asHtml: false)
-        averageScore
-        startDate { year month day }
-        episodes
-        status
-        coverImage { large }
-        bannerImage
-      }
-    }
-    """
-    raw_data = _post_query(query, {"id": anime_id})
-    media = raw_data.get("Media")
+def _top_animes_key(page: int):
+    return f"anilist:trending_animes:p{page}"
 
-    if not media:
-        return None # Não armazena nada no cache se não encontrar
+def _fetch_top_animes_page(page: int):
+    """Busca uma página dos populares na AniList e guarda a lista de ids e cada mídia no cache."""
+    raw_data = _post_query(TOP_ANIMES_QUERY.text, {"page": page, "perPage": TOP_ANIMES_PAGE_SIZE})
+    page_data = raw_data.get("Page", {})
+    media_list = page_data.get("media", []) if page_data else []
+    if media_list:
+        _cache_media(media_list)
+        set_to_cache(_top_animes_key(page), [media["id"] for media in media_list], page_ttl(page, CACHE_LIST_TTL))
+    return media_list
+
+def _prefetch_top_animes_page(page: int):
+    if _get_cached_list(_top_animes_key(page)) is None:
+        _fetch_top_animes_page(page)
+
+@traced()
+def get_top_animes(limit=50, offset: int = 0):
+    """Animes [offset, offset + limit) dos populares, página a página do cache Redis ou da AniList."""
+    pages, skip = page_window(offset, limit, TOP_ANIMES_PAGE_SIZE)
+    results = []
+    for page in pages:
+        media_list = _get_cached_list(_top_animes_key(page))
+        if media_list is None:
+            media_list = _fetch_top_animes_page(page)
+        results.extend(media_list)
+        if len(media_list) < TOP_ANIMES_PAGE_SIZE:
+            break # Erro na API ou fim da lista
+    else:
+        for page in range(pages[-1] + 1, pages[-1] + 1 + CATALOG_PREFETCH_PAGES):
+            prefetch(_top_animes_key(page), _prefetch_top_animes_page, page)
+
+    return results[skip:skip + limit]
 
-    # Processa os Dados
+# --- Detalhes individuais ---
+def _process_details(media: dict):
+    """Formato de detalhes (campos padronizados) a partir da mídia da AniList."""
     start_date = media.get("startDate")
     release_date = None
     if start_date and start_date.get("year"):
-        release_date = f"{start_date['year']}-{start_date.get('month', 1):02d}-{start_date.get('day', 1):02d}"
+        release_date = f"{start_date['year']}-{start_date.get('month') or 1:02d}-{start_date.get('day') or 1:02d}"
 
     cover_image_obj = media.get("coverImage", {}) or {}
     poster_url = cover_image_obj.get("large")
 
-    processed_details = {
+    return {
         "id": media.get("id"),
         "title": media.get("title", {}),
         "description": media.get("description") or "",
@@ -116,42 +170,54 @@ def get_anime_details(anime_id: int):
         "backdrop_path": media.get("bannerImage"),
     }
 
-    set_to_cache(cache_key, processed_details, CACHE_DETAILS_TTL)
+@traced()
+def get_anime_details(anime_id: int):
+    """Busca detalhes de um anime: do cache por mídia (preenchido também pelas listas) ou da AniList."""
+    media = get_from_cache(_media_key(anime_id))
+    if media:
+        return _process_details(media)
 
-    return processed_details
+    raw_data = _stored_post_query(DETAILS_QUERY.text, {"id": anime_id}, ("anime", anime_id))
+    media = raw_data.get("Media")
+
+    if not media:
+        return None # Não armazena nada no cache se não encontrar
+
+    _cache_media([media])
+    return _process_details(media)
 
 # --- Busca por nome ---
+@traced()
 def search_anime(name: str, limit=30):
     """Busca animes por nome, usando cache Redis."""
     search_hash = hashlib.sha256(name.encode('utf-8')).hexdigest()
     cache_key = f"anilist:search:{search_hash}:{limit}"
 
+    cached_data = _get_cached_list(cache_key)
+    if cached_data:
+        return cached_data
+
+    return _fetch_page_list(SEARCH_QUERY, {"search": name}, limit, cache_key)
+
+# --- Conversão de id do MyAnimeList ---
+@traced()
+def get_anime_id_by_mal_id(mal_id: int):
+    """Converte um id do MyAnimeList no id da AniList, usando cache Redis."""
+    cache_key = f"anilist:mal_id:{mal_id}"
+
     cached_data = get_from_cache(cache_key)
     if cached_data:
         return cached_data
 
-    query = """
-    query ($page: Int, $perPage: Int, $search: String) {
-      Page(page: $page, perPage: $perPage) {
-        media(type: ANIME, search: $search, sort: [POPULARITY_DESC]) {
-          id
-          title { romaji english }
-          description(asHtml: false)
-          startDate { year month day }
-          coverImage { large medium }
-          bannerImage
-          averageScore
-          genres
-        }
-      }
-    }
-    """
-    variables = {"page": 1, "perPage": limit, "search": name}
-    raw_data = _post_query(query, variables)
-    page_data = raw_data.get("Page", {})
-    results = page_data.get("media", []) if page_data else []
+    # Pede a mídia inteira: a importação busca os detalhes logo depois, e eles já ficam no cache
+    raw_data = _post_query(MAL_ID_QUERY.text, {"idMal": mal_id})
+    media = raw_data.get("Media")
 
-    if results:
-        set_to_cache(cache_key, results, CACHE_LIST_TTL)
+    if not media:
+        return None
+
+    _cache_media([media])
+    anime_id = media.get("id")
+    set_to_cache(cache_key, anime_id, CACHE_DETAILS_TTL)
 
-    return results
\ No newline at end of file
+    return anime_id
@@ -0,0 +1,235 @@
+# app/services/enrichment_service.py
+"""
+Enriquecimento das mídias em segundo plano.
+
+A avaliação é gravada na hora, só com os ids (e o card, se o front mandar): a mídia entra na
+tabela media como stub (fetched_at NULL). Este worker busca os metadados completos nas APIs
+externas em lotes, com as chamadas em paralelo, e atualiza a mídia e o título das avaliações.
+O título provisório também é trocado nos eventos do feed. Falhas são tentadas de novo com
+backoff exponencial, até ENRICH_MAX_ATTEMPTS.
+
+Cada worker da API roda uma thread; as mídias de um lote são reservadas no banco (enrich_after),
+então dois workers não buscam a mesma mídia.
+
+    python -m app.services.enrichment_service backfill [--retry-failed]
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session
+from app.config import SessionLocal
+from app.core.tracing import span
+from app.models.activity import ActivityModel
+from app.models.media import MediaModel
+from app.models.movie import MovieModel
+from app.models.serie import SeriesModel
+from app.models.anime import AnimeModel
+from app.services.media_service import fetch_media_metadata, upsert_media_many
+from app.services.rating_service import UNTITLED
+
+# Roda o worker dentro de cada worker da API; 0 para deixar só o comando backfill
+ENRICHMENT_WORKER = os.getenv("ENRICHMENT_WORKER", "1") != "0"
+ENRICH_BATCH_SIZE = int(os.getenv("ENRICH_BATCH_SIZE", "20"))
+# Chamadas às APIs externas em paralelo dentro de um lote
+ENRICH_CONCURRENCY = int(os.getenv("ENRICH_CONCURRENCY", "4"))
+# Sem pedidos novos, procura mídias pendentes (ex: retentativas) nesse intervalo, em segundos
+ENRICH_INTERVAL = float(os.getenv("ENRICH_INTERVAL", "30"))
+ENRICH_MAX_ATTEMPTS = int(os.getenv("ENRICH_MAX_ATTEMPTS", "6"))
+# Backoff: 1 min, 2 min, 4 min... limitado a ENRICH_BACKOFF_MAX
+ENRICH_BACKOFF_BASE = 60
+ENRICH_BACKOFF_MAX = 6 * 3600
+# Por quanto tempo um lote fica reservado para quem o pegou (se o worker cair, outro assume depois disso)
+CLAIM_SECONDS = 300
+
+RATING_MODELS = {"movie": MovieModel, "serie": SeriesModel, "anime": AnimeModel}
+
+_wake = threading.Event()
+_stop = threading.Event()
+_thread = None
+
+
+def request_enrichment():
+    """Acorda o worker (chamado depois do commit de uma avaliação nova)."""
+    _wake.set()
+
+
+def _backoff(attempts: int):
+    return timedelta(seconds=min(ENRICH_BACKOFF_BASE * 2 ** attempts, ENRICH_BACKOFF_MAX))
+
+
+def _pending(now: datetime):
+    return and_(
+        MediaModel.fetched_at.is_(None),
+        MediaModel.enrich_attempts < ENRICH_MAX_ATTEMPTS,
+        or_(MediaModel.enrich_after.is_(None), MediaModel.enrich_after <= now),
+    )
+
+
+def claim_batch(db: Session, limit: int = ENRICH_BATCH_SIZE):
+    """Reserva até limit mídias pendentes (num único UPDATE ... RETURNING) e faz commit."""
+    now = datetime.utcnow()
+    candidates = select(MediaModel.id).where(_pending(now)).order_by(MediaModel.id).limit(limit)
+    rows = db.execute(
+        update(MediaModel)
+        .where(MediaModel.id.in_(candidates), _pending(now))
+        .values(enrich_after=now + timedelta(seconds=CLAIM_SECONDS))
+        .returning(MediaModel.id, MediaModel.media_type, MediaModel.external_id, MediaModel.enrich_attempts)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    return rows
+
+
+def _fetch(row):
+    try:
+        return fetch_media_metadata(row.media_type, row.external_id)
+    except Exception as e:
+        print(f"Erro ao buscar os metadados de {row.media_type} {row.external_id}: {e}")
+        return None
+
+
+def _sync_rating_titles(db: Session, media_ids: list):
+    """Troca o título provisório das avaliações pelo título da API."""
+    for model in RATING_MODELS.values():
+        db.execute(
+            update(model)
+            .where(model.media_ref_id.in_(media_ids))
+            .values(title=select(MediaModel.title).where(MediaModel.id == model.media_ref_id).scalar_subquery())
+            .execution_options(synchronize_session=False)
+        )
+
+
+def _sync_activity_titles(db: Session, media_keys: list):
+    """Troca o título provisório (ou vazio) dos eventos do feed das mídias enriquecidas pelo título da API."""
+    by_type = {}
+    for media_type, external_id in media_keys:
+        by_type.setdefault(media_type, []).append(external_id)
+    title = select(MediaModel.title).where(
+        MediaModel.media_type == ActivityModel.media_type, MediaModel.external_id == ActivityModel.media_id
+    ).scalar_subquery()
+    for media_type, external_ids in by_type.items():
+        db.execute(
+            update(ActivityModel)
+            .where(
+                ActivityModel.media_type == media_type,
+                ActivityModel.media_id.in_(external_ids),
+                or_(ActivityModel.title.is_(None), ActivityModel.title == UNTITLED),
+            )
+            .values(title=title)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def enrich_batch(db: Session, pool: ThreadPoolExecutor):
+    """Reserva um lote, busca os metadados em paralelo e grava. Retorna (reservadas, enriquecidas)."""
+    rows = claim_batch(db)
+    if not rows:
+        return 0, 0
+
+    with span("enrichment.fetch", batch_size=len(rows)):
+        metadatas = list(pool.map(_fetch, rows))
+
+    entries = [((row.media_type, row.external_id), metadata) for row, metadata in zip(rows, metadatas) if metadata]
+    enriched = upsert_media_many(db, entries)
+    if enriched:
+        _sync_rating_titles(db, [media_ref_id for media_ref_id, _ in enriched.values()])
+        _sync_activity_titles(db, list(enriched))
+
+    # Falhas (erro na API ou mídia inexistente): próxima tentativa com backoff, um UPDATE por nº de tentativas
+    failed = {}
+    for row, metadata in zip(rows, metadatas):
+        if not metadata:
+            failed.setdefault(row.enrich_attempts, []).append(row.id)
+    now = datetime.utcnow()
+    for attempts, ids in failed.items():
+        db.execute(
+            update(MediaModel)
+            .where(MediaModel.id.in_(ids))
+            .values(enrich_attempts=attempts + 1, enrich_after=now + _backoff(attempts))
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
+    return len(rows), len(enriched)
+
+
+def run_worker(stop: threading.Event):
+    """Loop do worker: processa lotes enquanto houver pendentes; depois espera um pedido novo ou o intervalo."""
+    with ThreadPoolExecutor(max_workers=ENRICH_CONCURRENCY) as pool:
+        while not stop.is_set():
+            db = SessionLocal()
+            try:
+                claimed, _ = enrich_batch(db, pool)
+            except Exception as e:
+                db.rollback()
+                print(f"Erro no enriquecimento das mídias: {e}")
+                claimed = 0
+            finally:
+                db.close()
+            if claimed < ENRICH_BATCH_SIZE:
+                _wake.wait(ENRICH_INTERVAL)
+                _wake.clear()
+
+
+def start_worker():
+    """Sobe o worker numa thread (startup da API)."""
+    global _thread
+    if not ENRICHMENT_WORKER or _thread is not None:
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=run_worker, args=(_stop,), name="enrichment", daemon=True)
+    _thread.start()
+
+
+def stop_worker(timeout: float = 10):
+    """Para o worker (shutdown); as mídias do lote interrompido voltam para a fila depois de CLAIM_SECONDS."""
+    global _thread
+    if _thread is None:
+        return
+    _stop.set()
+    _wake.set()
+    _thread.join(timeout)
+    _thread = None
+
+
+def backfill(db: Session, retry_failed: bool = False):
+    """
+    Enriquece todas as mídias sem metadados completos (ex: avaliações anteriores a este worker),
+    lote a lote, até a fila esvaziar. retry_failed: zera as tentativas das que já desistiram.
+    """
+    reset = update(MediaModel).where(MediaModel.fetched_at.is_(None))
+    if not retry_failed:
+        reset = reset.where(MediaModel.enrich_attempts < ENRICH_MAX_ATTEMPTS)
+    db.execute(reset.values(enrich_attempts=0, enrich_after=None).execution_options(synchronize_session=False))
+    db.commit()
+
+    total_claimed = total_enriched = 0
+    with ThreadPoolExecutor(max_workers=ENRICH_CONCURRENCY) as pool:
+        while True:
+            claimed, enriched = enrich_batch(db, pool)
+            if not claimed:
+                break
+            total_claimed += claimed
+            total_enriched += enriched
+            print(f"Mídias enriquecidas: {total_enriched} de {total_claimed}")
+    # As que falharam ficaram com backoff; o worker da API tenta de novo mais tarde
+    print(f"Backfill concluído: {total_enriched} enriquecidas, {total_claimed - total_enriched} para tentar de novo")
+
+
+if __name__ == "__main__":
+    # Uso: python -m app.services.enrichment_service backfill [--retry-failed]
+    import sys
+    from app.core.startup import prepare_cli
+
+    args = sys.argv[1:]
+    if not args or args[0] != "backfill" or not set(args[1:]) <= {"--retry-failed"}:
+        print("Uso: python -m app.services.enrichment_service backfill [--retry-failed]")
+        sys.exit(1)
+
+    prepare_cli()
+    session = SessionLocal()
+    try:
+        backfill(session, retry_failed="--retry-failed" in args)
+    finally:
+        session.close()
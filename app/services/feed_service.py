@@ -0,0 +1,274 @@
+# app/services/feed_service.py
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+from app.config import SessionLocal
+from app.core.cache import get_redis
+from app.core.sql import dialect_insert
+from app.core.tracing import traced
+from app.models.activity import ActivityModel
+from app.models.follow import FollowModel
+from app.models.user import UserModel
+
+FEED_MAX_LEN = 500          # eventos guardados por timeline (as mais antigas são descartadas)
+FEED_TTL = 30 * 24 * 3600   # timeline sem leitura/escrita por 30 dias expira (é reconstruída na próxima leitura)
+FANOUT_LIMIT = 5000         # acima disso de seguidores, o evento não é empurrado: quem segue busca (pull)
+FANOUT_BATCH = 1000         # seguidores por pipeline do Redis
+BACKFILL_SIZE = 50          # eventos copiados para a timeline ao começar a seguir alguém
+
+
+def _timeline_key(user_id: int):
+    return f"feed:{user_id}"
+
+
+# --- Escrita ---
+
+@traced()
+def record_activity(db: Session, user_id: int, kind: str, media_type: str, media_id: int,
+                    title: str | None = None, rating: float | None = None, lista_id: int | None = None):
+    """
+    Registra o evento na mesma transação da ação (avaliação, item de lista) e retorna o id dele.
+    Não faz commit. O fan-out para as timelines roda depois do commit, via fan_out_activity.
+    """
+    activity = ActivityModel(
+        user_id=user_id, kind=kind, media_type=media_type, media_id=media_id,
+        title=title, rating=rating, lista_id=lista_id,
+    )
+    db.add(activity)
+    db.flush()
+    return activity.id
+
+
+def fan_out_activity(activity_id: int, user_id: int):
+    """
+    Fan-out na escrita: adiciona o evento na timeline (sorted set, score = id do evento)
+    de cada seguidor, cortando cada uma em FEED_MAX_LEN. Usuários com mais de FANOUT_LIMIT
+    seguidores são lidos por pull, então aqui não fazem nada. Roda em BackgroundTasks.
+    """
+    if not get_redis():
+        return
+    db = SessionLocal()
+    try:
+        follower_count = db.query(UserModel.follower_count).filter(UserModel.id == user_id).scalar()
+        if not follower_count or follower_count > FANOUT_LIMIT:
+            return
+
+        query = db.query(FollowModel.follower_id).filter(FollowModel.followed_id == user_id).yield_per(FANOUT_BATCH)
+        batch = []
+        for (follower_id,) in query:
+            batch.append(follower_id)
+            if len(batch) >= FANOUT_BATCH:
+                _push(batch, {str(activity_id): activity_id})
+                batch = []
+        if batch:
+            _push(batch, {str(activity_id): activity_id})
+    except Exception as e:
+        print(f"Erro no fan-out da atividade {activity_id}: {e}")
+    finally:
+        db.close()
+
+
+def _push(follower_ids: list, entries: dict):
+    """Adiciona os eventos nas timelines dos seguidores num único pipeline do Redis."""
+    pipe = get_redis().pipeline(transaction=False)
+    for follower_id in follower_ids:
+        key = _timeline_key(follower_id)
+        pipe.zadd(key, entries)
+        pipe.zremrangebyrank(key, 0, -FEED_MAX_LEN - 1)
+        pipe.expire(key, FEED_TTL)
+    pipe.execute()
+
+
+# --- Grafo de seguidores ---
+
+def follow_user(db: Session, follower_id: int, followed_id: int):
+    """
+    Segue um usuário (idempotente) e atualiza os contadores. Faz commit.
+    Retorna True se a relação foi criada agora.
+    """
+    created = db.execute(
+        dialect_insert(db, FollowModel)
+        .values(follower_id=follower_id, followed_id=followed_id)
+        .on_conflict_do_nothing(index_elements=["follower_id", "followed_id"])
+        .returning(FollowModel.id)
+    ).first()
+    if created:
+        _bump_counts(db, follower_id, followed_id, 1)
+    db.commit()
+
+    if created and get_redis():
+        _backfill(db, follower_id, followed_id)
+    return bool(created)
+
+
+def unfollow_user(db: Session, follower_id: int, followed_id: int):
+    """Deixa de seguir (idempotente), atualiza os contadores e limpa a timeline. Faz commit."""
+    removed = db.query(FollowModel).filter(
+        FollowModel.follower_id == follower_id, FollowModel.followed_id == followed_id
+    ).delete(synchronize_session=False)
+    if removed:
+        _bump_counts(db, follower_id, followed_id, -1)
+    db.commit()
+
+    redis_client = get_redis()
+    if removed and redis_client:
+        ids = _recent_activity_ids(db, [followed_id], FEED_MAX_LEN)
+        if ids:
+            try:
+                redis_client.zrem(_timeline_key(follower_id), *[str(i) for i in ids])
+            except Exception as e:
+                print(f"Erro ao limpar a timeline do usuário {follower_id}: {e}")
+    return bool(removed)
+
+
+def _bump_counts(db: Session, follower_id: int, followed_id: int, delta: int):
+    db.execute(
+        update(UserModel).where(UserModel.id == followed_id)
+        .values(follower_count=UserModel.follower_count + delta)
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        update(UserModel).where(UserModel.id == follower_id)
+        .values(following_count=UserModel.following_count + delta)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def delete_user_follows(db: Session, user_id: int, limit: int):
+    """
+    Remove até `limit` relações (seguidores e seguidos) de um usuário excluído, descontando
+    os contadores do outro lado de cada relação. Não faz commit. Retorna quantas removeu.
+    """
+    batch = select(FollowModel.id).where(
+        (FollowModel.follower_id == user_id) | (FollowModel.followed_id == user_id)
+    ).limit(limit)
+    removed = db.execute(
+        delete(FollowModel)
+        .where(FollowModel.id.in_(batch))
+        .returning(FollowModel.follower_id, FollowModel.followed_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    lost_follower = [followed_id for follower_id, followed_id in removed if follower_id == user_id]
+    lost_following = [follower_id for follower_id, followed_id in removed if follower_id != user_id]
+    if lost_follower:
+        db.execute(
+            update(UserModel).where(UserModel.id.in_(lost_follower))
+            .values(follower_count=UserModel.follower_count - 1)
+            .execution_options(synchronize_session=False)
+        )
+    if lost_following:
+        db.execute(
+            update(UserModel).where(UserModel.id.in_(lost_following))
+            .values(following_count=UserModel.following_count - 1)
+            .execution_options(synchronize_session=False)
+        )
+    return len(removed)
+
+
+def delete_user_activities(db: Session, user_id: int, limit: int):
+    """Remove até `limit` atividades de um usuário excluído. Não faz commit. Retorna quantas removeu."""
+    batch = select(ActivityModel.id).where(ActivityModel.user_id == user_id).limit(limit)
+    return db.query(ActivityModel).filter(ActivityModel.id.in_(batch)).delete(synchronize_session=False)
+
+
+def _backfill(db: Session, follower_id: int, followed_id: int):
+    """Ao seguir alguém, traz as atividades recentes dele para a timeline (se ele não for lido por pull)."""
+    try:
+        ids = _recent_activity_ids(db, [followed_id], BACKFILL_SIZE)
+        if ids:
+            _push([follower_id], {str(i): i for i in ids})
+    except Exception as e:
+        print(f"Erro ao preencher a timeline do usuário {follower_id}: {e}")
+
+
+def _recent_activity_ids(db: Session, user_ids: list, limit: int, before: int | None = None):
+    query = db.query(ActivityModel.id).filter(ActivityModel.user_id.in_(user_ids))
+    if before:
+        query = query.filter(ActivityModel.id < before)
+    return [row[0] for row in query.order_by(ActivityModel.id.desc()).limit(limit)]
+
+
+# --- Leitura ---
+
+def _pulled_user_ids(db: Session, user_id: int, only_popular: bool):
+    """Quem o usuário segue e precisa ser lido por pull (todos, ou só os acima de FANOUT_LIMIT)."""
+    query = select(FollowModel.followed_id).where(FollowModel.follower_id == user_id)
+    if only_popular:
+        query = query.join(UserModel, UserModel.id == FollowModel.followed_id).where(
+            UserModel.follower_count > FANOUT_LIMIT
+        )
+    return query
+
+
+def get_feed_ids(db: Session, user_id: int, limit: int, before: int | None = None):
+    """
+    Ids das atividades de uma página do feed (mais recentes primeiro, ids < before).
+    Com Redis: ZREVRANGEBYSCORE na timeline (O(log n + página)) mais um pull só dos
+    seguidos muito populares. Sem Redis, ou com a timeline expirada: pull de todos os seguidos.
+    """
+    max_score = f"({before}" if before else "+inf"
+    pushed = None
+    redis_client = get_redis()
+    if redis_client:
+        try:
+            key = _timeline_key(user_id)
+            pushed = [int(i) for i in redis_client.zrevrangebyscore(key, max_score, "-inf", start=0, num=limit)]
+            if not pushed and not before and not redis_client.exists(key):
+                pushed = None  # timeline expirada ou nunca criada: reconstrói abaixo
+        except Exception as e:
+            print(f"Erro ao LER a timeline do usuário {user_id}: {e}")
+            pushed = None
+
+    if pushed is None:
+        ids = _recent_activity_ids(db, _pulled_user_ids(db, user_id, only_popular=False), limit, before)
+        if redis_client and not before:
+            _rebuild_timeline(db, user_id)
+        return ids
+
+    pulled = _recent_activity_ids(db, _pulled_user_ids(db, user_id, only_popular=True), limit, before)
+    return sorted(set(pushed) | set(pulled), reverse=True)[:limit]
+
+
+def _rebuild_timeline(db: Session, user_id: int):
+    """Reconstrói a timeline a partir das atividades de quem o usuário segue (fora os populares)."""
+    try:
+        followed = select(FollowModel.followed_id).join(
+            UserModel, UserModel.id == FollowModel.followed_id
+        ).where(FollowModel.follower_id == user_id, UserModel.follower_count <= FANOUT_LIMIT)
+        ids = _recent_activity_ids(db, followed, FEED_MAX_LEN)
+        if ids:
+            _push([user_id], {str(i): i for i in ids})
+    except Exception as e:
+        print(f"Erro ao reconstruir a timeline do usuário {user_id}: {e}")
+
+
+@traced()
+def get_feed(db: Session, user_id: int, limit: int, before: int | None = None):
+    """
+    Página do feed: eventos com o autor (username e avatar), mais recentes primeiro.
+    Retorna (eventos, cursor da próxima página ou None).
+    """
+    ids = get_feed_ids(db, user_id, limit, before)
+    if not ids:
+        return [], None
+
+    rows = db.query(ActivityModel, UserModel.username, UserModel.avatar).join(
+        UserModel, UserModel.id == ActivityModel.user_id
+    ).filter(ActivityModel.id.in_(ids), UserModel.deleted_at.is_(None)).order_by(ActivityModel.id.desc()).all()
+
+    events = [
+        {
+            "id": activity.id,
+            "kind": activity.kind,
+            "user": {"id": activity.user_id, "username": username, "avatar": avatar},
+            "media_type": activity.media_type,
+            "media_id": activity.media_id,
+            "title": activity.title,
+            "rating": activity.rating,
+            "lista_id": activity.lista_id,
+            "created_at": activity.created_at,
+        }
+        for activity, username, avatar in rows
+    ]
+    next_cursor = ids[-1] if len(ids) == limit else None
+    return events, next_cursor
@@ -0,0 +1,341 @@
+# app/services/import_service.py
+import csv
+import io
+import json
+import os
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from sqlalchemy import insert
+from app.config import SessionLocal
+from app.core.jobs import update_job
+from app.services.tmdb_service import search_movie
+from app.services.anilist_service import get_anime_id_by_mal_id
+from app.services.media_service import get_or_create_media_many
+from app.services.stats_service import rating_delta, apply_rating_deltas
+from app.services.rating_service import (
+    MODEL_MAP, MEDIA_ID_COLUMN, RATING_COLUMN,
+    media_id_column, rating_values,
+)
+
+# Formatos aceitos na importação
+# - cinelist_csv: CSV exportado pelo próprio CineList (type, media_id, title, rating, comment)
+# - json: array JSON (ou JSON Lines) exportado pelo CineList
+# - letterboxd: ratings.csv / reviews.csv do Letterboxd (Name, Year, Rating de 0.5 a 5)
+# - mal: XML exportado pelo MyAnimeList (series_animedb_id, my_score)
+IMPORT_FORMATS = ("cinelist_csv", "json", "letterboxd", "mal")
+EXPORT_FORMATS = ("csv", "json")
+
+CHUNK_SIZE = 200          # linhas por transação
+RESOLVE_WORKERS = 8       # chamadas simultâneas às APIs externas (passam pelo cache)
+MAX_REPORTED_ERRORS = 50  # erros guardados no progresso do job
+EXPORT_FIELDS = ["type", "media_id", "title", "rating", "comment"]
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# --- Leitura incremental dos arquivos ---
+
+def _iter_cinelist_csv(path: str):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            yield {
+                "line": line,
+                "media_type": (row.get("type") or row.get("media_type") or "").strip().lower(),
+                "media_id": _to_int(row.get("media_id")),
+                "rating": _to_float(row.get("rating")),
+                "comment": row.get("comment") or None,
+            }
+
+
+def _iter_json_objects(path: str, chunk_size: int = 64 * 1024):
+    """
+    Lê objetos de um array JSON (ou de um arquivo JSON Lines) sem carregar o arquivo inteiro.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    eof = False
+    with open(path, encoding="utf-8-sig") as f:
+        while True:
+            buffer = buffer.lstrip(" \t\r\n,[]")
+            if not buffer:
+                if eof:
+                    return
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            try:
+                obj, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            buffer = buffer[end:]
+            yield obj
+
+
+def _iter_json(path: str):
+    for index, obj in enumerate(_iter_json_objects(path), start=1):
+        yield {
+            "line": index,
+            "media_type": str(obj.get("type") or obj.get("media_type") or "").lower(),
+            "media_id": _to_int(obj.get("media_id")),
+            "rating": _to_float(obj.get("rating", obj.get("score"))),
+            "comment": obj.get("comment"),
+        }
+
+
+def _iter_letterboxd(path: str):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            stars = _to_float(row.get("Rating"))
+            yield {
+                "line": line,
+                "media_type": "movie",
+                "media_id": None,
+                "title": row.get("Name"),
+                "year": row.get("Year"),
+                # Letterboxd usa estrelas de 0.5 a 5; o CineList usa notas de 0 a 10
+                "rating": stars * 2 if stars is not None else None,
+                "comment": row.get("Review") or None,
+            }
+
+
+def _iter_mal(path: str):
+    line = 0
+    for _, elem in ET.iterparse(path, events=("end",)):
+        if elem.tag != "anime":
+            continue
+        line += 1
+        score = _to_float(elem.findtext("my_score"))
+        yield {
+            "line": line,
+            "media_type": "anime",
+            "media_id": None,
+            "mal_id": _to_int(elem.findtext("series_animedb_id")),
+            "title": elem.findtext("series_title"),
+            # No MAL, nota 0 significa "sem nota"
+            "rating": score if score else None,
+            "comment": (elem.findtext("my_comments") or "").strip() or None,
+        }
+        elem.clear() # libera a memória do elemento já processado
+
+
+_READERS = {
+    "cinelist_csv": _iter_cinelist_csv,
+    "json": _iter_json,
+    "letterboxd": _iter_letterboxd,
+    "mal": _iter_mal,
+}
+
+
+# --- Resolução dos ids nas APIs externas ---
+
+def _resolve_media_id(row: dict):
+    """Descobre o id externo (TMDB/AniList) quando o arquivo não traz o id do CineList."""
+    if row.get("media_id"):
+        return row["media_id"]
+
+    if row.get("mal_id"):
+        return get_anime_id_by_mal_id(row["mal_id"])
+
+    if row["media_type"] == "movie" and row.get("title"):
+        results = search_movie(row["title"], limit=10)
+        year = (row.get("year") or "").strip()
+        for result in results:
+            if year and (result.get("release_date") or "").startswith(year):
+                return result["id"]
+        return results[0]["id"] if results else None
+
+    return None
+
+
+def _validate_row(row: dict):
+    if row["media_type"] not in MODEL_MAP:
+        return "Tipo de mídia inválido"
+    if row["rating"] is None or not 0 <= row["rating"] <= 10:
+        return "A nota deve estar entre 0 e 10."
+    return None
+
+
+def _existing_media_ids(db, user_id: int, media_type: str, media_ids: list):
+    column = media_id_column(media_type)
+    model = MODEL_MAP[media_type]
+    rows = db.query(column).filter(model.user_id == user_id, column.in_(media_ids)).all()
+    return {row[0] for row in rows}
+
+
+def _import_chunk(db, pool, user_id: int, rows: list, seen: set, stats: dict):
+    """Resolve, busca os metadados e grava um bloco de linhas numa única transação."""
+    valid = []
+    for row in rows:
+        error = _validate_row(row)
+        if error:
+            stats["failed"] += 1
+            _report_error(stats, row, error)
+        else:
+            valid.append(row)
+
+    # 1) Ids externos, em paralelo
+    for row, media_id in zip(valid, pool.map(_resolve_media_id, valid)):
+        row["media_id"] = media_id
+
+    pending = []
+    for row in valid:
+        if not row["media_id"]:
+            stats["failed"] += 1
+            _report_error(stats, row, "Mídia não encontrada na API")
+            continue
+        key = (row["media_type"], row["media_id"])
+        if key in seen:
+            stats["skipped"] += 1
+            continue
+        seen.add(key)
+        pending.append(row)
+
+    # 2) Descarta o que o usuário já avaliou (uma query por tipo)
+    already_rated = set()
+    for media_type in MODEL_MAP:
+        ids = [row["media_id"] for row in pending if row["media_type"] == media_type]
+        if ids:
+            already_rated |= {(media_type, i) for i in _existing_media_ids(db, user_id, media_type, ids)}
+    new_rows = [row for row in pending if (row["media_type"], row["media_id"]) not in already_rated]
+    stats["skipped"] += len(pending) - len(new_rows)
+
+    # 3) Metadados: só vai às APIs externas (em paralelo) para mídias que ainda não estão na tabela media
+    media_refs = get_or_create_media_many(
+        db, [(row["media_type"], row["media_id"]) for row in new_rows], pool=pool
+    )
+
+    values_by_type = {media_type: [] for media_type in MODEL_MAP}
+    deltas = {}
+    changes = []
+    for row in new_rows:
+        media_ref = media_refs.get((row["media_type"], row["media_id"]))
+        if not media_ref:
+            stats["failed"] += 1
+            _report_error(stats, row, "Mídia não encontrada na API")
+            continue
+        values_by_type[row["media_type"]].append(
+            rating_values(row["media_type"], row["media_id"], media_ref, row["rating"], row["comment"], user_id)
+        )
+        deltas[(row["media_type"], row["media_id"])] = rating_delta(added=row["rating"])
+        changes.append((user_id, row["media_type"], row["media_id"], row["rating"]))
+
+    # 4) INSERT em lote por tabela e agregado de notas, tudo na mesma transação
+    for media_type, values in values_by_type.items():
+        if values:
+            db.execute(insert(MODEL_MAP[media_type]), values)
+            stats["imported"] += len(values)
+    apply_rating_deltas(db, deltas)
+    db.commit()
+
+    # Atualiza o índice de recomendações com o bloco inteiro de uma vez
+    from app.services.recommender_service import apply_rating_changes
+    apply_rating_changes(changes)
+
+
+def _report_error(stats: dict, row: dict, error: str):
+    if len(stats["errors"]) < MAX_REPORTED_ERRORS:
+        stats["errors"].append({"line": row.get("line"), "title": row.get("title"), "error": error})
+
+
+def run_import_job(job_id: str, path: str, fmt: str, user_id: int):
+    """
+    Job de importação: lê o arquivo aos poucos e grava em blocos de CHUNK_SIZE,
+    atualizando o progresso a cada bloco. O arquivo temporário é removido no final.
+    """
+    stats = {"processed": 0, "imported": 0, "skipped": 0, "failed": 0, "errors": []}
+    seen = set()
+    db = SessionLocal()
+    update_job(job_id, status="running", **stats)
+    try:
+        rows = _READERS[fmt](path)
+        with ThreadPoolExecutor(max_workers=RESOLVE_WORKERS) as pool:
+            while True:
+                chunk = list(islice(rows, CHUNK_SIZE))
+                if not chunk:
+                    break
+                try:
+                    _import_chunk(db, pool, user_id, chunk, seen, stats)
+                except Exception as e:
+                    db.rollback()
+                    stats["failed"] += len(chunk)
+                    _report_error(stats, chunk[0], f"Erro ao gravar o bloco: {e}")
+                stats["processed"] += len(chunk)
+                update_job(job_id, **stats)
+        update_job(job_id, status="done", **stats)
+    except Exception as e:
+        print(f"Erro no job de importação {job_id}: {e}")
+        update_job(job_id, status="failed", error=str(e), **stats)
+    finally:
+        db.close()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+# --- Exportação em streaming ---
+
+def _iter_user_ratings(db, user_id: int, batch_size: int = 500):
+    for media_type, model in MODEL_MAP.items():
+        id_col = getattr(model, MEDIA_ID_COLUMN[media_type])
+        rating_col = getattr(model, RATING_COLUMN[media_type])
+        query = db.query(id_col, model.title, rating_col, model.comment).filter(
+            model.user_id == user_id
+        ).order_by(model.id).yield_per(batch_size)
+        for media_id, title, rating, comment in query:
+            yield {"type": media_type, "media_id": media_id, "title": title, "rating": rating, "comment": comment}
+
+
+def iter_export(user_id: int, fmt: str):
+    """
+    Gera o arquivo de exportação aos poucos (CSV ou array JSON), no formato aceito pela importação.
+    Usa uma sessão própria porque o streaming continua depois que a rota retorna.
+    """
+    db = SessionLocal()
+    try:
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+            writer.writeheader()
+            for row in _iter_user_ratings(db, user_id):
+                writer.writerow(row)
+                if buffer.tell() > 16 * 1024:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue()
+        else:
+            parts = ["["]
+            size = 1
+            first = True
+            for row in _iter_user_ratings(db, user_id):
+                part = ("" if first else ",") + json.dumps(row, ensure_ascii=False)
+                parts.append(part)
+                size += len(part)
+                first = False
+                if size > 16 * 1024:
+                    yield "".join(parts)
+                    parts, size = [], 0
+            parts.append("]")
+            yield "".join(parts)
+    finally:
+        db.close()
@@ -0,0 +1,276 @@
+# app/services/media_service.py
+from datetime import datetime
+from sqlalchemy import func, literal, select, tuple_, update
+from sqlalchemy.orm import Session
+from app.core.sql import dialect_insert
+from app.core.tracing import traced
+from app.models.media import MediaModel
+from app.models.movie import MovieModel
+from app.models.serie import SeriesModel
+from app.models.anime import AnimeModel
+from app.models.lista_item import ListaItemModel
+from app.services.tmdb_service import (
+    get_movie_details, get_series_details,
+    get_movie_credits, get_series_credits,
+)
+from app.services.anilist_service import get_anime_details
+
+# Colunas de metadados da tabela media (tudo menos chave, id e fetched_at)
+MEDIA_FIELDS = [
+    "title", "overview", "release_date", "director", "creator", "cast",
+    "runtime", "budget", "revenue", "episodes", "status", "last_episode",
+    "poster_path", "backdrop_path",
+]
+
+# Nas avaliações de anime o campo "overview" se chama "description"
+RATING_FIELD_ALIASES = {"anime": {"description": "overview"}}
+
+
+@traced()
+def fetch_media_metadata(media_type: str, media_id: int):
+    """
+    Busca os metadados completos da mídia nas APIs externas (via cache).
+    Retorna um dicionário com as colunas da tabela media, ou None se a mídia não existir.
+    """
+    if media_type == "movie":
+        data = get_movie_details(media_id)
+        if not data:
+            return None
+        credits = get_movie_credits(media_id) or {}
+        director = next((p['name'] for p in credits.get('crew', []) if p['job'] == 'Director'), None)
+        cast = ", ".join([actor['name'] for actor in credits.get('cast', [])[:10]])
+
+        return {
+            "title": data["title"],
+            "overview": data.get("overview", ""),
+            "release_date": data.get("release_date"),
+            "director": director,
+            "cast": cast,
+            "runtime": data.get("runtime"),
+            "budget": data.get("budget"),
+            "revenue": data.get("revenue"),
+            "poster_path": data.get("poster_path"),
+            "backdrop_path": data.get("backdrop_path"),
+        }
+
+    if media_type == "serie":
+        data = get_series_details(media_id)
+        if not data:
+            return None
+        credits = get_series_credits(media_id) or {}
+        creator = next(
+            (p['name'] for p in credits.get('crew', []) if p['job'] == 'Director'),
+            data.get("created_by")[0]['name'] if data.get("created_by") else None
+        )
+        cast_list = [actor['name'] for actor in credits.get('cast', [])[:10]]
+        cast = ", ".join(cast_list) if cast_list else None
+
+        return {
+            "title": data["name"],
+            "overview": data.get("overview", ""),
+            "release_date": data.get("first_air_date"),
+            "creator": creator,
+            "cast": cast,
+            "episodes": data.get("number_of_episodes"),
+            "status": data.get("status"),
+            "last_episode": data.get("last_air_date"),
+            "poster_path": data.get("poster_path"),
+            "backdrop_path": data.get("backdrop_path"),
+        }
+
+    if media_type == "anime":
+        data = get_anime_details(media_id) # Esta função agora retorna os campos padronizados
+        if not data:
+            return None
+
+        return {
+            "title": data["title"].get("romaji") or data["title"].get("english") or "Unknown",
+            "overview": data.get("description", ""),
+            "release_date": data.get("release_date"),
+            "episodes": data.get("episodes"),
+            "status": data.get("status"),
+            "poster_path": data.get("poster_path"),
+            "backdrop_path": data.get("backdrop_path"),
+        }
+
+    return None
+
+
+def upsert_media_many(db: Session, entries: list):
+    """
+    Grava (ou atualiza) os metadados completos de várias mídias num único INSERT ... ON CONFLICT.
+    entries: lista de ((media_type, media_id), metadata). Não faz commit.
+    Retorna {(media_type, media_id): (media_ref_id, title)}.
+    """
+    if not entries:
+        return {}
+    now = datetime.utcnow()
+    rows = []
+    for (media_type, media_id), metadata in entries:
+        row = {field: metadata.get(field) for field in MEDIA_FIELDS}
+        row.update(media_type=media_type, external_id=media_id, fetched_at=now)
+        rows.append(row)
+
+    stmt = dialect_insert(db, MediaModel).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["media_type", "external_id"],
+        set_={field: stmt.excluded[field] for field in MEDIA_FIELDS + ["fetched_at"]},
+    ).returning(MediaModel.id, MediaModel.media_type, MediaModel.external_id, MediaModel.title)
+    return {
+        (row.media_type, row.external_id): (row.id, row.title)
+        for row in db.execute(stmt)
+    }
+
+
+def insert_media_stubs_stmt(db: Session, stubs: list):
+    """INSERT multi-linha dos stubs (ver insert_media_stubs), para quem precisa de RETURNING."""
+    rows = [
+        {"media_type": stub["media_type"], "external_id": stub["external_id"],
+         **{field: stub.get(field) for field in MEDIA_FIELDS}}
+        for stub in stubs
+    ]
+    return dialect_insert(db, MediaModel).values(rows).on_conflict_do_nothing(
+        index_elements=["media_type", "external_id"]
+    )
+
+
+def insert_media_stubs(db: Session, stubs: list):
+    """
+    Registra mídias só com os dados básicos (ex: cards enviados pelo front), num único
+    INSERT multi-linha, sem sobrescrever as que já existem. Não faz commit.
+    stubs: dicionários com media_type, external_id, title e, opcionalmente, outros campos de MEDIA_FIELDS.
+    """
+    if not stubs:
+        return
+    db.execute(insert_media_stubs_stmt(db, stubs))
+
+
+def media_ref_subquery_for(media_type, media_id):
+    """
+    Subquery com o id da mídia na tabela media, para usar direto num INSERT/UPDATE.
+    Aceita valores ou colunas (subquery correlacionada).
+    """
+    return (
+        select(MediaModel.id)
+        .where(MediaModel.media_type == media_type, MediaModel.external_id == media_id)
+        .scalar_subquery()
+    )
+
+
+@traced()
+def get_or_create_media_many(db: Session, keys: list, pool=None):
+    """
+    Garante que as mídias existam na tabela media com metadados completos.
+    Só vai às APIs externas para as que ainda não foram buscadas (em paralelo, se houver pool).
+    keys: lista de (media_type, media_id). Não faz commit.
+    Retorna {(media_type, media_id): (media_ref_id, title)}; as que não existem na API ficam de fora.
+    """
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return {}
+
+    found = {
+        (row.media_type, row.external_id): (row.id, row.title)
+        for row in db.query(MediaModel.id, MediaModel.media_type, MediaModel.external_id, MediaModel.title).filter(
+            tuple_(MediaModel.media_type, MediaModel.external_id).in_(keys),
+            MediaModel.fetched_at.isnot(None),
+        )
+    }
+
+    missing = [key for key in keys if key not in found]
+    if missing:
+        fetch = lambda key: fetch_media_metadata(*key)
+        metadatas = pool.map(fetch, missing) if pool else map(fetch, missing)
+        entries = [(key, metadata) for key, metadata in zip(missing, metadatas) if metadata]
+        found.update(upsert_media_many(db, entries))
+
+    return found
+
+
+def get_or_create_media(db: Session, media_type: str, media_id: int):
+    """Versão de get_or_create_media_many para uma única mídia. Retorna (media_ref_id, title) ou None."""
+    return get_or_create_media_many(db, [(media_type, media_id)]).get((media_type, media_id))
+
+
+def merge_media_fields(media_type: str, row: dict, media: MediaModel | None):
+    """
+    Completa o dicionário de uma avaliação com os metadados compartilhados,
+    preenchendo só os campos que estão vazios na própria linha.
+    """
+    if media is None:
+        return row
+    aliases = RATING_FIELD_ALIASES.get(media_type, {})
+    for key, value in row.items():
+        if value is None:
+            field = aliases.get(key, key)
+            if field in MEDIA_FIELDS:
+                row[key] = getattr(media, field)
+    return row
+
+
+def backfill_media(db: Session):
+    """
+    Migra as avaliações antigas (que copiam os metadados em cada linha) para a tabela media:
+    cria as mídias que faltam a partir das próprias avaliações e liga cada avaliação
+    e cada item de lista à sua mídia. SQL set-based, uma instrução por etapa.
+    """
+    sources = [
+        ("movie", MovieModel, MovieModel.movie_id, MovieModel.overview),
+        ("serie", SeriesModel, SeriesModel.serie_id, SeriesModel.overview),
+        ("anime", AnimeModel, AnimeModel.anime_id, AnimeModel.description),
+    ]
+    for media_type, model, id_col, overview_col in sources:
+        columns = {"title": model.title, "overview": overview_col}
+        for field in MEDIA_FIELDS:
+            if field not in columns and hasattr(model, field):
+                columns[field] = getattr(model, field)
+
+        # Uma linha por mídia: os dados da avaliação mais recente de cada uma
+        latest_ids = select(func.max(model.id)).group_by(id_col)
+        source = select(
+            literal(media_type).label("media_type"),
+            id_col.label("external_id"),
+            *[col.label(name) for name, col in columns.items()],
+            literal(datetime.utcnow()).label("fetched_at"),
+        ).where(model.id.in_(latest_ids))
+
+        db.execute(
+            dialect_insert(db, MediaModel)
+            .from_select(["media_type", "external_id", *columns.keys(), "fetched_at"], source)
+            .on_conflict_do_nothing(index_elements=["media_type", "external_id"])
+        )
+        db.execute(
+            update(model)
+            .where(model.media_ref_id.is_(None))
+            .values(media_ref_id=media_ref_subquery_for(media_type, id_col))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        print(f"Tabela media: avaliações de {media_type} migradas")
+
+    db.execute(
+        update(ListaItemModel)
+        .where(ListaItemModel.media_ref_id.is_(None))
+        .values(media_ref_id=media_ref_subquery_for(ListaItemModel.media_type, ListaItemModel.media_id))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    print("Tabela media: itens de lista ligados às mídias")
+
+
+if __name__ == "__main__":
+    # Uso: python -m app.services.media_service backfill
+    import sys
+    from app.core.startup import prepare_cli
+    from app.config import SessionLocal
+
+    if sys.argv[1:] != ["backfill"]:
+        print("Uso: python -m app.services.media_service backfill")
+        sys.exit(1)
+
+    prepare_cli()  # registra todos os modelos e garante o schema
+    session = SessionLocal()
+    try:
+        backfill_media(session)
+    finally:
+        session.close()
@@ -0,0 +1,159 @@
+# app/services/ranking.py
+"""
+Ranking das listas que misturam filmes, séries e animes (populares e busca).
+
+Cada fonte mede a popularidade numa escala própria (TMDB: sem limite; AniList: número de usuários),
+então as notas são normalizadas por fonte antes de misturar:
+
+- percentile: posição na distribuição da fonte (0 a 1), interpolada entre as notas da amostra e, fora dela,
+  continuada pela cauda de uma log-normal (páginas fundas ficam abaixo da amostra da primeira página, mas
+  continuam ordenadas entre si e comparáveis entre as fontes);
+- zscore: desvios padrão acima da média, em escala log (as popularidades têm cauda longa).
+
+As estatísticas de uma fonte podem ficar guardadas por escopo (ex: os populares de uma região) durante um
+ciclo de cache das listas; sem escopo, são calculadas da própria lista. Cada fonte chega ordenada (ou quase)
+pela nota, então a ordenação por fonte é linear, e as listas são juntadas com um merge k-way (heapq.merge),
+parando em top-k: bem menos trabalho que ordenar tudo a cada requisição.
+"""
+import heapq
+import math
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from itertools import chain, islice, zip_longest
+
+NORMALIZATIONS = ("percentile", "zscore")
+# score (pela nota normalizada) | round_robin (um de cada fonte, na ordem de cada uma)
+POLICIES = ("score", "round_robin")
+
+RANKING_NORMALIZATION = os.getenv("RANKING_NORMALIZATION", "percentile")
+RANKING_POLICY = os.getenv("RANKING_POLICY", "score")
+if RANKING_NORMALIZATION not in NORMALIZATIONS:
+    print(f"Aviso: RANKING_NORMALIZATION inválido ({RANKING_NORMALIZATION}), usando percentile")
+    RANKING_NORMALIZATION = "percentile"
+if RANKING_POLICY not in POLICIES:
+    print(f"Aviso: RANKING_POLICY inválido ({RANKING_POLICY}), usando score")
+    RANKING_POLICY = "score"
+
+# Campo com a nota de popularidade de cada fonte
+SCORE_FIELDS = {"movie": "popularity", "serie": "popularity", "anime": "popularity"}
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _normal_cdf(z: float):
+    return 0.5 * math.erfc(-z / math.sqrt(2))
+
+
+@dataclass(frozen=True)
+class SourceStats:
+    sample: tuple  # notas da fonte em escala log (log1p), em ordem crescente
+    mean: float    # média e desvio padrão em escala log
+    std: float
+
+    def _position(self, index: int):
+        """Percentil (mid-rank) da nota sample[index], considerando os empates."""
+        value = self.sample[index]
+        return (bisect_left(self.sample, value) + bisect_right(self.sample, value)) / 2 / len(self.sample)
+
+    def _tail(self, x: float, edge: float):
+        """Fração da log-normal entre x e a borda da amostra (1 em x == edge); sem desvio, pela razão das notas."""
+        if self.std:
+            z, z_edge = (x - self.mean) / self.std, (edge - self.mean) / self.std
+            if x < edge:
+                return _normal_cdf(z) / _normal_cdf(z_edge) if _normal_cdf(z_edge) else 0.0
+            return _normal_cdf(-z) / _normal_cdf(-z_edge) if _normal_cdf(-z_edge) else 0.0
+        return math.expm1(x) / math.expm1(edge) if x < edge else math.expm1(edge) / math.expm1(x)
+
+    def normalize(self, value: float, method: str):
+        x = math.log1p(value)
+        if method == "zscore":
+            return (x - self.mean) / self.std if self.std else 0.0
+        # Sem nota (0) fica no fim, mesmo que a fonte inteira esteja sem nota
+        if not self.sample or value <= 0:
+            return 0.0
+        low, high = bisect_left(self.sample, x), bisect_right(self.sample, x)
+        if low < high:
+            return (low + high) / 2 / len(self.sample)
+        if low == 0:
+            return self._position(0) * self._tail(x, self.sample[0])
+        if low == len(self.sample):
+            return 1 - (1 - self._position(low - 1)) * self._tail(x, self.sample[-1])
+        below, above = self.sample[low - 1], self.sample[low]
+        fraction = (x - below) / (above - below)
+        return self._position(low - 1) + fraction * (self._position(low) - self._position(low - 1))
+
+
+def score_of(source: str, item: dict):
+    value = item.get(SCORE_FIELDS[source])
+    return value if isinstance(value, (int, float)) and value > 0 else 0
+
+
+def compute_stats(values: list):
+    """Estatísticas das notas com nota (> 0): sem nota não entram na distribuição."""
+    logs = sorted(math.log1p(value) for value in values if value > 0)
+    mean = sum(logs) / len(logs) if logs else 0.0
+    std = math.sqrt(sum((value - mean) ** 2 for value in logs) / len(logs)) if logs else 0.0
+    return SourceStats(tuple(logs), mean, std)
+
+
+def source_stats(scope: str | None, source: str, items: list, ttl: int, refresh: bool = True):
+    """
+    Estatísticas da fonte no escopo, calculadas das notas de items uma vez por ciclo (ttl segundos).
+    refresh=False: usa as guardadas se houver, mas não guarda as de items (ex: páginas fundas, que não
+    representam a fonte). Sem escopo, sempre calcula de items.
+    """
+    if scope is None:
+        return compute_stats([score_of(source, item) for item in items])
+    key = (scope, source)
+    now = time.monotonic()
+    with _stats_lock:
+        entry = _stats.get(key)
+    if entry and entry[0] > now:
+        return entry[1]
+    stats = compute_stats([score_of(source, item) for item in items])
+    if refresh and items:
+        with _stats_lock:
+            _stats[key] = (now + ttl, stats)
+    return stats
+
+
+def _ranked(source: str, items: list, stats: SourceStats, method: str):
+    """
+    (nota normalizada, item) em ordem decrescente; a ordenação é linear se a fonte já vier ordenada, e a
+    normalização é preguiçosa (só para os itens que o merge consumir).
+    """
+    scored = sorted(((score_of(source, item), item) for item in items), key=lambda entry: entry[0], reverse=True)
+    return ((stats.normalize(score, method), item) for score, item in scored)
+
+
+def rank(
+    sources: dict,
+    limit: int | None = None,
+    policy: str = RANKING_POLICY,
+    method: str = RANKING_NORMALIZATION,
+    scope: str | None = None,
+    ttl: int = 300,
+    refresh: bool = True,
+):
+    """
+    Junta as listas {fonte: itens} numa só, com até limit itens. Cada item ganha rank_score (nota normalizada).
+    Empates ficam na ordem das fontes em sources.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Política de ranking desconhecida: {policy}")
+    if method not in NORMALIZATIONS:
+        raise ValueError(f"Normalização desconhecida: {method}")
+
+    ranked = [
+        _ranked(source, items, source_stats(scope, source, items, ttl, refresh), method)
+        for source, items in sources.items()
+    ]
+    if policy == "round_robin":
+        merged = (entry for entry in chain.from_iterable(zip_longest(*ranked)) if entry is not None)
+    else:
+        merged = heapq.merge(*ranked, key=lambda entry: entry[0], reverse=True)
+    return [{**item, "rank_score": round(normalized, 4)} for normalized, item in islice(merged, limit)]
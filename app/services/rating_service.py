@@ -0,0 +1,67 @@
+# app/services/rating_service.py
+from sqlalchemy.orm import Session
+from app.models.movie import MovieModel
+from app.models.serie import SeriesModel
+from app.models.anime import AnimeModel
+from app.models.media import MediaModel
+from app.services.media_service import insert_media_stubs_stmt
+from app.core.tracing import traced
+
+# Tabela de avaliações de cada tipo de mídia
+MODEL_MAP = {"movie": MovieModel, "serie": SeriesModel, "anime": AnimeModel}
+
+# Coluna com o id da mídia na API externa, por tipo
+MEDIA_ID_COLUMN = {"movie": "movie_id", "serie": "serie_id", "anime": "anime_id"}
+
+# Coluna com a nota, por tipo
+RATING_COLUMN = {"movie": "rating", "serie": "rating", "anime": "score"}
+
+# Dados do card que o front pode mandar junto com a avaliação (vão para o stub da tabela media)
+CARD_FIELDS = ["title", "overview", "release_date", "poster_path", "backdrop_path"]
+# Título provisório do stub, até o enrichment_service trazer o da API
+UNTITLED = "Sem título"
+
+
+def media_id_column(media_type: str):
+    """Retorna a coluna ORM com o id externo da mídia (ex: MovieModel.movie_id)."""
+    return getattr(MODEL_MAP[media_type], MEDIA_ID_COLUMN[media_type])
+
+
+def rating_values(media_type: str, media_id: int, media_ref, rating: float, comment: str | None, user_id: int):
+    """
+    Monta as colunas de uma avaliação. Os metadados ficam só na tabela media
+    (media_ref = (media_ref_id, title)); a avaliação guarda apenas o título.
+    """
+    media_ref_id, title = media_ref
+    return {
+        MEDIA_ID_COLUMN[media_type]: media_id,
+        "title": title,
+        RATING_COLUMN[media_type]: rating,
+        "comment": comment,
+        "user_id": user_id,
+        "media_ref_id": media_ref_id,
+    }
+
+
+def _find_media_ref(db: Session, media_type: str, media_id: int):
+    return db.query(MediaModel.id, MediaModel.title).filter(
+        MediaModel.media_type == media_type, MediaModel.external_id == media_id
+    ).first()
+
+
+@traced()
+def build_rating_values(db: Session, media_type: str, media_id: int, rating: float, comment: str | None, user_id: int, card: dict | None = None):
+    """
+    Monta as colunas da avaliação sem ir às APIs externas: usa a mídia já registrada na tabela media
+    ou registra um stub com os dados do card (card: campos de CARD_FIELDS enviados pelo front).
+    Os metadados completos do stub são buscados depois pelo enrichment_service. Não faz commit.
+    """
+    media_ref = _find_media_ref(db, media_type, media_id)
+    if media_ref is None:
+        card = {field: value for field, value in (card or {}).items() if field in CARD_FIELDS and value}
+        stub = {"title": UNTITLED, **card, "media_type": media_type, "external_id": media_id}
+        # RETURNING vazio = outra requisição criou a mídia ao mesmo tempo
+        media_ref = db.execute(
+            insert_media_stubs_stmt(db, [stub]).returning(MediaModel.id, MediaModel.title)
+        ).first() or _find_media_ref(db, media_type, media_id)
+    return rating_values(media_type, media_id, tuple(media_ref), rating, comment, user_id)
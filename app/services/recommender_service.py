@@ -0,0 +1,548 @@
+# app/services/recommender_service.py
+import os
+import threading
+import time
+import numpy as np
+import orjson
+from scipy import sparse
+from sqlalchemy import literal, select, union_all
+from sqlalchemy.orm import Session
+from app.core.cache import get_redis
+from app.services.rating_service import MODEL_MAP, RATING_COLUMN, media_id_column
+
+# Onde o índice pré-calculado fica salvo (compartilhado entre os workers)
+RECOMMENDER_INDEX_PATH = os.getenv("RECOMMENDER_INDEX_PATH", "data/recommender_index.npz")
+
+TOP_K = 50              # vizinhos guardados por mídia
+SHRINKAGE = 10.0        # reduz a similaridade de pares com poucos usuários em comum
+BLOCK_SIZE = 512        # colunas de similaridade calculadas por vez (limita a memória)
+LIKE_THRESHOLD = 5.0    # notas acima disso puxam os vizinhos para cima; abaixo, para baixo
+SAVE_INTERVAL = 60      # segundos mínimos entre gravações após atualizações incrementais
+COMPACT_THRESHOLD = 1000  # usuários alterados (overrides) antes de juntar tudo na matriz base
+
+# Log de mudanças compartilhado entre os workers (stream do Redis)
+CHANGES_STREAM_KEY = "recommender:changes"
+SAVE_LOCK_KEY = "recommender:save"
+CHANGES_RETENTION = 10 * SAVE_INTERVAL  # segundos que uma entrada já salva no arquivo ainda fica no log
+CHANGES_MAX_LEN = 100_000  # teto do log (ex: sem índice gerado, ninguém grava nem apara)
+REPLAY_INTERVAL = 1.0      # segundos mínimos entre leituras do log nas consultas
+REPLAY_BATCH_SIZE = 500
+
+# A matriz guarda nota + 1: na matriz esparsa o zero significa "não avaliou", e 0 é uma nota válida.
+# O deslocamento some ao centralizar pela média do usuário.
+RATING_OFFSET = 1.0
+
+# Tipos de mídia guardados como códigos inteiros nos arrays
+MEDIA_TYPES = list(MODEL_MAP)
+TYPE_CODE = {media_type: code for code, media_type in enumerate(MEDIA_TYPES)}
+
+
+def _normalized_columns(ratings):
+    """
+    Cosseno ajustado: centraliza cada nota pela média do usuário e normaliza
+    cada coluna (mídia). Retorna (matriz normalizada CSC, matriz binária CSC).
+    """
+    ratings = ratings.tocsr()
+    counts = np.diff(ratings.indptr)
+    sums = np.asarray(ratings.sum(axis=1)).ravel()
+    means = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+
+    centered = ratings.copy().astype(np.float64)
+    centered.data -= np.repeat(means, counts)
+    centered.eliminate_zeros()
+
+    centered = centered.tocsc()
+    norms = np.sqrt(np.asarray(centered.multiply(centered).sum(axis=0)).ravel())
+    inv = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    normalized = centered @ sparse.diags(inv)
+
+    binary = ratings.tocsc().copy()
+    binary.data = np.ones_like(binary.data)
+    return normalized.tocsc(), binary
+
+
+def _similarity_block(normalized, binary, columns):
+    """Similaridade (com shrinkage) de todas as mídias contra as colunas informadas. Matriz densa itens x colunas."""
+    sims = (normalized.T @ normalized[:, columns]).toarray()
+    support = (binary.T @ binary[:, columns]).toarray()
+    sims *= support / (support + SHRINKAGE)
+    return sims
+
+
+def _top_k(sims, columns, k):
+    """Top-K por coluna de um bloco de similaridades. Retorna (vizinhos, similaridades), -1 onde não há vizinho."""
+    sims = sims.copy()
+    sims[columns, np.arange(len(columns))] = -np.inf  # a própria mídia não é vizinha dela
+    k = min(k, sims.shape[0])
+    top = np.argpartition(-sims, k - 1, axis=0)[:k] if k else np.empty((0, len(columns)), dtype=np.int64)
+    top_sims = np.take_along_axis(sims, top, axis=0)
+    order = np.argsort(-top_sims, axis=0)
+    top = np.take_along_axis(top, order, axis=0).T
+    top_sims = np.take_along_axis(top_sims, order, axis=0).T
+
+    neighbors = np.full((len(columns), TOP_K), -1, dtype=np.int32)
+    similarities = np.zeros((len(columns), TOP_K), dtype=np.float32)
+    positive = top_sims > 0
+    neighbors[:, :k] = np.where(positive, top, -1)
+    similarities[:, :k] = np.where(positive, top_sims, 0)
+    return neighbors, similarities
+
+
+def _ensure_capacity(array, size: int, fill):
+    """array com pelo menos size linhas (dobra a capacidade ao crescer, preenchendo com fill)."""
+    if len(array) >= size:
+        return array
+    grown = np.full((max(size, 2 * len(array)),) + array.shape[1:], fill, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+_EMPTY_ROW = (np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32))
+
+
+class RecommenderIndex:
+    """
+    Índice item-item pré-calculado: matriz esparsa usuário x mídia com as notas e,
+    para cada mídia, os TOP_K vizinhos mais parecidos em arrays contíguos.
+
+    As atualizações incrementais não reescrevem a matriz: as linhas (usuários) alteradas ficam em
+    overrides por cima da matriz base, junto com a soma e a contagem das notas de cada usuário e a
+    norma (ao quadrado) de cada coluna centralizada. compact() junta tudo de novo na matriz base.
+    """
+
+    def __init__(self, user_ids, item_types, item_ids, ratings, neighbors, similarities, log_id: str = "0-0"):
+        self.user_ids = [int(u) for u in user_ids]
+        self.item_keys = [(MEDIA_TYPES[t], int(m)) for t, m in zip(item_types, item_ids)]
+        self.user_pos = {u: i for i, u in enumerate(self.user_ids)}
+        self.item_pos = {key: i for i, key in enumerate(self.item_keys)}
+        self.neighbors = neighbors  # podem ter mais linhas que item_count (capacidade reservada)
+        self.similarities = similarities
+        self.log_id = log_id  # última entrada do log de mudanças já aplicada
+        self.lock = threading.RLock()
+        self._set_base(ratings)
+
+    @property
+    def item_count(self):
+        return len(self.item_keys)
+
+    def item_key(self, position: int):
+        return self.item_keys[position]
+
+    def _set_base(self, ratings):
+        """Troca a matriz base e recalcula, dela, as somas por usuário e as normas por coluna."""
+        self.ratings = ratings.tocsr()
+        self.ratings.sort_indices()
+        self.by_item = self.ratings.tocsc()
+        self.by_item.sort_indices()
+        self.overrides = {}
+
+        counts = np.diff(self.ratings.indptr)
+        sums = np.asarray(self.ratings.sum(axis=1), dtype=np.float64).ravel()
+        means = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+        centered = self.ratings.data - np.repeat(means, counts)
+        self.user_sum, self.user_count = sums, counts.astype(np.int64)
+        self.col_sq = np.bincount(self.ratings.indices, weights=centered ** 2, minlength=self.ratings.shape[1])
+
+    # --- Persistência ---
+
+    def save(self, path: str | None = None):
+        """Grava o índice num arquivo .npz (troca atômica, os outros workers recarregam pelo mtime)."""
+        path = path or RECOMMENDER_INDEX_PATH
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        with self.lock:
+            self.compact()
+            np.savez(
+                tmp_path,
+                user_ids=np.asarray(self.user_ids, dtype=np.int64),
+                item_types=np.array([TYPE_CODE[t] for t, _ in self.item_keys], dtype=np.int8),
+                item_ids=np.array([m for _, m in self.item_keys], dtype=np.int64),
+                data=self.ratings.data, indices=self.ratings.indices, indptr=self.ratings.indptr,
+                neighbors=self.neighbors[:self.item_count], similarities=self.similarities[:self.item_count],
+                log_id=np.array(self.log_id),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str | None = None):
+        path = path or RECOMMENDER_INDEX_PATH
+        with np.load(path) as f:
+            shape = (len(f["user_ids"]), len(f["item_ids"]))
+            ratings = sparse.csr_matrix((f["data"], f["indices"], f["indptr"]), shape=shape)
+            log_id = str(f["log_id"]) if "log_id" in f.files else "0-0"
+            return cls(
+                f["user_ids"], f["item_types"], f["item_ids"], ratings, f["neighbors"], f["similarities"], log_id
+            )
+
+    # --- Linhas e colunas (matriz base + overrides) ---
+
+    def _row(self, user: int):
+        """(colunas, notas) do usuário, em ordem de coluna."""
+        if user in self.overrides:
+            return self.overrides[user]
+        if user < self.ratings.shape[0]:
+            start, end = self.ratings.indptr[user], self.ratings.indptr[user + 1]
+            return self.ratings.indices[start:end], self.ratings.data[start:end]
+        return _EMPTY_ROW
+
+    def _raters(self, item: int):
+        """Usuários que avaliaram a mídia."""
+        users = []
+        if item < self.by_item.shape[1]:
+            base = self.by_item.indices[self.by_item.indptr[item]:self.by_item.indptr[item + 1]]
+            if self.overrides:
+                base = base[~np.isin(base, np.fromiter(self.overrides, dtype=np.int64))]
+            users.append(base)
+        for user, (columns, _) in self.overrides.items():
+            position = np.searchsorted(columns, item)
+            if position < len(columns) and columns[position] == item:
+                users.append(np.array([user]))
+        return np.concatenate(users).astype(np.int64) if users else np.empty(0, dtype=np.int64)
+
+    def _mean(self, users):
+        counts = self.user_count[users]
+        return np.divide(self.user_sum[users], counts, out=np.zeros(len(users)), where=counts > 0)
+
+    def _add_row_norms(self, user: int, columns, values, sign: int):
+        """Soma (sign=1) ou tira (sign=-1) as notas centralizadas da linha das normas das colunas."""
+        if len(columns):
+            np.add.at(self.col_sq, columns, sign * (values - self._mean([user])[0]) ** 2)
+
+    def _key_position(self, ids: list, positions: dict, key):
+        if key not in positions:
+            positions[key] = len(ids)
+            ids.append(key)
+        return positions[key]
+
+    def compact(self):
+        """Junta os overrides na matriz base (e recalcula as normas sem o erro acumulado das atualizações)."""
+        with self.lock:
+            shape = (len(self.user_ids), self.item_count)
+            if not self.overrides and self.ratings.shape == shape:
+                return
+            base = self.ratings.copy()
+            base.resize(shape)
+            keep = np.ones(shape[0])
+            keep[list(self.overrides)] = 0
+            rows = [np.full(len(columns), user) for user, (columns, _) in self.overrides.items()]
+            changed = sparse.csr_matrix(
+                (
+                    np.concatenate([values for _, values in self.overrides.values()] or [np.empty(0)]),
+                    (
+                        np.concatenate(rows or [np.empty(0)]).astype(np.int64),
+                        np.concatenate([columns for columns, _ in self.overrides.values()] or [np.empty(0)]).astype(np.int64),
+                    ),
+                ),
+                shape=shape, dtype=np.float32,
+            )
+            ratings = (sparse.diags(keep) @ base + changed).tocsr().astype(np.float32)
+            ratings.eliminate_zeros()
+            self._set_base(ratings)
+
+    # --- Atualização incremental ---
+
+    def apply_changes(self, changes: list):
+        """
+        Aplica as notas novas (ou removidas, rating=None) no próprio índice: atualiza só as linhas dos
+        usuários e as normas das colunas que eles avaliaram, recalcula os vizinhos das mídias afetadas a
+        partir de quem as avaliou e insere-as também nas listas de vizinhos de quem ficou parecido.
+        As mudanças são idempotentes (valem como "a nota agora é esta"), então reaplicar é seguro.
+        changes: lista de (user_id, media_type, media_id, rating | None).
+        """
+        with self.lock:
+            updates = {}
+            for user_id, media_type, media_id, rating in changes:
+                user = self._key_position(self.user_ids, self.user_pos, int(user_id))
+                item = self._key_position(self.item_keys, self.item_pos, (media_type, int(media_id)))
+                updates.setdefault(user, {})[item] = rating + RATING_OFFSET if rating is not None else None
+
+            users, items = len(self.user_ids), self.item_count
+            self.user_sum = _ensure_capacity(self.user_sum, users, 0.0)
+            self.user_count = _ensure_capacity(self.user_count, users, 0)
+            self.col_sq = _ensure_capacity(self.col_sq, items, 0.0)
+            self.neighbors = _ensure_capacity(self.neighbors, items, -1)
+            self.similarities = _ensure_capacity(self.similarities, items, 0.0)
+
+            for user, values in updates.items():
+                columns, old_values = self._row(user)
+                self._add_row_norms(user, columns, old_values, -1)
+                row = dict(zip(columns.tolist(), old_values.tolist()))
+                for item, value in values.items():
+                    if value is None:
+                        row.pop(item, None)
+                    else:
+                        row[item] = value
+                columns = np.array(sorted(row), dtype=np.int32)
+                new_values = np.array([row[c] for c in columns.tolist()], dtype=np.float32)
+                self.overrides[user] = (columns, new_values)
+                self.user_sum[user], self.user_count[user] = float(new_values.sum()), len(new_values)
+                self._add_row_norms(user, columns, new_values, 1)
+
+            changed = sorted({item for values in updates.values() for item in values})
+            for item in changed:
+                self._update_neighbors(item)
+            if len(self.overrides) > COMPACT_THRESHOLD:
+                self.compact()
+
+    def _update_neighbors(self, item: int):
+        """Recalcula os vizinhos da mídia usando só as linhas de quem a avaliou."""
+        raters = self._raters(item)
+        self.neighbors[item], self.similarities[item] = -1, 0
+        if not len(raters):
+            return
+        rows = [self._row(user) for user in raters]
+        lengths = np.array([len(columns) for columns, _ in rows])
+        columns = np.concatenate([columns for columns, _ in rows])
+        centered = np.concatenate([values for _, values in rows]).astype(np.float64) - np.repeat(self._mean(raters), lengths)
+        own = np.array([values[np.searchsorted(cols, item)] for cols, values in rows], dtype=np.float64) - self._mean(raters)
+
+        others, inverse = np.unique(columns, return_inverse=True)
+        dots = np.bincount(inverse, weights=centered * np.repeat(own, lengths))
+        support = np.bincount(inverse)
+        norms = np.sqrt(np.maximum(self.col_sq[others], 0)) * np.sqrt(max(self.col_sq[item], 0))
+        sims = np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 1e-9)
+        sims *= support / (support + SHRINKAGE)
+        sims[others == item] = -np.inf
+
+        top = np.argsort(-sims, kind="stable")[:TOP_K]
+        top = top[sims[top] > 0]
+        self.neighbors[item, :len(top)] = others[top]
+        self.similarities[item, :len(top)] = sims[top]
+
+        # Simetria: a mídia alterada entra na lista de quem ela superar
+        for other, sim in zip(self.neighbors[item], self.similarities[item]):
+            if other < 0:
+                break
+            row_items, row_sims = self.neighbors[other], self.similarities[other]
+            existing = np.flatnonzero(row_items == item)
+            if existing.size:
+                row_sims[existing[0]] = sim
+            elif sim > row_sims[-1] or row_items[-1] < 0:
+                row_items[-1], row_sims[-1] = item, sim
+            else:
+                continue
+            order = np.argsort(-np.where(row_items >= 0, row_sims, -np.inf), kind="stable")
+            self.neighbors[other] = row_items[order]
+            self.similarities[other] = row_sims[order]
+
+    # --- Consulta ---
+
+    def recommend(self, user_ratings: dict, limit: int = 20):
+        """
+        Recomendações para um usuário a partir das notas dele, {(media_type, media_id): nota}.
+        Pontuação de cada mídia candidata: soma de similaridade x (nota - LIKE_THRESHOLD)
+        sobre as mídias que o usuário avaliou. Retorna [(posição, pontuação, posição_da_origem)].
+        """
+        with self.lock:
+            rated = [(self.item_pos[key], rating) for key, rating in user_ratings.items() if key in self.item_pos]
+            if not rated:
+                return []
+            sources = np.array([pos for pos, _ in rated], dtype=np.int64)
+            weights = np.array([rating for _, rating in rated], dtype=np.float32) - LIKE_THRESHOLD
+
+            neighbors = self.neighbors[sources]
+            contrib = self.similarities[sources] * weights[:, None]
+            item_count = self.item_count
+        origin = np.broadcast_to(sources[:, None], neighbors.shape)
+
+        valid = neighbors >= 0
+        neighbors, contrib, origin = neighbors[valid], contrib[valid], origin[valid]
+        if not neighbors.size:
+            return []
+
+        scores = np.bincount(neighbors, weights=contrib, minlength=item_count)
+
+        # "Porque você avaliou X": a mídia avaliada que mais contribuiu para cada candidata
+        because = np.full(item_count, -1, dtype=np.int64)
+        order = np.lexsort((-contrib, neighbors))
+        candidates, first = np.unique(neighbors[order], return_index=True)
+        because[candidates] = origin[order][first]
+
+        scores[sources] = 0  # não recomenda o que o usuário já avaliou
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        candidates = candidates[np.argsort(-scores[candidates])]
+        return [(int(c), float(scores[c]), int(because[c])) for c in candidates]
+
+
+def build_index(db: Session):
+    """Monta o índice do zero a partir das tabelas de avaliações (job offline / batch)."""
+    user_ids, item_keys, values = [], [], []
+    for media_type, model in MODEL_MAP.items():
+        rating_col = getattr(model, RATING_COLUMN[media_type])
+        query = db.query(model.user_id, media_id_column(media_type), rating_col).filter(
+            rating_col.isnot(None)
+        ).yield_per(5000)
+        for user_id, media_id, rating in query:
+            user_ids.append(user_id)
+            item_keys.append((TYPE_CODE[media_type], media_id))
+            values.append(rating + RATING_OFFSET)
+
+    users, user_index = np.unique(np.array(user_ids, dtype=np.int64), return_inverse=True)
+    items, item_index = np.unique(np.array(item_keys, dtype=np.int64).reshape(-1, 2), axis=0, return_inverse=True)
+    item_index = item_index.ravel()
+    ratings = sparse.csr_matrix(
+        (np.array(values, dtype=np.float32), (user_index, item_index)), shape=(len(users), len(items))
+    )
+    ratings.sum_duplicates()
+
+    normalized, binary = _normalized_columns(ratings)
+    neighbors = np.full((len(items), TOP_K), -1, dtype=np.int32)
+    similarities = np.zeros((len(items), TOP_K), dtype=np.float32)
+    for start in range(0, len(items), BLOCK_SIZE):
+        columns = np.arange(start, min(start + BLOCK_SIZE, len(items)))
+        sims = _similarity_block(normalized, binary, columns)
+        neighbors[columns], similarities[columns] = _top_k(sims, columns, TOP_K)
+
+    return RecommenderIndex(users, items[:, 0], items[:, 1], ratings, neighbors, similarities)
+
+
+# --- Log de mudanças compartilhado ---
+# Cada worker mantém o índice em memória, mas as mudanças vão para uma stream do Redis que todos
+# aplicam (e que o arquivo salvo referencia pelo id da última entrada incluída). Assim nenhum worker
+# perde as atualizações dos outros quando recarrega o arquivo: ele reaplica o log a partir do arquivo.
+
+def _stream_id(value: str):
+    milliseconds, _, sequence = value.partition("-")
+    return int(milliseconds), int(sequence or 0)
+
+
+def _replay(index: RecommenderIndex, redis_client):
+    """Aplica no índice as entradas do log posteriores a index.log_id."""
+    while True:
+        entries = [
+            (entry_id, fields) for entry_id, fields in
+            redis_client.xrange(CHANGES_STREAM_KEY, min=index.log_id, count=REPLAY_BATCH_SIZE)
+            if entry_id != index.log_id
+        ]
+        if not entries:
+            return
+        index.apply_changes([tuple(change) for _, fields in entries for change in orjson.loads(fields["changes"])])
+        index.log_id = entries[-1][0]
+
+
+def _save(index: RecommenderIndex, redis_client):
+    """
+    Grava o índice (no máximo a cada SAVE_INTERVAL, e um worker por vez) e apaga do log as entradas
+    já incluídas no arquivo que tenham mais de CHANGES_RETENTION segundos (folga para os workers que
+    ainda não recarregaram).
+    """
+    global _index_mtime, _last_save
+    if time.time() - _last_save < SAVE_INTERVAL:
+        return
+    _last_save = time.time()
+    if redis_client and not redis_client.set(SAVE_LOCK_KEY, os.getpid(), nx=True, ex=SAVE_INTERVAL):
+        return
+    index.save()
+    _index_mtime = os.path.getmtime(RECOMMENDER_INDEX_PATH)
+    if redis_client:
+        oldest = f"{int((time.time() - CHANGES_RETENTION) * 1000)}-0"
+        redis_client.xtrim(CHANGES_STREAM_KEY, minid=min(index.log_id, oldest, key=_stream_id))
+
+
+# --- Índice carregado no worker ---
+
+_index = None
+_index_mtime = None
+_last_save = 0.0
+_last_replay = 0.0
+_lock = threading.Lock()
+
+
+def get_index():
+    """
+    Índice em memória; recarrega do disco quando o arquivo muda (ex: após um rebuild ou a gravação de
+    outro worker) e aplica o log de mudanças (no máximo a cada REPLAY_INTERVAL). None se ainda não existir.
+    """
+    global _index, _index_mtime, _last_replay
+    try:
+        mtime = os.path.getmtime(RECOMMENDER_INDEX_PATH)
+    except OSError:
+        return _index
+    stale = time.monotonic() - _last_replay >= REPLAY_INTERVAL
+    if mtime != _index_mtime or stale:
+        with _lock:
+            try:
+                redis_client = get_redis()
+                if mtime != _index_mtime:
+                    index = RecommenderIndex.load()
+                    if redis_client:
+                        _replay(index, redis_client)
+                    _index, _index_mtime = index, mtime
+                elif redis_client:
+                    _replay(_index, redis_client)
+                _last_replay = time.monotonic()
+            except Exception as e:
+                print(f"Aviso: não foi possível atualizar o índice de recomendações: {e}")
+    return _index
+
+
+def apply_rating_changes(changes: list):
+    """
+    Atualização incremental (roda em BackgroundTasks após rate/update/delete e a cada bloco importado).
+    Com Redis, as mudanças entram no log compartilhado e cada worker as aplica; sem Redis, só neste
+    worker. Grava o índice no disco no máximo a cada SAVE_INTERVAL segundos.
+    """
+    global _last_replay
+    if not changes:
+        return
+    redis_client = get_redis()
+    try:
+        if redis_client:
+            redis_client.xadd(
+                CHANGES_STREAM_KEY, {"changes": orjson.dumps(changes)},
+                maxlen=CHANGES_MAX_LEN, approximate=True,
+            )
+        index = get_index()
+        if index is None:
+            return
+        with _lock:
+            if redis_client:
+                _replay(index, redis_client)
+                _last_replay = time.monotonic()
+            else:
+                index.apply_changes(changes)
+            _save(index, redis_client)
+    except Exception as e:
+        print(f"Erro ao atualizar o índice de recomendações: {e}")
+
+
+def user_ratings_query(user_id: int):
+    """Todas as notas do usuário numa única query (UNION ALL das três tabelas)."""
+    selects = []
+    for media_type, model in MODEL_MAP.items():
+        selects.append(
+            select(
+                literal(media_type).label("media_type"),
+                media_id_column(media_type).label("media_id"),
+                getattr(model, RATING_COLUMN[media_type]).label("rating"),
+                model.title.label("title"),
+            ).where(model.user_id == user_id)
+        )
+    return union_all(*selects)
+
+
+if __name__ == "__main__":
+    # Uso: python -m app.services.recommender_service build
+    import sys
+    from app.core.startup import prepare_cli
+    from app.config import SessionLocal
+
+    if sys.argv[1:] != ["build"]:
+        print("Uso: python -m app.services.recommender_service build")
+        sys.exit(1)
+
+    prepare_cli()  # registra todos os modelos e garante o schema
+    session = SessionLocal()
+    try:
+        started = time.time()
+        # As mudanças do log a partir daqui são reaplicadas por cima do índice (reaplicar é seguro)
+        redis_client = get_redis()
+        last = redis_client.xrevrange(CHANGES_STREAM_KEY, count=1) if redis_client else []
+        index = build_index(session)
+        index.log_id = last[0][0] if last else "0-0"
+        index.save()
+        print(f"Índice de recomendações: {index.item_count} mídias, {len(index.user_ids)} usuários ({time.time() - started:.1f}s)")
+    finally:
+        session.close()
@@ -0,0 +1,173 @@
+# app/services/stats_service.py
+import math
+from sqlalchemy import and_, case, delete, func, literal, select, tuple_
+from sqlalchemy.orm import Session
+from app.core.sql import dialect_insert
+from app.core.tracing import traced
+from app.models.media_rating_stats import MediaRatingStatsModel, HISTOGRAM_BUCKETS
+from app.services.rating_service import MODEL_MAP, media_id_column, RATING_COLUMN
+
+STAT_COLUMNS = ["rating_count", "rating_sum", "rating_sum_sq"] + [f"bucket_{b}" for b in HISTOGRAM_BUCKETS]
+
+
+def rating_bucket(rating: float) -> int:
+    """Faixa do histograma da nota (arredondada, 7.5 -> 8). Mesma regra usada em rebuild_rating_stats."""
+    return min(10, max(0, int(rating + 0.5)))
+
+
+def rating_delta(added: float | None = None, removed: float | None = None):
+    """
+    Variação do agregado ao adicionar e/ou remover uma nota.
+    Ex: atualização de 6 para 8 -> rating_delta(added=8, removed=6).
+    """
+    delta = dict.fromkeys(STAT_COLUMNS, 0)
+    for rating, sign in ((added, 1), (removed, -1)):
+        if rating is None:
+            continue
+        delta["rating_count"] += sign
+        delta["rating_sum"] += sign * rating
+        delta["rating_sum_sq"] += sign * rating * rating
+        delta[f"bucket_{rating_bucket(rating)}"] += sign
+    return delta
+
+
+def apply_rating_deltas(db: Session, deltas: dict):
+    """
+    Aplica as variações no agregado num único INSERT ... ON CONFLICT DO UPDATE
+    (coluna = coluna + variação), atômico mesmo com avaliações simultâneas.
+    deltas: {(media_type, media_id): delta}. Não faz commit.
+    """
+    rows = [
+        {"media_type": media_type, "media_id": media_id, **delta}
+        for (media_type, media_id), delta in deltas.items()
+        if any(delta.values())
+    ]
+    if not rows:
+        return
+    table = MediaRatingStatsModel.__table__
+    stmt = dialect_insert(db, MediaRatingStatsModel).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["media_type", "media_id"],
+        set_={column: table.c[column] + stmt.excluded[column] for column in STAT_COLUMNS},
+    )
+    db.execute(stmt)
+
+
+@traced()
+def record_rating_change(db: Session, media_type: str, media_id: int, added: float | None = None, removed: float | None = None):
+    """Atualiza o agregado de uma mídia (criação: added; remoção: removed; atualização: os dois). Não faz commit."""
+    apply_rating_deltas(db, {(media_type, media_id): rating_delta(added, removed)})
+
+
+def delete_user_ratings(db: Session, user_id: int, limit: int | None = None):
+    """
+    Remove as avaliações do usuário (um DELETE ... RETURNING por tabela, no máximo
+    `limit` linhas por tabela) e desconta as notas removidas do agregado num único upsert.
+    Não faz commit. Retorna quantas avaliações foram removidas.
+    """
+    deltas = {}
+    total = 0
+    for media_type, model in MODEL_MAP.items():
+        condition = model.user_id == user_id
+        if limit:
+            condition = model.id.in_(select(model.id).where(condition).limit(limit))
+        removed = db.execute(
+            delete(model)
+            .where(condition)
+            .returning(media_id_column(media_type), getattr(model, RATING_COLUMN[media_type]))
+            .execution_options(synchronize_session=False)
+        ).all()
+        total += len(removed)
+        for media_id, rating in removed:
+            delta = deltas.setdefault((media_type, media_id), dict.fromkeys(STAT_COLUMNS, 0))
+            for column, value in rating_delta(removed=rating).items():
+                delta[column] += value
+    apply_rating_deltas(db, deltas)
+    return total
+
+
+def summarize(stats) -> dict:
+    """Resumo público do agregado: quantidade, média, desvio padrão e histograma."""
+    count = stats.rating_count if stats else 0
+    if not count:
+        return {"count": 0, "average": None, "stddev": None, "histogram": [0] * len(HISTOGRAM_BUCKETS)}
+    average = stats.rating_sum / count
+    variance = max(stats.rating_sum_sq / count - average * average, 0.0)
+    return {
+        "count": count,
+        "average": round(average, 2),
+        "stddev": round(math.sqrt(variance), 2),
+        "histogram": [getattr(stats, f"bucket_{b}") for b in HISTOGRAM_BUCKETS],
+    }
+
+
+@traced()
+def get_rating_stats_many(db: Session, keys: list):
+    """Agregados de várias mídias numa única query. Retorna {(media_type, media_id): resumo}."""
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return {}
+    rows = db.query(MediaRatingStatsModel).filter(
+        tuple_(MediaRatingStatsModel.media_type, MediaRatingStatsModel.media_id).in_(keys)
+    ).all()
+    found = {(row.media_type, row.media_id): row for row in rows}
+    return {key: summarize(found.get(key)) for key in keys}
+
+
+def get_rating_stats(db: Session, media_type: str, media_id: int):
+    """Agregado de uma única mídia (zerado se ninguém avaliou ainda)."""
+    return get_rating_stats_many(db, [(media_type, media_id)])[(media_type, media_id)]
+
+
+def rebuild_rating_stats(db: Session):
+    """
+    Reconciliação: recalcula o agregado inteiro a partir das tabelas de avaliações,
+    com um INSERT ... SELECT ... GROUP BY por tipo, tudo numa única transação.
+    """
+    db.execute(delete(MediaRatingStatsModel))
+    for media_type, model in MODEL_MAP.items():
+        id_col = media_id_column(media_type)
+        rating = getattr(model, RATING_COLUMN[media_type])
+
+        buckets = []
+        for b in HISTOGRAM_BUCKETS:
+            # Mesma regra de rating_bucket: [b - 0.5, b + 0.5), com as pontas abertas
+            conditions = []
+            if b > 0:
+                conditions.append(rating >= b - 0.5)
+            if b < 10:
+                conditions.append(rating < b + 0.5)
+            buckets.append(func.sum(case((and_(*conditions), 1), else_=0)).label(f"bucket_{b}"))
+
+        source = select(
+            literal(media_type).label("media_type"),
+            id_col.label("media_id"),
+            func.count(rating).label("rating_count"),
+            func.coalesce(func.sum(rating), 0).label("rating_sum"),
+            func.coalesce(func.sum(rating * rating), 0).label("rating_sum_sq"),
+            *buckets,
+        ).where(rating.isnot(None)).group_by(id_col)
+
+        db.execute(
+            MediaRatingStatsModel.__table__.insert().from_select(["media_type", "media_id", *STAT_COLUMNS], source)
+        )
+    db.commit()
+    print("Agregado de notas reconstruído a partir das avaliações")
+
+
+if __name__ == "__main__":
+    # Uso: python -m app.services.stats_service rebuild
+    import sys
+    from app.core.startup import prepare_cli
+    from app.config import SessionLocal
+
+    if sys.argv[1:] != ["rebuild"]:
+        print("Uso: python -m app.services.stats_service rebuild")
+        sys.exit(1)
+
+    prepare_cli()  # registra todos os modelos e garante o schema
+    session = SessionLocal()
+    try:
+        rebuild_rating_stats(session)
+    finally:
+        session.close()
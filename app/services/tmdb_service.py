@@ -1,14 +1,82 @@
-import requests
 import os
-import math
 import hashlib
-from app.core.cache import get_from_cache, set_to_cache
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from fastapi import HTTPException, Query
+from app.core.cache import get_from_cache, set_to_cache, get_many_from_cache, set_many_to_cache, get_redis
+from app.core.http import HTTP_TIMEOUT, get_http_session
+from app.core.metrics import track_upstream, url_endpoint
+from app.core.pagination import CATALOG_PREFETCH_PAGES, page_window, page_ttl, prefetch
+from app.core.tracing import span, traced
+from app.services import upstream_store
 
 TMDB_API_KEY = os.getenv("TMDB_API_KEY")
+# Configurável para apontar para o TMDB falso dos benchmarks (benchmarks/fake_upstream.py)
+TMDB_BASE_URL = os.getenv("TMDB_BASE_URL", "https://api.themoviedb.org/3").rstrip("/")
+
+# --- Idioma e região ---
+# Idioma padrão e idiomas aceitos (?language=): cada idioma a mais é mais um conjunto de chaves no cache
+TMDB_LANGUAGE = os.getenv("TMDB_LANGUAGE", "pt-BR")
+TMDB_LANGUAGES = [lang.strip() for lang in os.getenv("TMDB_LANGUAGES", TMDB_LANGUAGE).split(",") if lang.strip()]
+if TMDB_LANGUAGE not in TMDB_LANGUAGES:
+    TMDB_LANGUAGES.insert(0, TMDB_LANGUAGE)
+# Região padrão (código ISO 3166-1, ex: BR) dos populares e da busca de filmes; vazio = sem filtro
+TMDB_REGION = os.getenv("TMDB_REGION") or None
+
+_REGION_PATTERN = re.compile(r"^[A-Za-z]{2}$")
+
+# Campos que o TMDB traduz. O resto (ids, popularidade, imagens, números) é igual em qualquer idioma:
+# fica numa chave compartilhada, e cada idioma guarda só os campos traduzidos.
+TEXT_FIELDS = ("title", "name", "overview", "tagline", "homepage")
 
 # --- Duração do Cache (igual ao anilist_service para consistência) ---
 CACHE_LIST_TTL = 300      # 5 minutos para listas (populares, busca)
 CACHE_DETAILS_TTL = 3600  # 1 hora para detalhes individuais (e créditos)
+CACHE_GENRES_TTL = 86400  # nomes dos gêneros por idioma
+
+# Itens por página nas listas do TMDB (populares, busca)
+TMDB_PAGE_SIZE = 20
+
+# O /changes do TMDB só cobre os últimos 14 dias
+CHANGES_MAX_DAYS = 14
+
+
+def resolve_locale(language: str | None = None, region: str | None = None):
+    """Valida e completa (com os padrões) o idioma e a região pedidos. Retorna (language, region)."""
+    language = language or TMDB_LANGUAGE
+    if language not in TMDB_LANGUAGES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Idioma não suportado: {language}. Use um destes: {', '.join(TMDB_LANGUAGES)}",
+        )
+    region = region or TMDB_REGION
+    if region is not None and not _REGION_PATTERN.match(region):
+        raise HTTPException(status_code=400, detail="Região inválida: use um código de país com 2 letras (ex: BR)")
+    return language, region.upper() if region else None
+
+
+def locale_params(
+    language: str | None = Query(None, description="Idioma das informações do TMDB (ex: pt-BR, en-US)"),
+    region: str | None = Query(None, min_length=2, max_length=2, description="País (ISO 3166-1) para os populares e a busca de filmes"),
+):
+    """Dependência das rotas com ?language= e ?region=."""
+    return resolve_locale(language, region)
+
+
+def _get_response(url: str, headers: dict | None = None):
+    """GET ao TMDB com error handling. Retorna a resposta (200 ou 304), ou None em caso de falha."""
+    import requests  # já carregado pela sessão HTTP (o import do módulo não carrega o requests)
+
+    try:
+        endpoint = url_endpoint(url)
+        with span("tmdb GET", **{"http.route": endpoint}), track_upstream("tmdb", endpoint):
+            response = get_http_session().get(url, headers=headers, timeout=HTTP_TIMEOUT)
+            response.raise_for_status() # Lança erro para 4xx/5xx
+        return response
+    except requests.exceptions.RequestException as e:
+        print(f"Erro ao buscar dados do TMDB (url: {url}): {e}")
+        return None # Retorna None em caso de falha
 
 
 def _safe_get_request(url: str):
@@ -16,148 +84,269 @@ def _safe_get_request(url: str):
     Função helper para fazer requisições GET ao TMDB com error handling.
     Retorna None em caso de falha.
     """
-    try:
-        response = requests.get(url)
-        response.raise_for_status() # Lança erro para 4xx/5xx
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Erro ao buscar dados do TMDB (url: {url}): {e}")
-        return None # Retorna None em caso de falha
+    response = _get_response(url)
+    return response.json() if response is not None else None
 
 
-# --- Populares ---
+# --- Respostas persistentes (detalhes, créditos, traduções) ---
 
-def get_popular_movies(limit=50):
-    cache_key = f"tmdb:popular_movies:{limit}"
-    
-    cached_data = get_from_cache(cache_key)
-    if cached_data:
-        return cached_data
+_API_KEY_PARAM = re.compile(r"api_key=[^&]*&?")
+_RESOURCE_PATH = re.compile(r"^/(movie|tv)/(\d+)")
 
-    all_results = []
-    pages_to_fetch = math.ceil(limit / 20)
 
-    for page in range(1, pages_to_fetch + 1):
-        url = f"https://api.themoviedb.org/3/movie/popular?api_key={TMDB_API_KEY}&language=pt-BR&page={page}"
-        data = _safe_get_request(url) # Usa a função helper segura
-        
-        if not data:
-            break # Para a execução em caso de erro de rede
+def _store_key(url: str):
+    """URL sem a base e sem a api_key (ex: /movie/550?language=pt-BR)."""
+    return _API_KEY_PARAM.sub("", url[len(TMDB_BASE_URL):]).rstrip("?&")
+
+
+def _store_url(key: str):
+    path, _, query = key.partition("?")
+    return f"{TMDB_BASE_URL}{path}?api_key={TMDB_API_KEY}" + (f"&{query}" if query else "")
+
+
+def _stored_get_request(url: str):
+    """
+    Como _safe_get_request, mas passando pelo upstream_store: depois que o Redis expira, a resposta
+    volta do banco ou é revalidada com If-None-Match/If-Modified-Since, em vez de baixada de novo.
+    """
+    def download(etag, last_modified):
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        response = _get_response(url, headers)
+        if response is None:
+            return None
+        if response.status_code == 304:
+            return upstream_store.NOT_MODIFIED
+        return response.json(), response.headers.get("ETag"), response.headers.get("Last-Modified")
+
+    key = _store_key(url)
+    match = _RESOURCE_PATH.match(key)
+    resource = (match.group(1), int(match.group(2))) if match else None
+    return upstream_store.fetch("tmdb", key, download, resource)
 
-        results = data.get("results", [])
-        all_results.extend(results)
-        
-        if len(all_results) >= limit or not results:
-            break
 
-    final_results = all_results[:limit]
-    
+def _locale_query(language: str, region: str | None = None):
+    query = f"language={language}"
+    return f"{query}&region={region}" if region else query
+
+
+def _split(item: dict):
+    """Separa um resultado do TMDB em (campos independentes do idioma, campos traduzidos)."""
+    base = {key: value for key, value in item.items() if key not in TEXT_FIELDS}
+    text = {key: item[key] for key in TEXT_FIELDS if key in item}
+    if "genres" in item:
+        text["genres"] = item["genres"]  # nomes traduzidos (os ids continuam no base)
+    return base, text
+
+
+# --- Populares ---
+
+def _popular_keys(kind: str, page: int, language: str, region: str | None):
+    scope = f"{region or 'all'}:p{page}"
+    return f"tmdb:popular_{kind}:{scope}", f"tmdb:popular_{kind}_text:{language}:{scope}"
+
+
+def _fetch_popular_page(kind: str, path: str, page: int, language: str, region: str | None):
+    """Busca uma página dos populares no TMDB e guarda no cache. Retorna os itens ([] no fim da lista), ou None se falhar."""
+    url = f"{TMDB_BASE_URL}/{path}/popular?api_key={TMDB_API_KEY}&{_locale_query(language, region)}&page={page}"
+    data = _safe_get_request(url) # Usa a função helper segura
+    if not data:
+        return None
+
+    results = data.get("results", [])
     # Só armazena no cache se a busca foi bem-sucedida
-    if final_results:
-        set_to_cache(cache_key, final_results, CACHE_LIST_TTL)
-        
-    return final_results
+    if results:
+        base_key, text_key = _popular_keys(kind, page, language, region)
+        split = [_split(item) for item in results]
+        set_many_to_cache({
+            base_key: [item_base for item_base, _ in split],
+            text_key: {str(item["id"]): text for item, (_, text) in zip(results, split)},
+        }, page_ttl(page, CACHE_LIST_TTL))
+    return results
 
-def get_popular_series(limit=50):
-    cache_key = f"tmdb:popular_series:{limit}"
-    
-    cached_data = get_from_cache(cache_key)
-    if cached_data:
-        return cached_data
-        
-    all_results = []
-    pages_to_fetch = math.ceil(limit / 20)
 
-    for page in range(1, pages_to_fetch + 1):
-        url = f"https://api.themoviedb.org/3/tv/popular?api_key={TMDB_API_KEY}&language=pt-BR&page={page}"
-        data = _safe_get_request(url)
-        
-        if not data:
-            break
-            
-        results = data.get("results", [])
+def _prefetch_popular_page(kind: str, path: str, page: int, language: str, region: str | None):
+    if not all(value is not None for value in get_many_from_cache(_popular_keys(kind, page, language, region))):
+        _fetch_popular_page(kind, path, page, language, region)
+
+
+def _get_popular(kind: str, path: str, limit: int, offset: int, language: str, region: str | None):
+    """
+    Itens [offset, offset + limit) dos populares. Cada página do TMDB fica no cache em duas partes: a lista
+    (campos independentes do idioma), compartilhada entre os idiomas da mesma região, e os campos traduzidos
+    de cada item, por idioma. A página seguinte à última pedida é buscada em segundo plano.
+    """
+    pages, skip = page_window(offset, limit, TMDB_PAGE_SIZE)
+    cached = get_many_from_cache([key for page in pages for key in _popular_keys(kind, page, language, region)])
+
+    all_results = []
+    for index, page in enumerate(pages):
+        base, texts = cached[2 * index], cached[2 * index + 1]
+        if base and texts is not None and all(str(item["id"]) in texts for item in base):
+            results = [{**item, **texts[str(item["id"])]} for item in base]
+        else:
+            results = _fetch_popular_page(kind, path, page, language, region)
+        if not results:
+            break # Erro de rede ou fim da lista
         all_results.extend(results)
-        if len(all_results) >= limit or not results:
+        if len(results) < TMDB_PAGE_SIZE:
             break
-            
-    final_results = all_results[:limit]
-    
-    if final_results:
-        set_to_cache(cache_key, final_results, CACHE_LIST_TTL)
-        
-    return final_results
+    else:
+        for page in range(pages[-1] + 1, pages[-1] + 1 + CATALOG_PREFETCH_PAGES):
+            prefetch(_popular_keys(kind, page, language, region)[1], _prefetch_popular_page, kind, path, page, language, region)
+
+    return all_results[skip:skip + limit]
+
+@traced()
+def get_popular_movies(limit=50, language: str | None = None, region: str | None = None, offset: int = 0):
+    language, region = resolve_locale(language, region)
+    return _get_popular("movies", "movie", limit, offset, language, region)
+
+@traced()
+def get_popular_series(limit=50, language: str | None = None, offset: int = 0):
+    # O TMDB não filtra os populares de TV por região
+    language, _ = resolve_locale(language)
+    return _get_popular("series", "tv", limit, offset, language, None)
 
 # --- Detalhes individuais ---
 
-def get_movie_details(movie_id: int):
-    cache_key = f"tmdb:movie_details:{movie_id}"
-    
-    cached_data = get_from_cache(cache_key)
-    if cached_data:
-        return cached_data
-        
-    url = f"https://api.themoviedb.org/3/movie/{movie_id}?api_key={TMDB_API_KEY}&language=pt-BR"
-    data = _safe_get_request(url)
-    
-    # Armazena no cache (mesmo se 'data' for None, para evitar requisições repetidas para 404s)
-    # O TTL de detalhes é mais longo
-    set_to_cache(cache_key, data, CACHE_DETAILS_TTL)
-    
-    return data
+def _genre_names(path: str, language: str):
+    """{id do gênero: nome} no idioma (uma chamada por idioma por dia)."""
+    cache_key = f"tmdb:genres_text:{language}:{path}"
+    names = get_from_cache(cache_key)
+    if names is None:
+        data = _safe_get_request(f"{TMDB_BASE_URL}/genre/{path}/list?api_key={TMDB_API_KEY}&language={language}")
+        if not data:
+            return {}
+        names = {str(genre["id"]): genre["name"] for genre in data.get("genres", [])}
+        set_to_cache(cache_key, names, CACHE_GENRES_TTL)
+    return names
+
+
+def _fetch_translations(path: str, media_id: int, base: dict):
+    """
+    Campos traduzidos de todos os idiomas de TMDB_LANGUAGES numa única chamada (/translations),
+    para quando os dados independentes do idioma já estão no cache. Retorna {idioma: campos}.
+    """
+    data = _stored_get_request(f"{TMDB_BASE_URL}/{path}/{media_id}/translations?api_key={TMDB_API_KEY}")
+    if not data:
+        return {}
+    available = {
+        f"{translation['iso_639_1']}-{translation['iso_3166_1']}": translation.get("data") or {}
+        for translation in data.get("translations", [])
+    }
+
+    title_field = "title" if path == "movie" else "name"
+    original = base.get(f"original_{title_field}")
+    texts = {}
+    for language in TMDB_LANGUAGES:
+        translation = available.get(language)
+        if translation is None:
+            # Sem tradução para o país: usa a de outro país com a mesma língua (ex: pt-PT para pt-BR)
+            prefix = language.split("-")[0]
+            translation = next((value for code, value in available.items() if code.split("-")[0] == prefix), None)
+        if translation is None:
+            continue
+        text = {field: translation.get(field) or "" for field in TEXT_FIELDS if field in translation}
+        # Como o próprio TMDB faz nos detalhes: sem título traduzido, vale o original
+        text[title_field] = text.get(title_field) or original
+        if base.get("genres"):
+            names = _genre_names(path, language)
+            text["genres"] = [
+                {"id": genre["id"], "name": names.get(str(genre["id"]), genre["name"])} for genre in base["genres"]
+            ]
+        texts[language] = text
+    return texts
+
+
+def _get_details(kind: str, path: str, media_id: int, language: str):
+    """
+    Detalhes em cache em duas partes: os campos independentes do idioma (uma chave por mídia)
+    e os traduzidos (uma chave por idioma). Com a primeira parte no cache, um idioma novo
+    custa só a chamada de /translations, que traz todos os idiomas de uma vez.
+    """
+    base_key = f"tmdb:{kind}_details:{media_id}"
+    text_key = f"tmdb:{kind}_text:{language}:{media_id}"
+
+    base, text = get_many_from_cache([base_key, text_key])
+    if base and text is None:
+        texts = _fetch_translations(path, media_id, base)
+        if texts:
+            set_many_to_cache({f"tmdb:{kind}_text:{lang}:{media_id}": value for lang, value in texts.items()}, CACHE_DETAILS_TTL)
+        text = texts.get(language)
+    if base and text is not None:
+        return {**base, **text}
+
+    url = f"{TMDB_BASE_URL}/{path}/{media_id}?api_key={TMDB_API_KEY}&language={language}"
+    data = _stored_get_request(url)
+
+    # Só armazena no cache se encontrou (o TTL de detalhes é mais longo)
+    if data:
+        base, text = _split(data)
+        set_many_to_cache({base_key: base, text_key: text}, CACHE_DETAILS_TTL)
 
-def get_series_details(series_id: int):
-    cache_key = f"tmdb:series_details:{series_id}"
-    
-    cached_data = get_from_cache(cache_key)
-    if cached_data:
-        return cached_data
-        
-    url = f"https://api.themoviedb.org/3/tv/{series_id}?api_key={TMDB_API_KEY}&language=pt-BR"
-    data = _safe_get_request(url)
-    
-    set_to_cache(cache_key, data, CACHE_DETAILS_TTL)
-    
     return data
 
+@traced()
+def get_movie_details(movie_id: int, language: str | None = None):
+    language, _ = resolve_locale(language)
+    return _get_details("movie", "movie", movie_id, language)
+
+@traced()
+def get_series_details(series_id: int, language: str | None = None):
+    language, _ = resolve_locale(language)
+    return _get_details("series", "tv", series_id, language)
+
+# Elenco e equipe (nomes, funções) não dependem do idioma: uma chave por mídia, sem ?language=
+
+@traced()
 def get_movie_credits(movie_id: int):
     cache_key = f"tmdb:movie_credits:{movie_id}"
-    
+
     cached_data = get_from_cache(cache_key)
     if cached_data:
         return cached_data
-        
-    url = f"https://api.themoviedb.org/3/movie/{movie_id}/credits?api_key={TMDB_API_KEY}&language=pt-BR"
-    data = _safe_get_request(url)
+
+    url = f"{TMDB_BASE_URL}/movie/{movie_id}/credits?api_key={TMDB_API_KEY}"
+    data = _stored_get_request(url)
 
     set_to_cache(cache_key, data, CACHE_DETAILS_TTL)
-    
+
     return data
 
+@traced()
 def get_series_credits(series_id: int):
     cache_key = f"tmdb:series_credits:{series_id}"
-    
+
     cached_data = get_from_cache(cache_key)
     if cached_data:
         return cached_data
-        
-    url = f"https://api.themoviedb.org/3/tv/{series_id}/credits?api_key={TMDB_API_KEY}&language=pt-BR"
-    data = _safe_get_request(url)
-    
+
+    url = f"{TMDB_BASE_URL}/tv/{series_id}/credits?api_key={TMDB_API_KEY}"
+    data = _stored_get_request(url)
+
     set_to_cache(cache_key, data, CACHE_DETAILS_TTL)
 
     return data
 
 # --- Busca por nome ---
+# Os resultados da busca dependem do idioma (o TMDB também procura nos títulos traduzidos),
+# então a chave inteira é por idioma
 
-def search_movie(query: str, limit=30):
+@traced()
+def search_movie(query: str, limit=30, language: str | None = None, region: str | None = None):
+    language, region = resolve_locale(language, region)
     search_hash = hashlib.sha256(query.encode('utf-8')).hexdigest()
-    cache_key = f"tmdb:search_movie:{search_hash}:{limit}"
-    
+    cache_key = f"tmdb:search_movie:{language}:{region or 'all'}:{search_hash}:{limit}"
+
     cached_data = get_from_cache(cache_key)
     if cached_data:
         return cached_data
-        
-    url = f"https://api.themoviedb.org/3/search/movie?api_key={TMDB_API_KEY}&language=pt-BR&query={query}&page=1"
+
+    url = f"{TMDB_BASE_URL}/search/movie?api_key={TMDB_API_KEY}&{_locale_query(language, region)}&query={query}&page=1"
     data = _safe_get_request(url)
 
     if not data:
@@ -166,32 +355,171 @@ def search_movie(query: str, limit=30):
     results = data.get("results", [])
     results.sort(key=lambda x: x.get("popularity", 0), reverse=True)
     final_results = results[:limit]
-    
+
     # Só cacheia se houver resultados
     if final_results:
         set_to_cache(cache_key, final_results, CACHE_LIST_TTL)
-        
+
     return final_results
 
-def search_series(query: str, limit=30):
+@traced()
+def search_series(query: str, limit=30, language: str | None = None):
+    language, _ = resolve_locale(language)
     search_hash = hashlib.sha256(query.encode('utf-8')).hexdigest()
-    cache_key = f"tmdb:search_series:{search_hash}:{limit}"
-    
+    cache_key = f"tmdb:search_series:{language}:{search_hash}:{limit}"
+
     cached_data = get_from_cache(cache_key)
     if cached_data:
         return cached_data
 
-    url = f"https://api.themoviedb.org/3/search/tv?api_key={TMDB_API_KEY}&language=pt-BR&query={query}&page=1"
+    url = f"{TMDB_BASE_URL}/search/tv?api_key={TMDB_API_KEY}&{_locale_query(language)}&query={query}&page=1"
     data = _safe_get_request(url)
-    
+
     if not data:
         return []
 
     results = data.get("results", [])
     results.sort(key=lambda x: x.get("popularity", 0), reverse=True)
     final_results = results[:limit]
-    
+
     if final_results:
         set_to_cache(cache_key, final_results, CACHE_LIST_TTL)
-        
-    return final_results
\ No newline at end of file
+
+    return final_results
+
+# --- Uso do cache por idioma ---
+
+def _key_locale(key: str):
+    """Idioma de uma chave tmdb:* (terceiro segmento das chaves por idioma), ou "compartilhado"."""
+    parts = key.split(":")
+    if len(parts) > 2 and (parts[1].endswith("_text") or parts[1].startswith("search_")):
+        return parts[2]
+    return "compartilhado"
+
+
+def cache_footprint(batch_size: int = 500):
+    """
+    Chaves e bytes (tamanho dos valores) do cache do TMDB por idioma, com SCAN (não bloqueia o Redis).
+    Retorna {idioma ou "compartilhado": {"keys": n, "bytes": n}}, ou None sem Redis.
+    """
+    redis_client = get_redis()
+    if not redis_client:
+        return None
+    footprint = {}
+    keys = []
+
+    def flush():
+        pipe = redis_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.strlen(key)
+        for key, size in zip(keys, pipe.execute()):
+            entry = footprint.setdefault(_key_locale(key), {"keys": 0, "bytes": 0})
+            entry["keys"] += 1
+            entry["bytes"] += size
+        keys.clear()
+
+    for key in redis_client.scan_iter(match="tmdb:*", count=batch_size):
+        keys.append(key)
+        if len(keys) >= batch_size:
+            flush()
+    if keys:
+        flush()
+    return footprint
+
+
+# --- Sincronização com o /changes do TMDB ---
+
+# Caminho na API -> nome usado nas chaves de cache
+CHANGES_PATHS = {"movie": "movie", "tv": "series"}
+
+
+def _changed_ids(path: str, since: datetime, until: datetime):
+    """Ids que mudaram no período (todas as páginas do /changes), ou None se a API falhar."""
+    ids, page, total_pages = set(), 1, 1
+    while page <= total_pages:
+        data = _safe_get_request(
+            f"{TMDB_BASE_URL}/{path}/changes?api_key={TMDB_API_KEY}"
+            f"&start_date={since:%Y-%m-%d}&end_date={until:%Y-%m-%d}&page={page}"
+        )
+        if data is None:
+            return None
+        ids.update(item["id"] for item in data.get("results", []))
+        total_pages = data.get("total_pages") or 1
+        page += 1
+    return sorted(ids)
+
+
+def invalidate_cached(path: str, ids: list):
+    """Apaga do Redis os detalhes, créditos e traduções (todos os idiomas) das mídias."""
+    redis_client = get_redis()
+    if not redis_client or not ids:
+        return
+    kind = CHANGES_PATHS[path]
+    keys = []
+    for media_id in ids:
+        keys += [f"tmdb:{kind}_details:{media_id}", f"tmdb:{kind}_credits:{media_id}"]
+        keys += [f"tmdb:{kind}_text:{language}:{media_id}" for language in TMDB_LANGUAGES]
+    for start in range(0, len(keys), 1000):
+        redis_client.delete(*keys[start:start + 1000])
+
+
+def sync_changes(refresh: bool = True, workers: int = 4):
+    """
+    Confere o /changes do TMDB desde a última sincronização: as respostas guardadas das mídias que
+    mudaram são revalidadas (e baixadas de novo, com refresh), e as demais continuam valendo sem
+    nenhuma chamada à API. Rode periodicamente (ex: cron diário, sempre em menos de 14 dias).
+    """
+    now = datetime.utcnow()
+    since = upstream_store.get_cursor("tmdb_changes")
+    if since is None or since < now - timedelta(days=CHANGES_MAX_DAYS):
+        # Sem como saber o que mudou antes disso: as respostas seguem revalidando pelo UPSTREAM_STORE_MAX_AGE
+        upstream_store.set_cursor("tmdb_changes", now)
+        print("Primeira sincronização (ou a anterior tem mais de 14 dias): a próxima já usa o /changes")
+        return
+
+    changed = {}
+    for path in CHANGES_PATHS:
+        ids = _changed_ids(path, since, now)
+        if ids is None:
+            print(f"Aviso: falha ao buscar o /{path}/changes do TMDB. Nada foi alterado; tente de novo.")
+            return
+        changed[path] = ids
+
+    for path, ids in changed.items():
+        marked = upstream_store.mark_changed("tmdb", path, ids)
+        print(f"/{path}/changes: {len(ids)} mídias mudaram, {marked} respostas guardadas para revalidar")
+    extended = upstream_store.extend_unchanged("tmdb", list(CHANGES_PATHS), since, now)
+    print(f"{extended} respostas guardadas continuam válidas")
+
+    for path, ids in changed.items():
+        if refresh:
+            keys = upstream_store.stale_keys("tmdb", path, ids)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(lambda key: _stored_get_request(_store_url(key)), keys))
+            print(f"/{path}: {len(keys)} respostas atualizadas")
+        invalidate_cached(path, ids)
+    upstream_store.set_cursor("tmdb_changes", now)
+
+
+if __name__ == "__main__":
+    # Uso: python -m app.services.tmdb_service footprint | sync-changes [--no-refresh]
+    import sys
+
+    args = sys.argv[1:]
+    if args[:1] == ["sync-changes"] and set(args[1:]) <= {"--no-refresh"}:
+        from app.core.startup import prepare_cli
+
+        prepare_cli()
+        sync_changes(refresh="--no-refresh" not in args)
+        sys.exit(0)
+
+    if args != ["footprint"]:
+        print("Uso: python -m app.services.tmdb_service footprint | sync-changes [--no-refresh]")
+        sys.exit(1)
+
+    footprint = cache_footprint()
+    if footprint is None:
+        print("Redis indisponível (REDIS_URL)")
+        sys.exit(1)
+    for locale, entry in sorted(footprint.items()):
+        print(f"{locale:>14}: {entry['keys']:>8} chaves, {entry['bytes'] / 1024:>10.1f} KiB")
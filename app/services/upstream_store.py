@@ -0,0 +1,223 @@
+# app/services/upstream_store.py
+"""
+Armazenamento persistente das respostas das APIs externas (tabela upstream_responses).
+
+O Redis guarda as respostas por pouco tempo; aqui fica a última resposta de cada URL (ou consulta
+GraphQL), com ETag/Last-Modified e as datas de download e de validação. Depois que o Redis expira:
+
+- resposta validada há menos de max_age: volta direto do banco, sem chamar a API;
+- mais antiga: requisição condicional (If-None-Match / If-Modified-Since). Um 304 só renova a
+  validação; o corpo só é baixado de novo quando mudou;
+- API fora do ar: serve a última resposta guardada.
+
+O tmdb_service também usa o /changes do TMDB (sync-changes) para invalidar só as mídias que mudaram
+e renovar a validação de todas as outras de uma vez.
+
+Usa um engine próprio (pool pequeno), para não disputar conexões com as rotas. Com UPSTREAM_STORE_URL
+apontando para um SQLite (ex: sqlite:///data/upstream.db), o armazenamento fica em disco.
+Falhas no armazenamento nunca quebram a chamada: viram aviso e a API é chamada direto.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+import orjson
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+from app.config import DATABASE_URL
+from app.core.metrics import record_cache
+from app.core.sql import dialect_insert
+from app.models.upstream_response import UpstreamResponseModel
+
+UPSTREAM_STORE = os.getenv("UPSTREAM_STORE", "1") != "0"
+UPSTREAM_STORE_URL = os.getenv("UPSTREAM_STORE_URL") or DATABASE_URL
+UPSTREAM_STORE_POOL_SIZE = int(os.getenv("UPSTREAM_STORE_POOL_SIZE", "5"))
+# Por quanto tempo uma resposta validada é servida sem revalidar (o sync-changes do TMDB renova)
+UPSTREAM_STORE_MAX_AGE = int(os.getenv("UPSTREAM_STORE_MAX_AGE", str(7 * 86400)))
+
+# Resposta de download() quando a API responde 304
+NOT_MODIFIED = object()
+
+_engine = None
+_engine_lock = threading.Lock()
+_Session = sessionmaker(expire_on_commit=False)
+
+
+def _get_session():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                options = {}
+                if not UPSTREAM_STORE_URL.startswith("sqlite"):
+                    options = {"pool_size": UPSTREAM_STORE_POOL_SIZE, "max_overflow": UPSTREAM_STORE_POOL_SIZE}
+                engine = create_engine(UPSTREAM_STORE_URL, pool_pre_ping=True, **options)
+                if UPSTREAM_STORE_URL != DATABASE_URL:
+                    # Banco à parte: o sync_schema não cuida dele
+                    UpstreamResponseModel.__table__.create(engine, checkfirst=True)
+                _Session.configure(bind=engine)
+                _engine = engine
+    return _Session()
+
+
+def close_store():
+    """Fecha as conexões do armazenamento (shutdown da aplicação)."""
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+        _engine = None
+
+
+def _load(key: str):
+    db = _get_session()
+    try:
+        return db.query(UpstreamResponseModel).filter(UpstreamResponseModel.key == key).first()
+    finally:
+        db.close()
+
+
+def _save(provider: str, key: str, resource, body, etag: str | None, last_modified: str | None, now: datetime):
+    values = {
+        "provider": provider, "key": key,
+        "resource": resource[0] if resource else None, "resource_id": resource[1] if resource else None,
+        "body": orjson.dumps(body).decode(), "etag": etag, "last_modified": last_modified,
+        "fetched_at": now, "validated_at": now,
+    }
+    db = _get_session()
+    try:
+        stmt = dialect_insert(db, UpstreamResponseModel).values(values)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["key"],
+            set_={field: stmt.excluded[field] for field in ("body", "etag", "last_modified", "fetched_at", "validated_at")},
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _touch(key: str, now: datetime):
+    db = _get_session()
+    try:
+        db.execute(update(UpstreamResponseModel).where(UpstreamResponseModel.key == key).values(validated_at=now))
+        db.commit()
+    finally:
+        db.close()
+
+
+def fetch(provider: str, key: str, download, resource: tuple | None = None, max_age: int = UPSTREAM_STORE_MAX_AGE):
+    """
+    Resposta da chamada identificada por key, do banco ou da API.
+    download(etag, last_modified): faz a chamada (condicional, se receber validadores) e retorna
+    (corpo, etag, last_modified), NOT_MODIFIED no 304, ou None se falhar (ou a mídia não existir).
+    resource: (tipo, id) da mídia, para invalidações por mídia.
+    """
+    if not UPSTREAM_STORE:
+        result = download(None, None)
+        return result[0] if result not in (None, NOT_MODIFIED) else None
+
+    started = time.perf_counter()
+    label = f"store:{provider}"
+    row = None
+    try:
+        row = _load(key)
+    except Exception as e:
+        print(f"Aviso: falha ao ler o armazenamento de respostas ({key}): {e}")
+    now = datetime.utcnow()
+
+    if row is not None and row.validated_at is not None and row.validated_at > now - timedelta(seconds=max_age):
+        record_cache(label, "get", "hit", time.perf_counter() - started)
+        return orjson.loads(row.body)
+
+    result = download(row.etag, row.last_modified) if row is not None else download(None, None)
+    try:
+        if result is NOT_MODIFIED and row is not None:
+            _touch(key, now)
+            record_cache(label, "get", "revalidated", time.perf_counter() - started)
+            return orjson.loads(row.body)
+        if result is None or result is NOT_MODIFIED:
+            # API fora do ar (ou a mídia sumiu): a última resposta guardada é melhor que nada
+            record_cache(label, "get", "stale" if row is not None else "miss", time.perf_counter() - started)
+            return orjson.loads(row.body) if row is not None else None
+        body, etag, last_modified = result
+        _save(provider, key, resource, body, etag, last_modified, now)
+        record_cache(label, "get", "refreshed" if row is not None else "miss", time.perf_counter() - started)
+        return body
+    except Exception as e:
+        print(f"Aviso: falha ao gravar no armazenamento de respostas ({key}): {e}")
+        if result not in (None, NOT_MODIFIED):
+            return result[0]
+        return orjson.loads(row.body) if row is not None else None
+
+
+# --- Invalidação em lote (ex: /changes do TMDB) ---
+
+def get_cursor(name: str):
+    """Momento da última sincronização name (guardado como uma linha da própria tabela), ou None."""
+    row = _load(f"cursor:{name}")
+    return row.validated_at if row is not None else None
+
+
+def set_cursor(name: str, when: datetime):
+    _save("cursor", f"cursor:{name}", None, {}, None, None, when)
+
+
+def mark_changed(provider: str, resource: str, ids: list, chunk_size: int = 500):
+    """Marca para revalidar as respostas das mídias que mudaram. Retorna quantas respostas foram marcadas."""
+    marked = 0
+    db = _get_session()
+    try:
+        for start in range(0, len(ids), chunk_size):
+            result = db.execute(
+                update(UpstreamResponseModel)
+                .where(
+                    UpstreamResponseModel.provider == provider,
+                    UpstreamResponseModel.resource == resource,
+                    UpstreamResponseModel.resource_id.in_(ids[start:start + chunk_size]),
+                )
+                .values(validated_at=None)
+            )
+            marked += result.rowcount
+        db.commit()
+    finally:
+        db.close()
+    return marked
+
+
+def extend_unchanged(provider: str, resources: list, since: datetime, now: datetime):
+    """
+    Renova a validação das respostas que estavam válidas em since e não mudaram desde então
+    (chame depois de mark_changed com as mudanças do período). Retorna quantas foram renovadas.
+    """
+    db = _get_session()
+    try:
+        result = db.execute(
+            update(UpstreamResponseModel)
+            .where(
+                UpstreamResponseModel.provider == provider,
+                UpstreamResponseModel.resource.in_(resources),
+                UpstreamResponseModel.validated_at >= since,
+            )
+            .values(validated_at=now)
+        )
+        db.commit()
+        return result.rowcount
+    finally:
+        db.close()
+
+
+def stale_keys(provider: str, resource: str, ids: list, chunk_size: int = 500):
+    """Chaves das respostas marcadas para revalidar das mídias ids (para o sync-changes baixar de novo)."""
+    keys = []
+    db = _get_session()
+    try:
+        for start in range(0, len(ids), chunk_size):
+            keys.extend(row.key for row in db.query(UpstreamResponseModel.key).filter(
+                UpstreamResponseModel.provider == provider,
+                UpstreamResponseModel.resource == resource,
+                UpstreamResponseModel.resource_id.in_(ids[start:start + chunk_size]),
+                UpstreamResponseModel.validated_at.is_(None),
+            ))
+    finally:
+        db.close()
+    return keys
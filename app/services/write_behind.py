@@ -0,0 +1,375 @@
+# app/services/write_behind.py
+"""
+Modo write-behind (WRITE_BEHIND=1) para avaliações e itens de lista.
+
+A rota valida a mutação, grava na stream do Redis (durável, com consumer group) e responde 202.
+Um consumidor em segundo plano aplica as mutações em lotes, numa transação por lote, e roda as
+tarefas de depois do commit (recomendações, fan-out do feed). Só um consumidor aplica por vez
+(lease no Redis, renovado durante o lote), então as mutações de um usuário são aplicadas na ordem em que
+chegaram. Cada mutação aplicada registra o write_id na mesma transação (applied_writes): se o consumidor
+cair entre o commit e o XACK, a entrada reentregue é reconhecida e não é aplicada (nem recusada) de novo.
+
+Read-your-writes: enquanto a mutação não é aplicada, o estado pendente da entidade fica num hash
+por usuário (overlay), que as rotas de leitura aplicam por cima do banco.
+
+Sem Redis, as rotas seguem no modo síncrono.
+
+    python -m app.services.write_behind consume   # consumidor dedicado (com WRITE_BEHIND_CONSUMER=0 na API)
+"""
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import orjson
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+from app.config import SessionLocal
+from app.core.cache import get_redis
+from app.core.jobs import create_job, update_job
+from app.core.tracing import span
+from app.models.applied_write import AppliedWriteModel
+
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "0") == "1"
+# Roda o consumidor dentro de cada worker da API (só um aplica por vez); 0 para usar o processo dedicado
+WRITE_BEHIND_CONSUMER = os.getenv("WRITE_BEHIND_CONSUMER", "1") != "0"
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "100"))
+WRITE_BEHIND_BLOCK_MS = 1000
+
+STREAM_KEY = "writes:stream"
+GROUP = "appliers"
+CONSUMER = "applier"  # um nome só: quem pegar o lease também herda as entradas pendentes (não confirmadas)
+LEASE_KEY = "writes:lease"
+LEASE_MS = 30_000
+LEASE_RENEW_MS = LEASE_MS // 3  # renovação durante o lote (aplicar, tarefas pós-commit e XACK)
+# Por quanto tempo os write_id aplicados ficam guardados (tem que cobrir o tempo que uma entrada pode ficar pendente)
+APPLIED_WRITES_RETENTION = timedelta(days=7)
+APPLIED_WRITES_PRUNE_INTERVAL = 3600  # segundos
+# O overlay expira sozinho se o consumidor ficar parado (a stream continua com as mutações)
+OVERLAY_TTL = 3600
+
+# kind -> função(db, data, tasks) que aplica a mutação na sessão, sem commit.
+# Deve levantar HTTPException antes de alterar a sessão se a mutação não puder ser aplicada;
+# tarefas para depois do commit vão em tasks como (função, *args).
+HANDLERS = {}
+
+_stop = threading.Event()
+_thread = None
+
+
+def write_handler(kind: str):
+    """Registra a função que aplica as mutações de um tipo (usado pelos routers)."""
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def write_behind_enabled():
+    return WRITE_BEHIND and get_redis() is not None
+
+
+def _overlay_key(user_id: int):
+    return f"writes:overlay:{user_id}"
+
+
+# --- Overlay (read-your-writes) ---
+
+def get_overlay(user_id: int):
+    """
+    Estado pendente das entidades do usuário: {entidade: {"present", "base", "data", "write_id"}}.
+    present: se a entidade existe depois das escritas pendentes; base: se existe no banco (antes delas).
+    Vazio fora do modo write-behind.
+    """
+    if not WRITE_BEHIND:
+        return {}
+    redis_client = get_redis()
+    if not redis_client:
+        return {}
+    try:
+        return {entity: orjson.loads(value) for entity, value in redis_client.hgetall(_overlay_key(user_id)).items()}
+    except Exception as e:
+        print(f"Erro ao ler as escritas pendentes do usuário {user_id}: {e}")
+        return {}
+
+
+def enqueue_write(kind: str, user_id: int, entity: str, data: dict, present: bool, base: bool, shown: dict | None = None):
+    """
+    Grava a mutação na stream e o estado pendente da entidade no overlay do usuário.
+    shown: o que as leituras devem mostrar da entidade (padrão: data). Retorna o corpo da resposta 202.
+    """
+    write_id = create_job("write", write_kind=kind, user_id=user_id)
+    state = {"present": present, "base": base, "data": shown if shown is not None else data, "write_id": write_id}
+    redis_client = get_redis()
+    pipe = redis_client.pipeline()
+    pipe.xadd(STREAM_KEY, {
+        "kind": kind, "user_id": user_id, "entity": entity,
+        "write_id": write_id, "data": orjson.dumps(data),
+    })
+    pipe.hset(_overlay_key(user_id), entity, orjson.dumps(state))
+    pipe.expire(_overlay_key(user_id), OVERLAY_TTL)
+    try:
+        pipe.execute()
+    except Exception as e:
+        print(f"Erro ao enfileirar a escrita {kind} do usuário {user_id}: {e}")
+        update_job(write_id, status="failed", error=str(e))
+        raise HTTPException(status_code=503, detail="Não foi possível registrar a alteração. Tente novamente.")
+    return {"message": "Alteração recebida", "status": "queued", "write_id": write_id}
+
+
+def _clear_overlay(redis_client, user_id: int, entity: str, write_id: str):
+    """Remove a entidade do overlay, a não ser que uma escrita mais nova já a tenha substituído."""
+    from redis.exceptions import WatchError
+
+    key = _overlay_key(user_id)
+    for _ in range(3):
+        with redis_client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                value = pipe.hget(key, entity)
+                if not value or orjson.loads(value)["write_id"] != write_id:
+                    return
+                pipe.multi()
+                pipe.hdel(key, entity)
+                pipe.execute()
+                return
+            except WatchError:
+                continue
+
+
+# --- Consumidor ---
+
+class LeaseLost(Exception):
+    """Outro consumidor assumiu o lease no meio do lote: o lote não é confirmado e fica pendente para ele."""
+
+
+def apply_batch(entries: list, lease_lost: threading.Event | None = None):
+    """
+    Aplica as entradas [(id, campos)] numa transação, cada uma no seu savepoint (vê as anteriores
+    do lote; se for rejeitada, só ela é desfeita). Se o commit falhar, reaplica uma a uma.
+    Retorna [(id, campos, erro ou None)].
+    Entradas com write_id já aplicado (reentregues depois do commit) voltam sem erro e sem reaplicar;
+    as tarefas pós-commit delas não rodam de novo. Levanta LeaseLost (sem commit) se lease_lost for marcado.
+    """
+    db = SessionLocal()
+    tasks, results = [], []
+    try:
+        if db.get_bind().dialect.name == "sqlite":
+            # O pysqlite só abre a transação antes de um INSERT/UPDATE/DELETE: sem o BEGIN explícito,
+            # o primeiro SAVEPOINT abriria a transação e o RELEASE dele já faria o commit
+            db.connection().exec_driver_sql("BEGIN")
+        applied = {
+            write_id for write_id, in db.query(AppliedWriteModel.write_id).filter(
+                AppliedWriteModel.write_id.in_([fields["write_id"] for _, fields in entries])
+            )
+        }
+        now = datetime.utcnow()
+        for entry_id, fields in entries:
+            if fields["write_id"] in applied:
+                results.append((entry_id, fields, None))
+                continue
+            handler = HANDLERS.get(fields["kind"])
+            pending_tasks = len(tasks)
+            try:
+                if handler is None:
+                    raise HTTPException(status_code=400, detail=f"Tipo de escrita desconhecido: {fields['kind']}")
+                # Savepoint por entrada: o flush no fim deixa as mudanças visíveis para as próximas
+                # entradas do lote, e uma entrada rejeitada desfaz só o que ela mesma fez
+                with db.begin_nested():
+                    handler(db, orjson.loads(fields["data"]), tasks)
+                    db.add(AppliedWriteModel(write_id=fields["write_id"], applied_at=now))
+                results.append((entry_id, fields, None))
+            except (HTTPException, IntegrityError) as e:
+                del tasks[pending_tasks:]
+                results.append((entry_id, fields, e.detail if isinstance(e, HTTPException) else str(e.orig)))
+        if lease_lost is not None and lease_lost.is_set():
+            raise LeaseLost()
+        with span("db.commit", batch_size=len(entries)):
+            db.commit()
+    except LeaseLost:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        if len(entries) == 1:
+            entry_id, fields = entries[0]
+            return [(entry_id, fields, str(e))]
+        print(f"Erro ao aplicar o lote de {len(entries)} escritas, aplicando uma a uma: {e}")
+        return [result for entry in entries for result in apply_batch([entry], lease_lost)]
+    finally:
+        db.close()
+
+    for task, *args in tasks:
+        try:
+            task(*args)
+        except Exception as e:
+            print(f"Erro na tarefa pós-escrita {task.__name__}: {e}")
+    return results
+
+
+def _finish(redis_client, results: list):
+    ids = [entry_id for entry_id, _, _ in results]
+    pipe = redis_client.pipeline()
+    pipe.xack(STREAM_KEY, GROUP, *ids)
+    pipe.xdel(STREAM_KEY, *ids)
+    pipe.execute()
+    for _, fields, error in results:
+        _clear_overlay(redis_client, int(fields["user_id"]), fields["entity"], fields["write_id"])
+        if error:
+            print(f"Escrita {fields['kind']} do usuário {fields['user_id']} descartada: {error}")
+            update_job(fields["write_id"], status="failed", error=error)
+        else:
+            update_job(fields["write_id"], status="done")
+
+
+# Compare-and-extend / compare-and-delete: só mexem no lease se ele ainda for deste consumidor
+_EXTEND_LEASE = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("PEXPIRE", KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_LEASE = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+def _extend_lease(redis_client, token: str):
+    return bool(redis_client.eval(_EXTEND_LEASE, 1, LEASE_KEY, token, LEASE_MS))
+
+
+def _acquire_lease(redis_client, token: str):
+    """Pega o lease livre, ou renova o que já é deste consumidor."""
+    return bool(redis_client.set(LEASE_KEY, token, nx=True, px=LEASE_MS)) or _extend_lease(redis_client, token)
+
+
+@contextmanager
+def _keep_lease(redis_client, token: str):
+    """
+    Renova o lease a cada LEASE_RENEW_MS enquanto o bloco roda (o lote pode levar mais que LEASE_MS).
+    Devolve um Event marcado se o lease for perdido (outro consumidor assumiu).
+    """
+    lost, done = threading.Event(), threading.Event()
+
+    def renew():
+        while not done.wait(LEASE_RENEW_MS / 1000):
+            try:
+                if not _extend_lease(redis_client, token):
+                    lost.set()
+                    return
+            except Exception as e:
+                print(f"Aviso: não foi possível renovar o lease do write-behind: {e}")
+
+    thread = threading.Thread(target=renew, name="write-behind-lease", daemon=True)
+    thread.start()
+    try:
+        yield lost
+    finally:
+        done.set()
+        thread.join()
+
+
+def _prune_applied_writes():
+    db = SessionLocal()
+    try:
+        db.query(AppliedWriteModel).filter(
+            AppliedWriteModel.applied_at < datetime.utcnow() - APPLIED_WRITES_RETENTION
+        ).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _ensure_group(redis_client):
+    from redis.exceptions import ResponseError
+
+    try:
+        redis_client.xgroup_create(STREAM_KEY, GROUP, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+def consume(stop: threading.Event, batch_size: int = WRITE_BEHIND_BATCH_SIZE):
+    """Loop do consumidor: aplica lotes enquanto tiver o lease, até stop ser sinalizado."""
+    token = uuid.uuid4().hex
+    group_ready = False
+    pruned_at = 0.0
+    while not stop.is_set():
+        redis_client = get_redis()
+        if redis_client is None:
+            stop.wait(5)
+            continue
+        try:
+            if not group_ready:
+                _ensure_group(redis_client)
+                group_ready = True
+            if not _acquire_lease(redis_client, token):
+                stop.wait(LEASE_MS / 3000)
+                continue
+            # Primeiro as entradas pendentes (de um consumidor que caiu no meio do lote), depois as novas
+            response = redis_client.xreadgroup(GROUP, CONSUMER, {STREAM_KEY: "0"}, count=batch_size)
+            if not response or not response[0][1]:
+                response = redis_client.xreadgroup(GROUP, CONSUMER, {STREAM_KEY: ">"}, count=batch_size, block=WRITE_BEHIND_BLOCK_MS)
+            entries = response[0][1] if response else []
+            if entries:
+                with _keep_lease(redis_client, token) as lease_lost:
+                    _finish(redis_client, apply_batch(entries, lease_lost))
+            if time.monotonic() - pruned_at >= APPLIED_WRITES_PRUNE_INTERVAL:
+                _prune_applied_writes()
+                pruned_at = time.monotonic()
+        except LeaseLost:
+            print("Aviso: lease do write-behind perdido no meio do lote; o lote fica pendente para o novo consumidor")
+        except Exception as e:
+            print(f"Erro no consumidor de escritas: {e}")
+            stop.wait(1)
+
+    # Libera o lease para outro worker assumir sem esperar ele expirar
+    redis_client = get_redis()
+    try:
+        if redis_client:
+            redis_client.eval(_RELEASE_LEASE, 1, LEASE_KEY, token)
+    except Exception:
+        pass
+
+
+def start_consumer():
+    """Sobe o consumidor numa thread (startup da API), se o modo write-behind estiver ligado."""
+    global _thread
+    if not WRITE_BEHIND or not WRITE_BEHIND_CONSUMER or _thread is not None:
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=consume, args=(_stop,), name="write-behind", daemon=True)
+    _thread.start()
+
+
+def stop_consumer(timeout: float = 10):
+    """Para o consumidor (shutdown): termina o lote atual; o resto fica na stream para o próximo."""
+    global _thread
+    if _thread is None:
+        return
+    _stop.set()
+    _thread.join(timeout)
+    _thread = None
+
+
+if __name__ == "__main__":
+    # Uso: python -m app.services.write_behind consume
+    import sys
+    from app.core.startup import prepare_cli
+
+    if sys.argv[1:] != ["consume"]:
+        print("Uso: python -m app.services.write_behind consume")
+        sys.exit(1)
+
+    prepare_cli()
+    print("Consumidor de escritas iniciado (Ctrl+C para parar)")
+    stop = threading.Event()
+    try:
+        consume(stop)
+    except KeyboardInterrupt:
+        stop.set()
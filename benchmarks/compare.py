@@ -0,0 +1,74 @@
+# benchmarks/compare.py
+"""
+Compara dois resultados de benchmarks.run e aponta as regressões.
+
+    python -m benchmarks.compare benchmarks/results/abc123.json benchmarks/results/def456.json --threshold 10
+
+Sai com código 1 se algum cenário ficou mais de --threshold % pior em throughput, p95 ou p99.
+"""
+import argparse
+import json
+import sys
+
+# (métrica, maior é melhor?)
+METRICS = [("throughput_rps", True), ("p50", False), ("p95", False), ("p99", False)]
+
+
+def _value(result: dict, metric: str):
+    return result[metric] if metric == "throughput_rps" else result["latency_ms"][metric]
+
+
+def compare(base: dict, new: dict, threshold: float):
+    """Retorna (linhas da tabela, lista de regressões)."""
+    rows, regressions = [], []
+    for name in base["scenarios"]:
+        if name not in new["scenarios"]:
+            continue
+        for metric, higher_is_better in METRICS:
+            before = _value(base["scenarios"][name], metric)
+            after = _value(new["scenarios"][name], metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before * 100
+            worse = -change if higher_is_better else change
+            regressed = metric != "p50" and worse > threshold
+            rows.append((name, metric, before, after, change, regressed))
+            if regressed:
+                regressions.append(f"{name} {metric}: {before} -> {after} ({change:+.1f}%)")
+
+        calls_before = base["scenarios"][name].get("upstream_calls", {}).get("total")
+        calls_after = new["scenarios"][name].get("upstream_calls", {}).get("total")
+        if calls_before is not None and calls_after is not None:
+            rows.append((name, "upstream_calls", calls_before, calls_after, None, False))
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara dois resultados de benchmark")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10, help="piora máxima aceita, em %%")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    print(f"base: {base['meta']['commit']} ({base['meta']['timestamp']})  novo: {new['meta']['commit']} ({new['meta']['timestamp']})")
+    rows, regressions = compare(base, new, args.threshold)
+    print(f"{'cenário':<12} {'métrica':<15} {'base':>10} {'novo':>10} {'variação':>9}")
+    for name, metric, before, after, change, regressed in rows:
+        variation = f"{change:+.1f}%" if change is not None else ""
+        print(f"{name:<12} {metric:<15} {before:>10} {after:>10} {variation:>9}{'  <- regressão' if regressed else ''}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regressão(ões) acima de {args.threshold}%:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("\nSem regressões.")
+
+
+if __name__ == "__main__":
+    main()
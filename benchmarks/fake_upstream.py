@@ -0,0 +1,175 @@
+# benchmarks/fake_upstream.py
+"""
+TMDB e AniList falsos para os benchmarks: respondem com as fixtures gravadas em
+benchmarks/fixtures (trocando os ids pelos pedidos), com latência e taxa de erro configuráveis.
+
+    python -m benchmarks.fake_upstream --port 8900 --latency-ms 80 --jitter-ms 20 --error-rate 0.01
+
+Aponte a API para ele com TMDB_BASE_URL=http://127.0.0.1:8900/3 e ANILIST_API_URL=http://127.0.0.1:8900/graphql.
+GET /__stats devolve as chamadas recebidas por endpoint; POST /__reset zera a contagem.
+"""
+import argparse
+import copy
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def _load(name: str):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+# (regex do caminho, nome do endpoint, fixture, o grupo da regex é o id da mídia?)
+TMDB_ROUTES = [
+    (re.compile(r"^/3/movie/popular$"), "tmdb:/movie/popular", "tmdb/movie_popular.json", False),
+    (re.compile(r"^/3/tv/popular$"), "tmdb:/tv/popular", "tmdb/tv_popular.json", False),
+    (re.compile(r"^/3/search/movie$"), "tmdb:/search/movie", "tmdb/search_movie.json", False),
+    (re.compile(r"^/3/search/tv$"), "tmdb:/search/tv", "tmdb/search_tv.json", False),
+    (re.compile(r"^/3/movie/(\d+)/credits$"), "tmdb:/movie/{id}/credits", "tmdb/movie_credits.json", True),
+    (re.compile(r"^/3/tv/(\d+)/credits$"), "tmdb:/tv/{id}/credits", "tmdb/tv_credits.json", True),
+    (re.compile(r"^/3/movie/(\d+)$"), "tmdb:/movie/{id}", "tmdb/movie_details.json", True),
+    (re.compile(r"^/3/tv/(\d+)$"), "tmdb:/tv/{id}", "tmdb/tv_details.json", True),
+]
+
+
+class FakeUpstream:
+    """Estado compartilhado entre as threads do servidor: fixtures, configuração e contagem de chamadas."""
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0, seed: int | None = None):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.fixtures = {fixture: _load(fixture) for _, _, fixture, _ in TMDB_ROUTES}
+        self.anilist_page = _load("anilist/page.json")
+        self.anilist_media = _load("anilist/media.json")
+        self.calls = Counter()
+        self.errors = Counter()
+        self.lock = threading.Lock()
+
+    def delay(self):
+        with self.lock:
+            wait = self.latency + self.random.uniform(-self.jitter, self.jitter)
+            failed = self.random.random() < self.error_rate
+        time.sleep(max(wait, 0))
+        return failed
+
+    def count(self, endpoint: str, failed: bool):
+        with self.lock:
+            self.calls[endpoint] += 1
+            if failed:
+                self.errors[endpoint] += 1
+
+    def tmdb(self, path: str, query: dict):
+        for pattern, endpoint, fixture, has_id in TMDB_ROUTES:
+            match = pattern.match(path)
+            if not match:
+                continue
+            body = copy.deepcopy(self.fixtures[fixture])
+            if has_id:
+                body["id"] = int(match.group(1))
+            else:
+                # Páginas diferentes têm ids diferentes, como na API real
+                page = int(query.get("page", ["1"])[0])
+                body["page"] = page
+                for result in body["results"]:
+                    result["id"] += (page - 1) * len(body["results"])
+            return endpoint, body
+        return None, None
+
+    def anilist(self, payload: dict):
+        query = payload.get("query", "")
+        variables = payload.get("variables") or {}
+        if "Page" in query:
+            body = copy.deepcopy(self.anilist_page)
+            body["data"]["Page"]["media"] = body["data"]["Page"]["media"][: variables.get("perPage", 50)]
+            return "anilist:Page.media", body
+        if "idMal" in variables:
+            return "anilist:Media(idMal)", {"data": {"Media": {"id": variables["idMal"] + 100000}}}
+        body = copy.deepcopy(self.anilist_media)
+        body["data"]["Media"]["id"] = variables.get("id")
+        return "anilist:Media(id)", body
+
+    def stats(self):
+        with self.lock:
+            return {"calls": dict(self.calls), "errors": dict(self.errors), "total": sum(self.calls.values())}
+
+    def reset(self):
+        with self.lock:
+            self.calls.clear()
+            self.errors.clear()
+
+
+def make_handler(upstream: FakeUpstream):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body: dict):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/__stats":
+                return self._send(200, upstream.stats())
+
+            failed = upstream.delay()
+            endpoint, body = upstream.tmdb(url.path, parse_qs(url.query))
+            if endpoint is None:
+                return self._send(404, {"status_message": "The resource you requested could not be found."})
+            upstream.count(endpoint, failed)
+            if failed:
+                return self._send(503, {"status_message": "Service unavailable (fake)"})
+            self._send(200, body)
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            if url.path == "/__reset":
+                upstream.reset()
+                return self._send(200, {"ok": True})
+            if url.path != "/graphql":
+                return self._send(404, {"errors": [{"message": "Not Found"}]})
+
+            failed = upstream.delay()
+            endpoint, body = upstream.anilist(payload)
+            upstream.count(endpoint, failed)
+            if failed:
+                return self._send(500, {"errors": [{"message": "Internal Server Error (fake)"}]})
+            self._send(200, body)
+
+    return Handler
+
+
+def serve(port: int, upstream: FakeUpstream):
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(upstream))
+    server.daemon_threads = True
+    print(f"TMDB/AniList falsos em http://127.0.0.1:{port} (TMDB: /3, AniList: /graphql)", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TMDB e AniList falsos para benchmarks")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    serve(args.port, FakeUpstream(args.latency_ms, args.jitter_ms, args.error_rate, args.seed))
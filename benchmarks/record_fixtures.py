@@ -0,0 +1,87 @@
+# benchmarks/record_fixtures.py
+"""
+Regrava as fixtures do TMDB/AniList falsos a partir das APIs reais (precisa de TMDB_API_KEY).
+
+    python -m benchmarks.record_fixtures
+"""
+import json
+import os
+import requests
+from benchmarks.fake_upstream import FIXTURES_DIR
+
+TMDB_URL = "https://api.themoviedb.org/3"
+ANILIST_URL = "https://graphql.anilist.co"
+
+TMDB_FIXTURES = {
+    "tmdb/movie_popular.json": "/movie/popular",
+    "tmdb/tv_popular.json": "/tv/popular",
+    "tmdb/search_movie.json": "/search/movie?query=batman",
+    "tmdb/search_tv.json": "/search/tv?query=breaking",
+    "tmdb/movie_details.json": "/movie/550",
+    "tmdb/movie_credits.json": "/movie/550/credits",
+    "tmdb/tv_details.json": "/tv/1399",
+    "tmdb/tv_credits.json": "/tv/1399/credits",
+}
+
+ANILIST_PAGE_QUERY = """
+query ($page: Int, $perPage: Int) {
+  Page(page: $page, perPage: $perPage) {
+    media(type: ANIME, sort: TRENDING_DESC) {
+      id
+      title { romaji english }
+      description(asHtml: false)
+      startDate { year month day }
+      coverImage { large medium }
+      bannerImage
+      averageScore
+      genres
+    }
+  }
+}
+"""
+
+ANILIST_MEDIA_QUERY = """
+query ($id: Int) {
+  Media(id: $id, type: ANIME) {
+    id
+    title { romaji english }
+    description(asHtml: false)
+    averageScore
+    startDate { year month day }
+    episodes
+    status
+    coverImage { large }
+    bannerImage
+  }
+}
+"""
+
+
+def _save(name: str, body: dict):
+    with open(os.path.join(FIXTURES_DIR, name), "w", encoding="utf-8") as f:
+        json.dump(body, f, ensure_ascii=False, indent=1)
+    print(f"{name} gravada")
+
+
+def main():
+    api_key = os.getenv("TMDB_API_KEY")
+    if not api_key:
+        raise SystemExit("Defina TMDB_API_KEY para gravar as fixtures do TMDB")
+
+    for name, path in TMDB_FIXTURES.items():
+        separator = "&" if "?" in path else "?"
+        response = requests.get(f"{TMDB_URL}{path}{separator}api_key={api_key}&language=pt-BR", timeout=30)
+        response.raise_for_status()
+        _save(name, response.json())
+
+    for name, query, variables in [
+        ("anilist/page.json", ANILIST_PAGE_QUERY, {"page": 1, "perPage": 50}),
+        ("anilist/media.json", ANILIST_MEDIA_QUERY, {"id": 21}),
+    ]:
+        response = requests.post(ANILIST_URL, json={"query": query, "variables": variables}, timeout=30)
+        response.raise_for_status()
+        _save(name, response.json())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# benchmarks/scenarios.py
+"""
+Cenários de carga. Cada um gera a próxima requisição (método, caminho, corpo JSON) a partir
+do contexto criado no setup do benchmark (usuários e listas).
+"""
+import itertools
+import random
+
+SEARCH_TERMS = [
+    "batman", "matrix", "naruto", "breaking bad", "amor", "noite", "star wars", "one piece",
+    "friends", "cidade", "alien", "the office", "dragon", "tempo", "mar", "vingadores",
+]
+MEDIA_TYPES = ["movie", "serie", "anime"]
+
+# ids únicos para avaliações e itens de lista (o rate responde 409 se o par usuário/mídia repetir)
+_media_ids = itertools.count(100000)
+
+
+def popular(ctx, rng: random.Random):
+    return "GET", "/media/popular", None
+
+
+def search(ctx, rng: random.Random):
+    return "GET", f"/media/search?name={rng.choice(SEARCH_TERMS)}", None
+
+
+def rate(ctx, rng: random.Random):
+    return "POST", "/media/rate", {
+        "media_type": rng.choice(MEDIA_TYPES),
+        "media_id": next(_media_ids),
+        "rating": rng.randint(0, 10),
+        "comment": None,
+        "user_id": rng.choice(ctx["user_ids"]),
+    }
+
+
+def lists_add(ctx, rng: random.Random):
+    media_id = next(_media_ids)
+    return "POST", "/media/listas/item/add", {
+        "lista_id": rng.choice(ctx["lista_ids"]),
+        "media_type": rng.choice(MEDIA_TYPES),
+        "media_id": media_id,
+        "title": f"Mídia {media_id}",
+    }
+
+
+def lists_read(ctx, rng: random.Random):
+    if rng.random() < 0.5:
+        return "GET", f"/media/listas/{rng.choice(ctx['lista_ids'])}", None
+    return "GET", f"/media/listas/user/{rng.choice(ctx['user_ids'])}", None
+
+
+SCENARIOS = {
+    "popular": popular,
+    "search": search,
+    "rate": rate,
+    "lists_add": lists_add,
+    "lists_read": lists_read,
+}
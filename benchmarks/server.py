@@ -0,0 +1,38 @@
+# benchmarks/server.py
+"""
+Sobe a API para os benchmarks (uvicorn, um processo). Com --fakeredis, o cache usa um
+Redis em memória (pacote fakeredis) no lugar do REDIS_URL.
+
+    python -m benchmarks.server --port 8000 --fakeredis
+"""
+import argparse
+import os
+
+
+def use_fakeredis():
+    """Faz o app.core.cache conectar num Redis em memória (tem que rodar antes de importar a API)."""
+    import fakeredis
+    import redis
+
+    server = fakeredis.FakeServer()
+
+    def from_url(url, **kwargs):
+        return redis.ConnectionPool(connection_class=fakeredis.FakeConnection, server=server, **kwargs)
+
+    redis.ConnectionPool.from_url = from_url
+    os.environ["REDIS_URL"] = "redis://fakeredis"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API do CineList para benchmarks")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--fakeredis", action="store_true", help="usa um Redis em memória")
+    args = parser.parse_args()
+
+    if args.fakeredis:
+        use_fakeredis()
+
+    import uvicorn
+    from app.main import app
+
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
@@ -0,0 +1,20 @@
+# gunicorn.conf.py (carregado automaticamente pelo gunicorn a partir da raiz do projeto)
+# As opções vêm de app/run.py (mesmas variáveis de ambiente do "python -m app.run"):
+#   gunicorn app.main:app
+from app.run import ServerConfig, child_exit, prepare_metrics_dir  # noqa: F401 (child_exit é um hook do gunicorn)
+
+_config = ServerConfig()
+for _warning in _config.check():
+    print(f"Aviso: {_warning}")
+prepare_metrics_dir(_config.workers)
+
+bind = f"{_config.host}:{_config.port}"
+workers = _config.workers
+worker_class = _config.worker_class
+keepalive = _config.keepalive
+timeout = _config.timeout
+graceful_timeout = _config.graceful_timeout
+max_requests = _config.max_requests
+max_requests_jitter = _config.max_requests_jitter
+backlog = _config.backlog
+loglevel = _config.log_level
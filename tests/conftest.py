@@ -0,0 +1,81 @@
+# tests/conftest.py
+"""
+Harness dos testes: SQLite temporário, Redis em memória (fakeredis) e TMDB/AniList falsos
+(benchmarks.fake_upstream, o mesmo dos benchmarks), com QUERY_BUDGET_MODE=strict.
+O ambiente é montado aqui, antes de qualquer teste importar a API.
+
+    pip install -r requirements.txt -r tests/requirements.txt
+    python -m pytest -q tests
+"""
+import os
+import sys
+import tempfile
+import threading
+import uuid
+from http.server import ThreadingHTTPServer
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_upstream import FakeUpstream, make_handler
+from benchmarks.server import use_fakeredis
+
+_upstream = FakeUpstream()
+_server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(_upstream))
+_server.daemon_threads = True
+threading.Thread(target=_server.serve_forever, name="fake-upstream", daemon=True).start()
+_upstream_url = f"http://127.0.0.1:{_server.server_address[1]}"
+
+_tmpdir = tempfile.mkdtemp(prefix="cinelist-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_tmpdir}/cinelist.db",
+    "RECOMMENDER_INDEX_PATH": f"{_tmpdir}/recommender_index.npz",
+    "SECRET_KEY": "test",
+    "TMDB_API_KEY": "test",
+    "TMDB_BASE_URL": f"{_upstream_url}/3",
+    "ANILIST_API_URL": f"{_upstream_url}/graphql",
+    "QUERY_BUDGET_MODE": "strict",
+    "WRITE_BEHIND": "0",
+    "ENRICHMENT_WORKER": "0",
+    "STARTUP_WARMUP": "0",
+})
+use_fakeredis()
+
+
+@pytest.fixture(scope="session")
+def upstream():
+    return _upstream
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(autouse=True)
+def no_budget_violations(client):
+    """Cache limpo em cada teste, e o teste falha se alguma rota estourar o orçamento de queries."""
+    from app.core.cache import get_redis
+    from app.core.query_budget import budget_violations
+
+    get_redis().flushall()
+    budget_violations.clear()
+    yield
+    assert not budget_violations, f"Orçamento de queries estourado: {list(budget_violations)}"
+
+
+@pytest.fixture
+def make_user(client):
+    """Registra um usuário novo; retorna (id, headers com o token)."""
+    def register():
+        name = f"u{uuid.uuid4().hex[:10]}"
+        response = client.post("/auth/register", json={"name": name, "email": f"{name}@example.com", "password": "x"})
+        assert response.status_code == 200, response.text
+        body = response.json()
+        return body["user"]["id"], {"Authorization": f"Bearer {body['access_token']}"}
+    return register
@@ -0,0 +1,22 @@
+# tests/test_catalog.py
+
+
+def test_next_cursor_survives_compressed_cache(client):
+    """O cache dos bytes comprimidos (cache hit na segunda chamada) devolve também o X-Next-Cursor."""
+    for path in ["/movies/", "/anime/?limit=5", "/media/popular"]:
+        first = client.get(path, headers={"Accept-Encoding": "gzip"})
+        second = client.get(path, headers={"Accept-Encoding": "gzip"})
+        assert first.headers.get("content-encoding") == second.headers.get("content-encoding") == "gzip"
+        assert first.headers.get("x-next-cursor"), path
+        assert second.headers.get("x-next-cursor") == first.headers["x-next-cursor"], path
+        assert second.json() == first.json()
+
+
+def test_cursor_pages_do_not_overlap(client):
+    first = client.get("/movies/?limit=30")
+    second = client.get(f"/movies/?limit=30&cursor={first.headers['x-next-cursor']}")
+    first_ids = [movie["id"] for movie in first.json()]
+    second_ids = [movie["id"] for movie in second.json()]
+    assert len(first_ids) == len(second_ids) == 30
+    assert not set(first_ids) & set(second_ids)
+    assert client.get("/movies/?cursor=invalido").status_code == 400
@@ -0,0 +1,34 @@
+# tests/test_enrichment.py
+from concurrent.futures import ThreadPoolExecutor
+from app.config import SessionLocal
+from app.services.enrichment_service import enrich_batch
+from app.services.rating_service import UNTITLED
+
+
+def _enrich_pending():
+    db = SessionLocal()
+    try:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            while enrich_batch(db, pool)[0]:
+                pass
+    finally:
+        db.close()
+
+
+def test_enrichment_replaces_placeholder_titles_in_ratings_and_feed(client, make_user, upstream):
+    follower_id, headers = make_user()
+    user_id, _ = make_user()
+    assert client.post(f"/users/{user_id}/follow", headers=headers).status_code == 200
+
+    # O front atual não manda o card: a avaliação e o evento do feed nascem com o título provisório
+    response = client.post("/media/rate", json={"media_type": "movie", "media_id": 424242, "rating": 9, "user_id": user_id})
+    assert response.status_code == 200, response.text
+    assert response.json()["title"] == UNTITLED
+    assert client.get("/users/me/feed", headers=headers).json()["results"][0]["title"] == UNTITLED
+
+    _enrich_pending()
+
+    title = upstream.fixtures["tmdb/movie_details.json"]["title"]
+    ratings = client.get(f"/media/rate/user/{user_id}").json()["results"]
+    assert [rating["title"] for rating in ratings] == [title]
+    assert client.get("/users/me/feed", headers=headers).json()["results"][0]["title"] == title
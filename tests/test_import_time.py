@@ -0,0 +1,7 @@
+# tests/test_import_time.py
+from benchmarks.import_time import check
+
+
+def test_import_stays_within_budget():
+    # Cada rodada é um processo novo (python -c "import app.main"), sem o ambiente dos testes já importado
+    assert check(runs=5, verbose=False) == []
@@ -0,0 +1,96 @@
+# tests/test_lists.py
+from sqlalchemy import func
+from app.config import SessionLocal
+from app.models.lista_item import ListaItemModel
+
+
+def _create_list_with_items(client, user_id, media_ids, nome="Lista"):
+    lista_id = client.post("/media/listas/create", json={"nome": nome, "user_id": user_id}).json()["id"]
+    response = client.post("/media/listas/item/add/bulk", json={"lista_id": lista_id, "itens": [
+        {"media_type": "movie", "media_id": media_id, "title": f"T{media_id}"} for media_id in media_ids
+    ]})
+    assert response.status_code == 200, response.text
+    return lista_id
+
+
+def _item_count(lista_id):
+    db = SessionLocal()
+    try:
+        return db.query(func.count(ListaItemModel.id)).filter(ListaItemModel.lista_id == lista_id).scalar()
+    finally:
+        db.close()
+
+
+def _media_refs(lista_id):
+    db = SessionLocal()
+    try:
+        return dict(db.query(ListaItemModel.media_id, ListaItemModel.media_ref_id).filter(ListaItemModel.lista_id == lista_id))
+    finally:
+        db.close()
+
+
+def test_delete_list_removes_items(client, make_user):
+    # Depende do ON DELETE CASCADE (passive_deletes): no SQLite, só com PRAGMA foreign_keys=ON
+    user_id, _ = make_user()
+    lista_id = _create_list_with_items(client, user_id, [1, 2, 3])
+    response = client.request("DELETE", "/media/listas/delete", json={"user_id": user_id, "lista_id": lista_id})
+    assert response.status_code == 200, response.text
+    assert _item_count(lista_id) == 0
+
+
+def test_merge_with_delete_source_removes_source_items(client, make_user):
+    user_id, _ = make_user()
+    source_id = _create_list_with_items(client, user_id, [1, 2, 3], "Origem")
+    target_id = _create_list_with_items(client, user_id, [3, 4], "Destino")
+    response = client.post("/media/listas/merge", json={
+        "user_id": user_id, "source_lista_id": source_id, "target_lista_id": target_id, "delete_source": True,
+    })
+    assert response.status_code == 200, response.text
+    assert _item_count(source_id) == 0
+    assert _item_count(target_id) == 4
+
+
+def test_clone_and_merge_keep_media_reference(client, make_user):
+    user_id, _ = make_user()
+    source_id = _create_list_with_items(client, user_id, [11, 12], "Origem")
+    target_id = _create_list_with_items(client, user_id, [13], "Destino")
+    refs = _media_refs(source_id)
+    assert all(refs.values())
+
+    response = client.post("/media/listas/clone", json={"lista_id": source_id, "user_id": user_id})
+    assert response.status_code == 200, response.text
+    assert _media_refs(response.json()["lista_id"]) == refs
+
+    response = client.post("/media/listas/merge", json={
+        "user_id": user_id, "source_lista_id": source_id, "target_lista_id": target_id, "delete_source": False,
+    })
+    assert response.status_code == 200, response.text
+    merged = _media_refs(target_id)
+    assert {media_id: merged[media_id] for media_id in refs} == refs
+
+
+def test_sync_schema_drops_duplicate_items_before_the_unique_index(client, make_user):
+    from sqlalchemy import text
+    from app.config import get_engine, sync_schema
+
+    user_id, _ = make_user()
+    lista_id = _create_list_with_items(client, user_id, [21, 22])
+    # Banco anterior ao índice único: o mesmo item duas vezes na lista
+    with get_engine().begin() as conn:
+        conn.execute(text("DROP INDEX uq_lista_itens_lista_media"))
+        conn.execute(text(
+            "INSERT INTO lista_itens (lista_id, media_type, media_id, media_title) VALUES (:lista_id, 'movie', 21, 'Repetido')"
+        ), {"lista_id": lista_id})
+    assert _item_count(lista_id) == 3
+
+    sync_schema()
+    assert _item_count(lista_id) == 2
+    db = SessionLocal()
+    try:
+        titles = dict(db.query(ListaItemModel.media_id, ListaItemModel.media_title).filter(ListaItemModel.lista_id == lista_id))
+    finally:
+        db.close()
+    assert titles == {21: "T21", 22: "T22"}
+    response = client.post("/media/listas/item/add/bulk", json={"lista_id": lista_id, "itens": [{"media_type": "movie", "media_id": 21, "title": "T21"}]})
+    assert response.status_code == 200, response.text
+    assert _item_count(lista_id) == 2
@@ -0,0 +1,26 @@
+# tests/test_metrics.py
+import uuid
+import pytest
+from app.core.metrics import METRICS_ENABLED
+
+pytestmark = pytest.mark.skipif(not METRICS_ENABLED, reason="prometheus_client não instalado ou METRICS_ENABLED=0")
+
+
+def _route_labels(client):
+    body = client.get("/metrics").text
+    return {
+        line.split('route="', 1)[1].split('"', 1)[0]
+        for line in body.splitlines()
+        if line.startswith("cinelist_http_request_duration_seconds_count")
+    }
+
+
+def test_unmatched_paths_do_not_become_labels(client):
+    # Redirect da barra final (307) e caminhos inexistentes: o caminho real não pode virar rótulo
+    unknown = f"/nope/{uuid.uuid4().hex}"
+    assert client.get("/series", follow_redirects=False).status_code == 307
+    assert client.get(unknown).status_code == 404
+
+    labels = _route_labels(client)
+    assert "unmatched" in labels
+    assert "/series" not in labels and unknown not in labels
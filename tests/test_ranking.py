@@ -0,0 +1,67 @@
+# tests/test_ranking.py
+import random
+from app.services import ranking
+
+
+def _page(source, first, count, scale):
+    # Popularidades com cauda longa, decrescentes como nas listas das APIs
+    return [{"id": first + i, "type": source, "popularity": scale / (first + i)} for i in range(count)]
+
+
+def _sources(first, count):
+    return {
+        "movie": _page("movie", first, count, 5000),
+        "serie": _page("serie", first, count, 300),
+        "anime": _page("anime", first, count, 200000),
+    }
+
+
+def test_first_page_interleaves_sources():
+    results = ranking.rank(_sources(1, 20))
+    assert [item["type"] for item in results[:3]] == ["movie", "serie", "anime"]
+    assert len(results) == 60
+
+
+def test_deep_pages_keep_interleaving_and_distinct_scores():
+    scope = f"test:{random.random()}"
+    first_page = ranking.rank(_sources(1, 20), scope=scope)  # guarda as estatísticas
+    results = ranking.rank(_sources(21, 20), scope=scope, refresh=False)
+
+    scores = [item["rank_score"] for item in results]
+    assert all(score > 0 for score in scores)
+    assert scores == sorted(scores, reverse=True)
+    # As fontes continuam misturadas (não todos os filmes, depois todas as séries, depois todos os animes)
+    assert len({item["type"] for item in results[:6]}) == 3
+    # Abaixo da primeira página da mesma fonte, e ordenadas entre si
+    for source in ("movie", "serie", "anime"):
+        deep = [item for item in results if item["type"] == source]
+        assert [item["id"] for item in deep] == list(range(21, 41))
+        assert deep[0]["rank_score"] < min(item["rank_score"] for item in first_page if item["type"] == source)
+
+
+def test_percentile_is_continuous_and_monotonic():
+    stats = ranking.compute_stats([10, 20, 20, 40, 80])
+    values = [0.5, 1, 5, 10, 15, 20, 30, 40, 60, 80, 100, 1000]
+    normalized = [stats.normalize(value, "percentile") for value in values]
+    assert all(0 < score < 1 for score in normalized)
+    assert normalized == sorted(normalized)
+    assert stats.normalize(0, "percentile") == 0.0
+
+
+def test_top_k_matches_full_sort():
+    sources = {source: [{"id": i, "popularity": random.random() * 1000} for i in range(300)] for source in ("movie", "serie", "anime")}
+    merged = ranking.rank(sources, 25)
+    stats = {source: ranking.compute_stats([ranking.score_of(source, item) for item in items]) for source, items in sources.items()}
+    expected = sorted(
+        (stats[source].normalize(ranking.score_of(source, item), "percentile") for source, items in sources.items() for item in items),
+        reverse=True,
+    )[:25]
+    assert [item["rank_score"] for item in merged] == [round(score, 4) for score in expected]
+
+
+def test_round_robin_policy():
+    sources = _sources(1, 5)
+    sources["serie"] = sources["serie"][:2]
+    results = ranking.rank(sources, policy="round_robin")
+    assert [item["type"] for item in results[:6]] == ["movie", "serie", "anime"] * 2
+    assert len(results) == 12
@@ -0,0 +1,100 @@
+# tests/test_recommender.py
+import numpy as np
+import pytest
+from scipy import sparse
+from app.services import recommender_service
+from app.services.recommender_service import (
+    RATING_OFFSET, TOP_K, RecommenderIndex, _normalized_columns, _similarity_block, _top_k,
+)
+
+
+def _index_from(ratings):
+    """Índice montado do zero (como o build_index) a partir de uma matriz usuário x mídia."""
+    ratings = sparse.csr_matrix(ratings, dtype=np.float32)
+    normalized, binary = _normalized_columns(ratings)
+    columns = np.arange(ratings.shape[1])
+    neighbors, similarities = _top_k(_similarity_block(normalized, binary, columns), columns, TOP_K)
+    users, items = ratings.shape
+    return RecommenderIndex(range(1, users + 1), np.zeros(items, dtype=np.int8), range(1, items + 1), ratings, neighbors, similarities)
+
+
+def _random_ratings(seed=0, users=30, items=12):
+    rng = np.random.default_rng(seed)
+    ratings = rng.integers(0, 11, size=(users, items)) + RATING_OFFSET
+    ratings[rng.random((users, items)) < 0.5] = 0
+    return ratings
+
+
+@pytest.fixture
+def worker_state(monkeypatch):
+    """Estado do worker limpo (índice em memória, mtime e relógios de gravação/replay)."""
+    for name, value in (("_index", None), ("_index_mtime", None), ("_last_save", 0.0), ("_last_replay", 0.0)):
+        monkeypatch.setattr(recommender_service, name, value)
+
+
+def test_incremental_update_matches_rebuild():
+    ratings = _random_ratings()
+    index = _index_from(ratings)
+    media_type = recommender_service.MEDIA_TYPES[0]
+    changes = [(1, media_type, 3, 9.0), (2, media_type, 3, None), (5, media_type, 7, 0.0), (31, media_type, 3, 8.0)]
+    index.apply_changes(changes)
+
+    expected = np.vstack([ratings, np.zeros((1, ratings.shape[1]))])
+    for user_id, _, media_id, rating in changes:
+        expected[user_id - 1, media_id - 1] = rating + RATING_OFFSET if rating is not None else 0
+    rebuilt = _index_from(expected)
+
+    index.compact()
+    assert np.array_equal(index.ratings.toarray(), expected)
+    for media_id in (3, 7):
+        item = media_id - 1
+        assert np.allclose(index.similarities[item], rebuilt.similarities[item], atol=1e-5)
+        assert set(index.neighbors[item]) == set(rebuilt.neighbors[item])
+
+
+def test_workers_do_not_lose_each_others_updates(worker_state):
+    from app.core.cache import get_redis
+
+    media_type = recommender_service.MEDIA_TYPES[0]
+    _index_from(_random_ratings(seed=1)).save()
+
+    # Worker A (este processo) aplica e grava; o worker B carregou o arquivo antes disso
+    other = RecommenderIndex.load()
+    recommender_service.apply_rating_changes([(1, media_type, 2, 10.0)])
+    get_redis().xadd(recommender_service.CHANGES_STREAM_KEY, {"changes": '[[2, "%s", 4, 1.0]]' % media_type})
+    recommender_service._replay(other, get_redis())
+
+    # B grava depois de A: o arquivo dele tem as duas mudanças, e A não perde a sua ao recarregar
+    other.save()
+    recommender_service._index_mtime = None
+    index = recommender_service.get_index()
+    for current in (other, index):
+        current.compact()
+        assert current.ratings[0, 1] == 10.0 + RATING_OFFSET
+        assert current.ratings[1, 3] == 1.0 + RATING_OFFSET
+
+
+def test_rating_through_the_api_updates_recommendations(client, make_user, worker_state):
+    from app.config import SessionLocal
+
+    # Dois grupos: os usuários pares gostam de 900100-900104 e não gostam de 900105-900109; os ímpares, o contrário
+    for n in range(8):
+        user_id, _ = make_user()
+        for media_id in (900100 + n % 5, 900101 + n % 4, 900105 + n % 5, 900106 + n % 4):
+            liked = (media_id < 900105) == (n % 2 == 0)
+            response = client.post("/media/rate", json={"media_type": "movie", "media_id": media_id, "rating": 9 if liked else 2, "user_id": user_id})
+            assert response.status_code == 200, response.text
+
+    db = SessionLocal()
+    try:
+        recommender_service.build_index(db).save()
+    finally:
+        db.close()
+
+    user_id, _ = make_user()
+    for media_id, rating in ((900101, 10), (900107, 1)):
+        response = client.post("/media/rate", json={"media_type": "movie", "media_id": media_id, "rating": rating, "user_id": user_id})
+        assert response.status_code == 200, response.text
+
+    results = client.get(f"/media/recommendations/{user_id}?limit=5").json()["results"]
+    assert results and all(900100 <= item["media_id"] < 900105 for item in results), results
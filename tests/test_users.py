@@ -0,0 +1,38 @@
+# tests/test_users.py
+from app.core.pagination import encode_cursor
+
+
+def test_directory_pages_with_cursor(client, make_user):
+    prefix = "zzdir"
+    for n in range(3):
+        name = f"{prefix}{n}"
+        response = client.post("/auth/register", json={"name": name, "email": f"{name}@example.com", "password": "x"})
+        assert response.status_code == 200, response.text
+    _, headers = make_user()
+
+    first = client.get(f"/users/get?q={prefix}&limit=2", headers=headers)
+    assert [user["username"] for user in first.json()] == ["zzdir0", "zzdir1"]
+    second = client.get(f"/users/get?q={prefix}&limit=2&cursor={first.headers['x-next-cursor']}", headers=headers)
+    assert [user["username"] for user in second.json()] == ["zzdir2"]
+
+
+def test_directory_rejects_malformed_cursor(client, make_user):
+    _, headers = make_user()
+    for cursor in ("invalido", encode_cursor("ana"), encode_cursor(1, "ana"), encode_cursor("ana", "1"), encode_cursor(["a"], 1)):
+        response = client.get(f"/users/get?cursor={cursor}", headers=headers)
+        assert response.status_code == 400, (cursor, response.text)
+        assert response.json()["detail"] == "Cursor inválido"
+
+
+def test_deletion_status_is_only_visible_to_the_deleted_account(client, make_user):
+    _, headers = make_user()
+    _, other_headers = make_user()
+    response = client.delete("/auth/me", headers=headers)
+    assert response.status_code == 202, response.text
+    job_id = response.json()["job_id"]
+
+    # O token da conta foi revogado pela exclusão, mas ainda serve para acompanhar o job dela
+    assert client.get("/auth/me", headers=headers).status_code == 401
+    assert client.get(f"/auth/deletion/{job_id}", headers=headers).status_code == 200
+    assert client.get(f"/auth/deletion/{job_id}").status_code == 401
+    assert client.get(f"/auth/deletion/{job_id}", headers=other_headers).status_code == 404
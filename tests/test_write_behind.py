@@ -0,0 +1,191 @@
+# tests/test_write_behind.py
+import threading
+import time
+import uuid
+import orjson
+import pytest
+from app.config import SessionLocal
+from app.core.cache import get_redis
+from app.core.jobs import create_job
+from app.models.lista_item import ListaItemModel
+from app.models.movie import MovieModel
+from app.services import write_behind
+from app.services.write_behind import LeaseLost, apply_batch
+
+
+def _rate_entry(user_id, media_id):
+    data = {
+        "media_type": "movie", "media_id": media_id, "rating": 8, "comment": None, "user_id": user_id,
+        "title": "Filme", "poster_path": None, "backdrop_path": None, "overview": None, "release_date": None,
+    }
+    write_id = create_job("write", write_kind="rate", user_id=user_id)
+    fields = {"kind": "rate", "user_id": str(user_id), "entity": f"rating:movie:{media_id}", "write_id": write_id, "data": orjson.dumps(data)}
+    return f"{int(time.time() * 1000)}-0", fields
+
+
+def _ratings(user_id, media_id):
+    db = SessionLocal()
+    try:
+        return db.query(MovieModel).filter(MovieModel.user_id == user_id, MovieModel.movie_id == media_id).count()
+    finally:
+        db.close()
+
+
+def _rating_values(user_id):
+    db = SessionLocal()
+    try:
+        return dict(db.query(MovieModel.movie_id, MovieModel.rating).filter(MovieModel.user_id == user_id))
+    finally:
+        db.close()
+
+
+def _list_media_ids(lista_id):
+    db = SessionLocal()
+    try:
+        return sorted(media_id for media_id, in db.query(ListaItemModel.media_id).filter(ListaItemModel.lista_id == lista_id))
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def queued(monkeypatch):
+    """Liga o write-behind nas rotas (sem subir o consumidor): as escritas ficam na stream até o _drain."""
+    monkeypatch.setattr(write_behind, "WRITE_BEHIND", True)
+    write_behind._ensure_group(get_redis())
+
+
+def _drain():
+    """Aplica tudo o que está na stream num lote só (como o consumidor) e retorna os erros por entrada."""
+    redis_client = get_redis()
+    response = redis_client.xreadgroup(write_behind.GROUP, write_behind.CONSUMER, {write_behind.STREAM_KEY: ">"}, count=100)
+    results = apply_batch(response[0][1])
+    write_behind._finish(redis_client, results)
+    return [error for _, _, error in results]
+
+
+def _rate(client, user_id, media_id, rating, status=202):
+    response = client.post("/media/rate", json={"media_type": "movie", "media_id": media_id, "rating": rating, "user_id": user_id})
+    assert response.status_code == status, response.text
+
+
+def _pending_ratings(client, user_id):
+    results = client.get(f"/media/rate/user/{user_id}").json()["results"]
+    return {item["movie_id"]: (item["rating"], item.get("pending", False)) for item in results}
+
+
+def _pending_list(client, lista_id):
+    return sorted(item["id"] for item in client.get(f"/media/listas/{lista_id}").json()["itens"])
+
+
+def test_replayed_entry_is_not_applied_or_rejected_again(make_user):
+    user_id, _ = make_user()
+    entry = _rate_entry(user_id, 777001)
+    assert [error for _, _, error in apply_batch([entry])] == [None]
+
+    # Reentregue depois do commit (o consumidor caiu antes do XACK): não vira 409 nem avaliação duplicada
+    assert [error for _, _, error in apply_batch([entry])] == [None]
+    assert _ratings(user_id, 777001) == 1
+
+
+def test_batch_is_not_committed_after_losing_the_lease(make_user):
+    user_id, _ = make_user()
+    lost = threading.Event()
+    lost.set()
+    with pytest.raises(LeaseLost):
+        apply_batch([_rate_entry(user_id, 777002)], lost)
+    assert _ratings(user_id, 777002) == 0
+
+
+def test_lease_is_renewed_while_the_batch_runs(monkeypatch):
+    pytest.importorskip("lupa")
+    monkeypatch.setattr(write_behind, "LEASE_MS", 300)
+    monkeypatch.setattr(write_behind, "LEASE_RENEW_MS", 100)
+    redis_client = get_redis()
+    mine, other = uuid.uuid4().hex, uuid.uuid4().hex
+
+    assert write_behind._acquire_lease(redis_client, mine)
+    with write_behind._keep_lease(redis_client, mine) as lost:
+        time.sleep(0.7)  # mais que o LEASE_MS: sem renovação, o outro consumidor pegaria o lease
+        assert not write_behind._acquire_lease(redis_client, other)
+        assert not lost.is_set()
+
+        redis_client.set(write_behind.LEASE_KEY, other)  # outro consumidor assumiu (ex: pausa longa)
+        time.sleep(0.3)
+        assert lost.is_set()
+    assert redis_client.get(write_behind.LEASE_KEY) == other
+
+
+def test_rejected_entry_does_not_undo_the_rest_of_the_batch(make_user):
+    user_id, _ = make_user()
+    errors = [error for _, _, error in apply_batch([_rate_entry(user_id, 777003), _rate_entry(user_id, 777003), _rate_entry(user_id, 777004)])]
+    assert errors[0] is None and "já foi avaliado" in errors[1] and errors[2] is None
+    assert _ratings(user_id, 777003) == 1
+    assert _ratings(user_id, 777004) == 1
+
+
+def test_rating_deleted_and_rated_again_in_one_batch(client, make_user, queued):
+    user_id, _ = make_user()
+    _rate(client, user_id, 777005, 8)
+    assert _drain() == [None]
+
+    response = client.request("DELETE", "/media/rate/delete", json={"media_type": "movie", "media_id": 777005, "user_id": user_id})
+    assert response.status_code == 202, response.text
+    _rate(client, user_id, 777005, 3)
+    assert _pending_ratings(client, user_id) == {777005: (3, True)}
+
+    assert _drain() == [None, None]
+    assert _rating_values(user_id) == {777005: 3}
+    assert _pending_ratings(client, user_id) == {777005: (3, False)}
+
+
+def test_list_item_deleted_and_added_again_in_one_batch(client, make_user, queued):
+    user_id, _ = make_user()
+    lista_id = client.post("/media/listas/create", json={"nome": "Lista", "user_id": user_id}).json()["id"]
+    item = {"lista_id": lista_id, "media_type": "movie", "media_id": 777006, "title": "Filme"}
+    assert client.post("/media/listas/item/add", json=item).status_code == 202
+    assert _drain() == [None]
+
+    response = client.request("DELETE", "/media/listas/item/delete", json={
+        "user_id": user_id, "lista_id": lista_id, "media_type": "movie", "media_id": 777006,
+    })
+    assert response.status_code == 202, response.text
+    assert client.post("/media/listas/item/add", json=item).status_code == 202
+    assert _pending_list(client, lista_id) == [777006]
+
+    assert _drain() == [None, None]
+    assert _list_media_ids(lista_id) == [777006]
+    assert _pending_list(client, lista_id) == [777006]
+
+
+def test_mixed_batch_applies_every_kind_in_order(client, make_user, queued):
+    user_id, _ = make_user()
+    lista_id = client.post("/media/listas/create", json={"nome": "Lista", "user_id": user_id}).json()["id"]
+    _rate(client, user_id, 777007, 5)
+    _rate(client, user_id, 777008, 6)
+    assert client.post("/media/listas/item/add", json={"lista_id": lista_id, "media_type": "movie", "media_id": 777009, "title": "A"}).status_code == 202
+    assert _drain() == [None, None, None]
+
+    # Um lote com todos os tipos, incluindo escritas sobre entidades criadas no mesmo lote
+    response = client.put("/media/rate/update", json={"media_type": "movie", "media_id": 777007, "rating": 9, "comment": "Bom", "user_id": user_id})
+    assert response.status_code == 202, response.text
+    response = client.request("DELETE", "/media/rate/delete", json={"media_type": "movie", "media_id": 777008, "user_id": user_id})
+    assert response.status_code == 202, response.text
+    _rate(client, user_id, 777010, 7)
+    response = client.put("/media/rate/update", json={"media_type": "movie", "media_id": 777010, "rating": 2, "user_id": user_id})
+    assert response.status_code == 202, response.text
+    assert client.post("/media/listas/item/add", json={"lista_id": lista_id, "media_type": "movie", "media_id": 777011, "title": "B"}).status_code == 202
+    response = client.request("DELETE", "/media/listas/item/delete", json={
+        "user_id": user_id, "lista_id": lista_id, "media_type": "movie", "media_id": 777009,
+    })
+    assert response.status_code == 202, response.text
+
+    # Read-your-writes: as leituras já mostram o estado final antes de o lote ser aplicado
+    assert _pending_ratings(client, user_id) == {777007: (9, True), 777010: (2, True)}
+    assert _pending_list(client, lista_id) == [777011]
+
+    assert _drain() == [None] * 6
+    assert _rating_values(user_id) == {777007: 9, 777010: 2}
+    assert _list_media_ids(lista_id) == [777011]
+    assert _pending_ratings(client, user_id) == {777007: (9, False), 777010: (2, False)}
+    assert _pending_list(client, lista_id) == [777011]
+    assert get_redis().hgetall(write_behind._overlay_key(user_id)) == {}